@@ -4,7 +4,7 @@
 # Name:             Identify_Fallow_Fields.py
 # Author:           Kelly Meehan, USBR
 # Created:          20200501
-# Updated:          20210201 
+# Updated:          20261019
 # Version:          Created using Python 3.6.8 
 
 # Requires:         ArcGIS Pro 
@@ -131,6 +131,7 @@
 
 # 0.0 Import necessary packages
 import arcpy, os, glob, pandas, numpy, fnmatch
+from crop_catalogue import fallow_crop_code
 from datetime import datetime, timedelta
 
 #--------------------------------------------
@@ -351,7 +352,7 @@ df_ndvi['recent_delta_sum'] = df_ndvi[columns_delta_recent].sum(axis=1)
 for index, row in df_ndvi.iterrows():
     if df_ndvi.loc[index, 'recent_delta_sum'] >= 0.01 and df_ndvi.loc[index, ultima_ndvi] >= 0.10:
         df_ndvi.loc[index, 'Fallow_Status'] = 'Not_Fallow'
-    if df_ndvi.loc[index, 'Harvest_Date'] != '-9999' and int(df_ndvi.loc[index, 'Harvest_Date']) <= date_required_fallow and df_ndvi.loc[index, 'Crop_Type'] == 1403:
+    if df_ndvi.loc[index, 'Harvest_Date'] != '-9999' and int(df_ndvi.loc[index, 'Harvest_Date']) <= date_required_fallow and df_ndvi.loc[index, 'Crop_Type'] == fallow_crop_code:
         df_ndvi.loc[index, 'Fallow_Status'] = 'Not_Fallow'   
 
 # Delete column Crop_Type to avoid issues with upcoming merge 
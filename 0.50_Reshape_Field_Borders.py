@@ -5,7 +5,7 @@
 # Name:             0.50_Reshape_Field_Borders.py
 # Author:           Kelly Meehan, USBR
 # Created:          20181212
-# Updated:          20200521 
+# Updated:          20261019
 # Version:          Created using Python 3.6.8 
 
 # Requires:         ArcGIS Pro 
@@ -14,6 +14,7 @@
 
 # Description:      This tool allows a user to use selected features within a Reshape Fields feature class to update the geometries of two sets of feature classes, each with differing unique IDs (i.e. earlier and later FIELD_IDs). 
 #                   User should have a Reshaped Fields feature class with the following attribute table fields complete: earlier_field_id, later_field_id, and REGION
+#                   To propagate reshaped fields to every time-period geodatabase of a region at once, use Tool 0.51.
                     
 #----------------------------------------------------------------------------------------------
  
@@ -33,6 +34,7 @@
 # 0. Set-up
 # 1. Iterate through features of Earlier Feature Classes and overwrite geometry with that of a selected feature in Reshaped Fields of matching FIELD_ID and REGION values; update ACRES; replace GIS_COMMENTS value
 # 2. Iterate through features of Later Feature Classes and overwrite geometry with that of a selected feature in Reshaped Fields of matching FIELD_ID and REGION values; update ACRES; replace GIS_COMMENTS value
+#    (in both steps, features are found with a FIELD_ID and REGION where clause, backed by an attribute index on FIELD_ID added if missing, and only their ACRES are recomputed)
  
 #----------------------------------------------------------------------------------------------
 
@@ -40,6 +42,9 @@
 
 # 0.0 Install necessary packages
 import arcpy
+from change_journal import record_changes
+from field_id_index import check_duplicate_field_ids, format_duplicates
+from geometry_propagation import add_field_id_index, read_reshaped_geometries, reshape_feature_class
 
 # 0.1 Read in tool parameters
 
@@ -58,48 +63,47 @@ region =  arcpy.GetParameterAsText(3)
 # User provides uniform comment string to denote classification period initiating new border delineation
 gis_comment = arcpy.GetParameterAsText(4)
 
+# 0.2 Test for duplicate FIELD_ID within Region (all features sharing a reshaped FIELD_ID would be given its geometry)
+
+def check_duplicate_id():
+    for c in [f for f in earlier_feature_classes.split(';') + later_feature_classes.split(';') if f]:
+        duplicates = check_duplicate_field_ids(feature_class = c)
+        duplicates = duplicates[duplicates['REGION'] == region]
+        if len(duplicates):
+            arcpy.AddWarning('Duplicate FIELD_ID values in region ' + region + ' for ' + str(c) + ' found were: ' + ', '.join(format_duplicates(duplicates)))
+
 #----------------------------------------------------------------------------------------------
 
 # 1. Iterate through features of Earlier Feature Classes and overwrite geometry with that of a selected feature in Reshaped Fields of matching FIELD_ID and REGION values; update ACRES; replace GIS_COMMENTS value
 
-def update_earlier_feature_classes():
-    
-    # Create list of strings out of semicolon delineated string
-    earlier_feature_classes_list = earlier_feature_classes.split(';')     
-    
-    # Create a dictionary from attribute table of Reshaped Fields feature class (key: value is earlier_field_id: SHAPE@) 
+# Create function overwriting geometry of features of each feature class with FIELD_ID in id_dictionary and REGION of region, and updating their ACRES and GIS_COMMENTS (see geometry_propagation.py)
+def reshape_feature_classes(feature_classes_list, id_dictionary, feature_class_type):
 
-    # Create empty dictionary
-    earlier_id_dictionary = {}
-    
-    # Create Update Cursor with fields: earlier_field_id and SHAPE@
-    with arcpy.da.UpdateCursor(reshaped_fields, ['earlier_field_id', 'SHAPE@']) as eCursor:
-        for row in eCursor:
-            # Populate empty dictionary with key: value pairs from the two attribute table fields (earlier_field_id: SHAPE)
-            earlier_id_dictionary[row[0]] = row[1]
-    
-    # Iterate through each feature and if FIELD_ID matches a key value (earlier_field_id), replace @SHAPE with that of the dictionary value, and update ACRES
+    for i in feature_classes_list:
+        # Clear selection of Feature Class
+        arcpy.SelectLayerByAttribute_management(in_layer_or_view = i, selection_type = 'CLEAR_SELECTION')
+
+        index_added = add_field_id_index(feature_class = i)
+        if index_added:
+            arcpy.AddMessage('Added attribute index on FIELD_ID to ' + str(i))
+        elif index_added is None:
+            arcpy.AddWarning('Could not add attribute index on FIELD_ID to ' + str(i) + ' (feature class may be open elsewhere)')
+
+        # Record previous and new geometry, GIS_COMMENTS, and ACRES in the Change Journal, even if the update stopped part way, so reshapes can be undone with Tool 0.70
+        journal_changes = []
+        try:
+            changes = reshape_feature_class(feature_class = i, geometries = id_dictionary, region = region, gis_comment = gis_comment, journal_changes = journal_changes)
+        finally:
+            record_changes(dataset = i, changes = journal_changes, tool = '0.50_Reshape_Field_Borders')
+        arcpy.AddMessage('Updated shape and ACRES in ' + feature_class_type + ': ' + str(i) + ' for FIELD_ID(s): ' + ', '.join(str(c[0]) for c in changes))
+
+def update_earlier_feature_classes():
     
     # Check whether any Earlier Feature Classes were selected by user 
     if earlier_feature_classes:
-        for i in earlier_feature_classes_list:  
-            # Clear selection of Earlier Feature Class
-            arcpy.SelectLayerByAttribute_management(in_layer_or_view = i, selection_type = 'CLEAR_SELECTION')
-            # Create cursor with which to iterate through each feature
-            with arcpy.da.UpdateCursor(i, ['FIELD_ID', 'SHAPE@', 'REGION', 'GIS_COMMENTS']) as cursor: 
-                for row in cursor:
-                    # Set variable, earlier_id, to current record's FIELD_ID value
-                    earlier_id = row[0]
-                    # If FIELD_ID matches that of earlier_field_id and REGION matches, update Shape and GIS_COMMENTS attribute table fields
-                    if earlier_id in earlier_id_dictionary and row[2] == region: 
-                        row[1] = earlier_id_dictionary[earlier_id]
-                        row[3] = gis_comment
-                        cursor.updateRow(row)
-                        arcpy.AddMessage('Updated shape in earlier feature class: ' + str(i) + ' for FIELD_ID: ' + str(earlier_id))
-            
-            # Update ACRES in attribute table for Earlier Feature Class
-            arcpy.CalculateField_management(in_table = i, field = 'ACRES', expression = '!shape.area@ACRES!', expression_type = 'PYTHON3')
-            arcpy.AddMessage('Updated ACRES in Earlier Feature Class: ' + str(i))
+        # Create a dictionary from attribute table of Reshaped Fields feature class (key: value is earlier_field_id: SHAPE@) 
+        earlier_id_dictionary = read_reshaped_geometries(reshaped_fields = reshaped_fields, id_field = 'earlier_field_id')
+        reshape_feature_classes(feature_classes_list = earlier_feature_classes.split(';'), id_dictionary = earlier_id_dictionary, feature_class_type = 'Earlier Feature Class')
     else:
         arcpy.AddMessage('No Earlier Feature Classes inputted.')
         
@@ -109,47 +113,18 @@ def update_earlier_feature_classes():
 
 def update_later_feature_classes():
     
-    # Create list of strings out of semicolon delineated string
-    later_feature_classes_list = later_feature_classes.split(';')
-    
-    # Create a dictionary from attribute table of Reshaped Fields feature class (key: value is later_field_id: SHAPE@) 
-    
-    # Create empty dictionary
-    later_id_dictionary = {}
-
-    # Create Update Cursor with fields: later_field_id and SHAPE@    
-    with arcpy.da.UpdateCursor(reshaped_fields, ['later_field_id', 'SHAPE@']) as fCursor:
-        for row in fCursor:
-            # Populate empty dictionary with key: value pairs from the two attribute table fields (later_field_id: SHAPE)
-            later_id_dictionary [row[0]] = row[1]
-
-    # Iterate through each feature and if FIELD_ID matches a key value (later_field_id), replace @SHAPE with that of the dictionary value, and update ACRES
-            
     # Check whether any Later Feature Classes were selected by user 
     if later_feature_classes:
-        for k in later_feature_classes_list:
-            # Clear selection of Later Feature Class
-            arcpy.SelectLayerByAttribute_management(in_layer_or_view = k, selection_type = 'CLEAR_SELECTION')
-            # Create cursor with which to iterate through each feature
-            with arcpy.da.UpdateCursor(k, ['FIELD_ID', 'SHAPE@']) as cursor:
-                for row in cursor:
-                    later_id = row[0]
-                    # If FIELD_ID matches that of earlier_field_id and REGION matches, update Shape and GIS_COMMENTS attribute table fields
-                    if later_id in later_id_dictionary and row[2] == region:
-                        row[1] = later_id_dictionary[later_id]
-                        row[3] = gis_comment
-                        cursor.updateRow(row)
-                        arcpy.AddMessage('Updated shape in Later Feature Class: ' + str(k) + ' for FIELD_ID: ' + str(later_id))
-        
-            # Update ACRES in attribute table for Later Feature Class
-            arcpy.CalculateField_management(in_table = k, field = 'ACRES', expression = '!shape.area@ACRES!', expression_type = 'PYTHON3')
-            arcpy.AddMessage('Updated ACRES in Later Feature Class: ' + str(k))
+        # Create a dictionary from attribute table of Reshaped Fields feature class (key: value is later_field_id: SHAPE@) 
+        later_id_dictionary = read_reshaped_geometries(reshaped_fields = reshaped_fields, id_field = 'later_field_id')
+        reshape_feature_classes(feature_classes_list = later_feature_classes.split(';'), id_dictionary = later_id_dictionary, feature_class_type = 'Later Feature Class')
     else:
         arcpy.AddMessage('No Later Feature Classes inputted.')
     
 #----------------------------------------------
 
 if __name__ == '__main__':
+    check_duplicate_id()
     update_earlier_feature_classes()
     update_later_feature_classes()
 
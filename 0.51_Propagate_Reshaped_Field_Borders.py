@@ -0,0 +1,124 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             0.51_Propagate_Reshaped_Field_Borders.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         ArcGIS Pro, pandas
+
+# Notes:            This script is intended to be used for a Script Tool within ArcGIS Pro; it is not intended as a stand-alone script.
+#                   Tool code runs only under if __name__ == '__main__', as geodatabases are updated in parallel processes (see geometry_propagation.py).
+
+# Description:      This tool uses selected features within a Reshaped Fields feature class to update the geometries of field borders in every time-period geodatabase of a region
+#                   created by Tool 0.00 (e.g. feature class IID_T1_2019 of cy2019/T1_2019/IID_T1_2019/IID_T1_2019.gdb through T5_2019), rather than in feature classes listed one by one as in Tool 0.50.
+#                   Reshaped geometries are read once; each geodatabase is updated in its own process and edit session, which is saved only if all its feature classes are updated without error.
+#                   A Change Report lists every feature updated (time period, geodatabase, feature class, FIELD_ID, previous and new ACRES) and whether its geodatabase's edits were committed or rolled back.
+
+#----------------------------------------------------------------------------------------------
+
+# Tool setup:       The script tool's properties can be set as follows:
+#                      Parameters tab:
+#                           Reshaped Fields:            Feature Layer (Data Type) > Required (Type) > Input (Direction)
+#                           Year Directory:             Folder (Data Type) > Required (Type) > Input (Direction)
+#                           Region:                     String (Data Type) > Required (Type) > Input (Direction)
+#                           Reshaped FIELD_ID Field:    String (Data Type) > Required (Type) > Input (Direction) > Value List Filter: earlier_field_id, later_field_id > Default: earlier_field_id
+#                           GIS Comment:                String (Data Type) > Required (Type) > Input (Direction)
+#                           Change Report:              File (Data Type) > Required (Type) > Output (Direction) > File Filter: csv
+#                           Parallel Processes:         Long (Data Type) > Optional (Type) > Input (Direction)
+#                           Feature Class Name:         String (Data Type) > Optional (Type) > Input (Direction) > Default: name of each geodatabase (e.g. IID_T1_2019); wildcards (*) allowed
+
+###############################################################################################
+###############################################################################################
+
+# This script will:
+
+# 0. Set-up
+# 1. Find time-period geodatabases of Region in Year Directory
+# 2. Read geometries of selected features of Reshaped Fields once
+# 3. Update field borders of all time-period geodatabases, one process and edit session per geodatabase
+# 4. Write Change Report
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import arcpy, sys
+from geometry_propagation import find_period_geodatabases, propagate, read_reshaped_geometries, write_change_report
+
+if __name__ == '__main__':
+
+    # 0.1 Read in tool parameters
+
+    # User selects Reshaped Fields feature class
+    reshaped_fields = arcpy.GetParameterAsText(0)
+
+    # User selects Year Directory created by Tool 0.00 (e.g. cy2019)
+    year_directory = arcpy.GetParameterAsText(1)
+
+    # User selects region that features belong to (so as to avoid overwritting feature with same ID in another region)
+    region = arcpy.GetParameterAsText(2)
+
+    # User selects attribute table field of Reshaped Fields holding the FIELD_ID used in the time-period geodatabases
+    id_field = arcpy.GetParameterAsText(3) or 'earlier_field_id'
+
+    # User provides uniform comment string to denote classification period initiating new border delineation
+    gis_comment = arcpy.GetParameterAsText(4)
+
+    # User names Change Report csv
+    change_report = arcpy.GetParameterAsText(5)
+
+    # User optionally sets number of parallel processes (default: number of processors less one)
+    max_workers = int(arcpy.GetParameterAsText(6)) if arcpy.GetParameterAsText(6) else None
+
+    # User optionally names field borders feature class to update in each geodatabase (default: feature class named as the geodatabase, e.g. IID_T1_2019, so that other feature classes such as Fallowing Program Fields are not updated)
+    feature_class_name = arcpy.GetParameterAsText(7) or None
+
+    #----------------------------------------------------------------------------------------------
+
+    # 1. Find time-period geodatabases of Region in Year Directory
+
+    period_geodatabases = find_period_geodatabases(year_directory = year_directory, region = region)
+
+    if not period_geodatabases:
+        arcpy.AddError('No geodatabases named ' + region + '_T*_<year>.gdb found in ' + year_directory)
+        sys.exit(0)
+
+    arcpy.AddMessage('Found ' + str(len(period_geodatabases)) + ' time-period geodatabases: ' + ', '.join(p for p, g in period_geodatabases))
+
+    #----------------------------------------------------------------------------------------------
+
+    # 2. Read geometries of selected features of Reshaped Fields once
+
+    # Create dictionary with key: value pair as FIELD_ID (of id_field): SHAPE@
+    geometries = read_reshaped_geometries(reshaped_fields = reshaped_fields, id_field = id_field)
+
+    if not geometries:
+        arcpy.AddError('No features of ' + reshaped_fields + ' have a value of ' + id_field)
+        sys.exit(0)
+
+    #----------------------------------------------------------------------------------------------
+
+    # 3. Update field borders of all time-period geodatabases, one process and edit session per geodatabase
+
+    change_rows = []
+    for (period, geodatabase), rows in zip(period_geodatabases, propagate(period_geodatabases = period_geodatabases, geometries = geometries, region = region, gis_comment = gis_comment, max_workers = max_workers, feature_class_name = feature_class_name)):
+        change_rows += rows
+        status = rows[0]['STATUS']
+        updated = len([r for r in rows if r['FIELD_ID'] is not None])
+        if status.startswith('COMMITTED'):
+            arcpy.AddMessage(period + ': updated ' + str(updated) + ' features in ' + geodatabase)
+            if status != 'COMMITTED':
+                arcpy.AddWarning(period + ': ' + status)
+        else:
+            arcpy.AddWarning(period + ': no edits saved to ' + geodatabase + ' (' + status + ')')
+
+    #----------------------------------------------------------------------------------------------
+
+    # 4. Write Change Report
+
+    write_change_report(change_rows = change_rows, change_report = change_report)
+    arcpy.AddMessage('Generated Change Report: ' + change_report)
@@ -5,7 +5,7 @@
 # Name:             0.60_Update_Field_Values.py
 # Author:           Kelly Meehan, USBR
 # Created:          20181214
-# Updated:          20200522 
+# Updated:          20261019
 # Version:          Created using Python 3.6.8 
 
 # Requires:         ArcGIS Pro 
@@ -13,20 +13,24 @@
 # Notes:            This script is intended to be used for a Script Tool within ArcGIS Pro; it is not intended as a stand-alone script.
 
 # Description:      This tool allows a user to iterate through two sets of feature classes, each with differing unique IDs (i.e. earlier and later FIELD_IDs) and update select attribute table fields for one identified feature.                
+#                   Alternatively, in batch mode, many features are updated from an Edit List csv (columns: FIELD_ID, REGION, CLASS, CROP_TYPE, STUDY_AREA, comment; a blank cell leaves that field unchanged)
+#                   in one pass through each Earlier Feature Class, and FIELD_ID and REGION pairs of the Edit List not found in any feature class are reported.
+#                   Previous and new values of each field changed are recorded in the Change Journal (see change_journal.py), so updates can be undone with Tool 0.70.
                     
 #----------------------------------------------------------------------------------------------
  
 # Tool setup:       The script tool's properties can be set as follows: 
 #                      Parameters tab:    
 #                           Earlier Feature Classes:    Feature Layer-Multiple Values (Data Type) > Optional (Type) > Input (Direction)
-#                           Earlier FIELD_ID:           Long (Data Type) > Required (Type) > Input (Direction)
+#                           Earlier FIELD_ID:           Long (Data Type) > Optional (Type) > Input (Direction) > Required unless Edit List is given
 #                           Later Feature Classes:      Feature Layer-Multiple Values (Data Type) > Optional (Type) > Input (Direction)
-#                           Later FIELD_ID:             Long (Data Type) > Required (Type) > Input (Direction)
-#                           Class:                      Long (Data Type) > Required (Type) > Input (Direction)
-#                           Crop Type:                  Double (Data Type) > Required (Type) > Input (Direction)
-#                           GIS Comment:                String (Data Type) > Required (Type) > Input (Direction)
-#                           Study Area:                 Long (Data Type) > Required (Type) > Input (Direction)
-#                           Region:                     String (Data Type) > Required (Type) > Input (Direction)
+#                           Later FIELD_ID:             Long (Data Type) > Optional (Type) > Input (Direction) > Required unless Edit List is given
+#                           Class:                      Long (Data Type) > Optional (Type) > Input (Direction) > Required unless Edit List is given
+#                           Crop Type:                  Double (Data Type) > Optional (Type) > Input (Direction) > Required unless Edit List is given
+#                           GIS Comment:                String (Data Type) > Optional (Type) > Input (Direction) > Required unless Edit List is given
+#                           Study Area:                 Long (Data Type) > Optional (Type) > Input (Direction) > Required unless Edit List is given
+#                           Region:                     String (Data Type) > Optional (Type) > Input (Direction) > Required unless Edit List is given
+#                           Edit List:                  File (Data Type) > Optional (Type) > Input (Direction) > File Filter: csv
 
 ###############################################################################################
 ###############################################################################################
@@ -34,8 +38,9 @@
 # This script will:
 
 # 0. Set-up
-# 1. Test for duplicate FIELD_ID
+# 1. Test for duplicate FIELD_ID (per REGION)
 # 2. For each feature class, update the attribute table fields of CLASS, CROP_TYPE, and GIS_COMMENTS, and STUDY_AREA for any features with matching FIELD_ID and REGION 
+# 3. Report FIELD_ID and REGION pairs of edits not found in any feature class
 
 ###############################################################################################
 ###############################################################################################
@@ -43,7 +48,9 @@
 # 0. Set-up
 
 # 0.0 Install necessary packages
-import arcpy
+import arcpy, csv, sys
+from change_journal import record_changes
+from field_id_index import check_duplicate_field_ids, format_duplicates
 
 # 0.1 Read in tool parameters
 
@@ -74,65 +81,134 @@ gis_comment = arcpy.GetParameterAsText(7)
 # User selects region that feature belongs to (so as to avoid overwritting feature with same ID in another region)
 region =  arcpy.GetParameterAsText(8)
 
+# User optionally selects Edit List csv with which to update many features at once (batch mode), instead of one feature
+edit_list = arcpy.GetParameterAsText(9)
+
 #----------------------------------------------------------------------------------------------
 
     
-# 1. Test for duplicate FIELD_ID
+# 1. Test for duplicate FIELD_ID (per REGION, as FIELD_IDs are only unique within a region)
         
 def check_duplicate_id():
-    for c in earlier_feature_classes.split(';'): 
-        with arcpy.da.UpdateCursor(in_table = c, field_names = ['FIELD_ID']) as cursor:
-            field_id_values = [r[0] for r in cursor]
-            duplicates = set([x for x in field_id_values if field_id_values.count(x) > 1])
-            arcpy.AddMessage('Duplicate values for ' + str(c) + ' found were: ' + str(duplicates))
+    for c in [f for f in earlier_feature_classes.split(';') + later_feature_classes.split(';') if f]:
+        duplicates = check_duplicate_field_ids(feature_class = c)
+        if len(duplicates):
+            arcpy.AddWarning('Duplicate FIELD_ID values for ' + str(c) + ' found were: ' + ', '.join(format_duplicates(duplicates)))
+        else:
+            arcpy.AddMessage('No duplicate FIELD_ID values found for ' + str(c))
 
 # 2. For each feature class, update the attribute table fields of CLASS, CROP_TYPE, and GIS_COMMENTS, and STUDY_AREA for any features with matching FIELD_ID and REGION 
 
-def update_feature():
-        # Create list of uniform attribute table field names of which the like will be searched for 
-        desired_field_names = ['FIELD_ID', 'CLASS', 'CROP_TYPE', 'STUDY_AREA', 'GIS_COMMENTS', 'REGION']
-        
-        # Iterate through all Earlier Feature Classes
-        for i in earlier_feature_classes.split(";"): 
-            # Clear selection of Feature Class
-            arcpy.SelectLayerByAttribute_management(in_layer_or_view = i, selection_type = 'CLEAR_SELECTION')
-            # Make list of fields in feature class
-            existing_fields  = [field.name for field in arcpy.ListFields(dataset = i)]
-            
-            # Make empty list to which will be added existing field name that have a fuzzy match with a desired field name
-            field_names_list = []
-            
-            # Create a list of existing fields that have a fuzzy match with a desired field name
-            for e in existing_fields:
-                for d in desired_field_names:
-                    e_insensitive = e.casefold()
-                    d_insensitive = d.casefold()
-                    if e_insensitive[0:6] == d_insensitive[0:6]:
-                        field_names_list.append(e)
-        
-            # Create a sorted list so that fields can always be referenced in the same order             
-            field_names_list.sort() # Order should always be (case-insensitive): class, crop_type, field_id, gis_comments, region, study_area
-            
-            with arcpy.da.UpdateCursor(in_table = i, field_names = field_names_list) as cursor:
-                for row in cursor:
-                    if row[2] == int(earlier_field_id) and row[4] == region: # NOTE: conditional test will not work without int(); region used here because there's duplicated field_ids among different regions
-                        row[0] = class_value
-                        row[1] = crop_type
-                        row[5] = study_area
+# Create function returning dictionary with key: value pair as (FIELD_ID, REGION): (CLASS, CROP_TYPE, STUDY_AREA, comment), with None for values to leave unchanged,
+# of the single feature given by tool parameters or, in batch mode, of each row of the Edit List (a later row replaces an earlier row with the same FIELD_ID and REGION)
+def read_edits():
+
+    if not edit_list:
+        return {(int(earlier_field_id), region): (class_value, crop_type, study_area, gis_comment)}
+
+    edits = {}
+    with open(edit_list, newline = '') as f:
+        for row in csv.DictReader(f):
+            # Match column names case-insensitively and ignore surrounding spaces
+            row = {k.strip().upper(): (v.strip() if v and v.strip() else None) for k, v in row.items() if k}
+            key = (int(float(row['FIELD_ID'])), row['REGION'])
+            if key in edits:
+                arcpy.AddWarning('Edit List has more than one row for FIELD_ID ' + str(key[0]) + ' in region ' + str(key[1]) + '; the last row is used')
+            edits[key] = (row.get('CLASS'), row.get('CROP_TYPE'), row.get('STUDY_AREA'), row.get('COMMENT'))
+
+    return edits
+
+# Create function updating features of feature class whose (FIELD_ID, REGION) is a key of edits in one update cursor pass; returns set of keys matched
+def update_feature_class(feature_class, edits):
+    
+    # Create list of uniform attribute table field names of which the like will be searched for 
+    desired_field_names = ['FIELD_ID', 'CLASS', 'CROP_TYPE', 'STUDY_AREA', 'GIS_COMMENTS', 'REGION']
+
+    # Clear selection of Feature Class
+    arcpy.SelectLayerByAttribute_management(in_layer_or_view = feature_class, selection_type = 'CLEAR_SELECTION')
+    
+    # Create a list of existing fields that have a fuzzy match with a desired field name
+    field_names_list = [e.name for e in arcpy.ListFields(dataset = feature_class) for d in desired_field_names if e.name.casefold()[0:6] == d.casefold()[0:6]]
+
+    # Create a sorted list so that fields can always be referenced in the same order             
+    field_names_list.sort(key = str.casefold) # Order should always be (case-insensitive): class, crop_type, field_id, gis_comments, region, study_area
+    
+    # Create list of (OID, FIELD_ID, field, previous value, new value) of each change made, for the Change Journal
+    changes = []
+
+    matched_keys = set()
+    try:
+        with arcpy.da.UpdateCursor(in_table = feature_class, field_names = field_names_list + ['OID@']) as cursor:
+            for row in cursor:
+                key = (None if row[2] is None else int(row[2]), row[4]) # NOTE: int() needed to match FIELD_ID; region used here because there's duplicated field_ids among different regions
+                if key in edits:
+                    previous_row = list(row)
+                    new_class, new_crop_type, new_study_area, comment = edits[key]
+                    if new_class is not None:
+                        row[0] = new_class
+                    if new_crop_type is not None:
+                        row[1] = new_crop_type
+                    if new_study_area is not None:
+                        row[5] = new_study_area
+                    if comment is not None:
                         if not row[3] or str(row[3]).strip() == '':
-                            row[3] = gis_comment
+                            row[3] = comment
                         else:
-                            row[3] = str(row[3]) + '; ' + gis_comment
-                        cursor.updateRow(row)
+                            row[3] = str(row[3]) + '; ' + comment
+                    cursor.updateRow(row)
+                    matched_keys.add(key)
+                    changes += [(row[-1], row[2], field_names_list[f], previous_row[f], row[f]) for f in [0, 1, 3, 5] if str(previous_row[f]) != str(row[f])]
+    finally:
+        # Record changes made, even if the update stopped part way, so they can be undone
+        record_changes(dataset = feature_class, changes = changes, tool = '0.60_Update_Field_Values')
+
+    return matched_keys
+
+def update_feature(edits):
+    
+    matched_keys = set()
+
+    # Iterate through all Earlier Feature Classes
+    for i in earlier_feature_classes.split(";"): 
+        feature_class_matched_keys = update_feature_class(feature_class = i, edits = edits)
+        matched_keys |= feature_class_matched_keys
+        if edit_list:
+            arcpy.AddMessage('Updated ' + str(len(feature_class_matched_keys)) + ' of ' + str(len(edits)) + ' FIELD_IDs of Edit List within ' + str(i))
+        elif feature_class_matched_keys:
             arcpy.AddMessage('Updated feature with FIELD_ID: ' + str(earlier_field_id) + ' within ' + str(i))     
+
+    return matched_keys
+
+#----------------------------------------------
+
+# 3. Report FIELD_ID and REGION pairs of edits not found in any feature class
+
+def report_unmatched(edits, matched_keys):
+    unmatched_keys = sorted(set(edits) - matched_keys, key = str)
+    if unmatched_keys:
+        arcpy.AddWarning('No feature found for ' + str(len(unmatched_keys)) + ' FIELD_ID and REGION pair(s): ' + ', '.join(str(k[0]) + ' (' + str(k[1]) + ')' for k in unmatched_keys))
             
 #----------------------------------------------
 
 # Call functions; catch and handle a Runtime Error of "Cannot acquire a lock" if feature class is open
+
+# Test that the parameters of the single feature to update are given if no Edit List is (as they are optional in the tool so that an Edit List can be given instead)
+if not edit_list:
+    missing_parameters = [n for n, v in [('Earlier FIELD_ID', earlier_field_id), ('Class', class_value), ('Crop Type', crop_type), ('Study Area', study_area), ('GIS Comment', gis_comment), ('Region', region)] if not v]
+    if missing_parameters:
+        arcpy.AddError('Please provide an Edit List or, to update a single feature, a value for: ' + ', '.join(missing_parameters))
+        sys.exit(0)
             
+try:
+    edits = read_edits()
+except (KeyError, ValueError) as e:
+    arcpy.AddError('Edit List must have columns FIELD_ID, REGION, CLASS, CROP_TYPE, STUDY_AREA, and comment, with a FIELD_ID in each row: ' + str(e))
+    sys.exit(0)
+
 try:
     check_duplicate_id()
-    update_feature()
+    matched_keys = update_feature(edits = edits)
+    report_unmatched(edits = edits, matched_keys = matched_keys)
 except RuntimeError as e:
     arcpy.AddError(e)
-    arcpy.AddMessage('Please close feature classes and re-run tool.')
\ No newline at end of file
+    arcpy.AddMessage('Please close feature classes and re-run tool.')
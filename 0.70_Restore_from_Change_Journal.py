@@ -0,0 +1,90 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             0.70_Restore_from_Change_Journal.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         ArcGIS Pro, pandas
+
+# Notes:            This script is intended to be used for a Script Tool within ArcGIS Pro; it is not intended as a stand-alone script.
+
+# Description:      This tool restores a feature class to its attribute table values (and geometry) at a point in time, from the Change Journal recorded by the tools that edit field borders in place
+#                   (0.50, 0.51, 0.60, 1.10, 3.00, and 4.00; see change_journal.py), rather than from a full backup copy. Only features and fields changed since that time are written back,
+#                   and the restore is itself recorded in the Change Journal, so it can in turn be undone. Optionally, it only lists the changes that would be undone.
+
+#----------------------------------------------------------------------------------------------
+
+# Tool setup:       The script tool's properties can be set as follows:
+#                      Parameters tab:
+#                           Feature Class:              Feature Layer (Data Type) > Required (Type) > Input (Direction)
+#                           Restore To:                 Date (Data Type) > Required (Type) > Input (Direction)
+#                           Change Journal:             File (Data Type) > Optional (Type) > Input (Direction) > File Filter: sqlite (default: change_journal.sqlite beside the feature class's geodatabase)
+#                           Preview Only:               Boolean (Data Type) > Optional (Type) > Input (Direction) > Default: unchecked
+
+###############################################################################################
+###############################################################################################
+
+# This script will:
+
+# 0. Set-up
+# 1. Summarize changes recorded in the Change Journal since Restore To, by tool and field
+# 2. Restore values at Restore To of each feature and field changed since (unless Preview Only is checked)
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import arcpy, sys
+from change_journal import journal_path, read_changes, restore
+
+# 0.1 Read in tool parameters
+
+# User selects Feature Class to restore
+feature_class = arcpy.GetParameterAsText(0)
+
+# User selects date and time to restore Feature Class to (as a datetime)
+point_in_time = arcpy.GetParameter(1)
+
+if not point_in_time:
+    arcpy.AddError('Please provide a Restore To date and time')
+    sys.exit(0)
+
+# User optionally selects Change Journal
+change_journal = arcpy.GetParameterAsText(2) or journal_path(feature_class)
+
+# User checks box for whether only to list changes that would be undone
+preview_only = arcpy.GetParameterAsText(3) == 'true'
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Summarize changes recorded in the Change Journal since Restore To, by tool and field
+
+df_changes = read_changes(dataset = feature_class, point_in_time = point_in_time, journal = change_journal)
+
+if df_changes.empty:
+    arcpy.AddMessage('No changes to ' + feature_class + ' recorded in ' + change_journal + ' since ' + str(point_in_time))
+    sys.exit(0)
+
+df_summary = df_changes.groupby(['timestamp', 'tool', 'field']).size().reset_index(name = 'changes')
+for row in df_summary.itertuples(index = False):
+    arcpy.AddMessage(row.timestamp + '  ' + str(row.tool) + '  ' + row.field + ': ' + str(row.changes) + ' changes')
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Restore values at Restore To of each feature and field changed since (unless Preview Only is checked)
+
+if preview_only:
+    arcpy.AddMessage('Preview only: ' + feature_class + ' was not modified')
+    sys.exit(0)
+
+try:
+    restored_values = restore(dataset = feature_class, point_in_time = point_in_time, tool = '0.70_Restore_from_Change_Journal', journal = change_journal)
+except RuntimeError:
+    arcpy.AddError('Please close ' + feature_class + ' and re-run tool')
+    sys.exit(0)
+else:
+    arcpy.AddMessage('Restored ' + str(restored_values) + ' values of ' + feature_class + ' to ' + str(point_in_time))
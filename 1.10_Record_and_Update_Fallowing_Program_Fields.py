@@ -5,7 +5,7 @@
 # Name:             1.10_Record_and_Update_Fallowing_Program_Fields.py
 # Author:           Kelly Meehan, USBR
 # Created:          20190826
-# Updated:          20200608 
+# Updated:          20261019
 # Version:          Created using Python 3.6.8 
 
 # Requires:         Pyhton 3.x
@@ -67,17 +67,21 @@
 # This script will:
 
 # 0. Set-up
-# 1. Create a backup copy of Field Borders Feature Class
-# 2. Subset Field Borders Feature Class by the User-drawn Feature Set
-# 3. Create table showing which fields to change back to fallow (1430) later in Final Label
-# 4. Clear Field Borders Feature Class attribute table fields CLASS and Crop_Type for Program Fallow Fields that were marked as fallow during ground truth 
+# 1. Subset Field Borders Feature Class by the User-drawn Feature Set (features with their center in it, found through the spatial index) as a set of FIELD_IDs of Program Fallow Fields
+# 2. Create table showing which fields to change back to fallow (1430) later in Final Label
+# 3. Find Program Fallow Fields that were marked as fallow during ground truth, reading the features of the User-drawn Feature Set once
+# 4. Clear Field Borders Feature Class attribute table fields CLASS and Crop_Type for Program Fallow Fields that were marked as fallow during ground truth,
+#    recording previous and new values of the features changed in the Change Journal (see change_journal.py; restore with Tool 0.70)
 
 #----------------------------------------------------------------------------------------------
 
 # 0. Set-up
 
 # 0.0 Install necessary packages
-import arcpy, os, sys
+import arcpy, numpy, os, sys
+from change_journal import journal_path, record_changes
+from crop_catalogue import fallow_crop_code
+from field_id_index import check_duplicate_field_ids, format_duplicates
 
 # 0.1 Assign variables to tool parameters
 
@@ -93,28 +97,30 @@ gdb_path = arcpy.GetParameterAsText(2)
 # 0.2 Set environment settings
 
 # Set overwrite permissions to true in case user reruns tool (and redraws aoi)
-arcpy.env.overwriteOuptut = True
+arcpy.env.overwriteOutput = True
 
 #----------------------------------------------------------------------------------------------
 
-# 1. Create a backup copy of Field Borders Feature Class in case anything goes awtry
+# 1. Subset Field Borders Feature Class by the User-drawn Feature Set
 
 region_and_time = os.path.basename(field_borders_feature_class)
 
-field_borders_copy = os.path.join(gdb_path, region_and_time + '_Backup')
-
-arcpy.CopyFeatures_management(in_features = field_borders_feature_class, out_feature_class = field_borders_copy)
-
-#----------------------------------------------------------------------------------------------
-
-# 2. Subset Field Borders Feature Class by the User-drawn Feature Set
-
 fallowing_program_fields = os.path.join(gdb_path, region_and_time + '_Fallowing_Program_Fields')
 
+# Add spatial index if missing (e.g. shapefiles), so that the location selection only tests features whose extent is near the Feature Set
+if not arcpy.Describe(field_borders_feature_class).hasSpatialIndex:
+    arcpy.AddSpatialIndex_management(in_features = field_borders_feature_class)
+
 selection_layer = arcpy.SelectLayerByLocation_management(in_layer = field_borders_feature_class, overlap_type = 'HAVE_THEIR_CENTER_IN', select_features = aoi_polygon) 
 
-# Create list of FIELD_IDs of Program Fallow Fields
-program_fields_list = [row[0] for row in arcpy.da.SearchCursor(in_table = selection_layer, field_names = 'FIELD_ID')]
+# Create set of FIELD_IDs of Program Fallow Fields
+program_field_ids = {row[0] for row in arcpy.da.SearchCursor(in_table = selection_layer, field_names = 'FIELD_ID')}
+
+# Test for duplicate FIELD_ID among Program Fallow Fields, as the Fallowing Table lists each FIELD_ID but only features in the User-drawn Feature Set are updated in step 4
+duplicates = check_duplicate_field_ids(feature_class = field_borders_feature_class)
+duplicates = duplicates[numpy.isin(duplicates['FIELD_ID'], list(program_field_ids))]
+if len(duplicates):
+    arcpy.AddWarning('Duplicate FIELD_ID values of Fallowing Program Fields in ' + field_borders_feature_class + ' found were: ' + ', '.join(format_duplicates(duplicates)))
 
 arcpy.CopyFeatures_management(in_features = selection_layer, out_feature_class = fallowing_program_fields)
 
@@ -122,32 +128,56 @@ arcpy.AddMessage('Generated feature class: ' + fallowing_program_fields)
 
 #----------------------------------------------------------------------------------------------
 
-# 3. Create table showing which fields to change back to fallow (1430) later in Final Label
+# 2. Create table showing which fields to change back to fallow (1430) later in Final Label
 
 fallowing_program_table = region_and_time + '_Fallowing_Table'
 
 arcpy.TableToTable_conversion(in_rows = fallowing_program_fields, out_path = gdb_path, out_name = fallowing_program_table)
 
-arcpy.AddMessage('Created table: ' + fallowing_program_table + 'in: ' + gdb_path)
+arcpy.AddMessage('Created table: ' + fallowing_program_table + ' in: ' + gdb_path)
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Find Program Fallow Fields that were marked as fallow during ground truth, reading the features of the User-drawn Feature Set once
+
+# Read only the selected features (those with their center in the User-drawn Feature Set), so features elsewhere sharing a FIELD_ID are left untouched
+field_array = arcpy.da.FeatureClassToNumPyArray(in_table = selection_layer, field_names = ['OID@', 'FIELD_ID', 'CLASS', 'Crop_Type'], skip_nulls = False, null_value = -9999)
+
+# Features with CLASS of 0 or 1 and Crop_Type of 1403 (fallow)
+program_fallow = numpy.isin(field_array['CLASS'], [0, 1]) & (field_array['Crop_Type'] == fallow_crop_code)
+changed_rows = field_array[program_fallow]
 
 #----------------------------------------------------------------------------------------------
 
 # 4. Clear Field Borders Feature Class attribute table fields CLASS and Crop_Type for Program Fallow Fields that were marked as fallow during ground truth 
 
+# Update only the features found in step 3, selected by OID from the feature class's path (so the update does not depend on the layer selection)
+field_borders_path = arcpy.Describe(field_borders_feature_class).catalogPath
+changed_oids = set(changed_rows['OID@'].tolist())
+oids = sorted(changed_oids)
+
+# Create list of (OID, FIELD_ID, field, previous value, new value) of each change made, for the Change Journal
+changes = []
+
 try:
-    with arcpy.da.UpdateCursor(in_table = field_borders_feature_class, field_names = ['CLASS', 'Crop_Type', 'FIELD_ID']) as cursor:
-        for row in cursor:
-            if row[0] == 1 or row[0] == 0:
-                if row[1] == 1403 and row[2] in program_fields_list:
-            #if row[0] == 1 and row[1] == 1403 and row[2] in program_fields_list:
-                    row[0] = 0
+    # Update features in chunks of OIDs so where clauses stay within database limits on IN lists
+    for c in range(0, len(oids), 1000):
+        SQL_clause = """{} IN ({})""".format(arcpy.AddFieldDelimiters(field_borders_path, arcpy.Describe(field_borders_path).OIDFieldName), ', '.join(str(o) for o in oids[c:c + 1000]))
+        with arcpy.da.UpdateCursor(in_table = field_borders_path, field_names = ['OID@', 'CLASS', 'Crop_Type', 'FIELD_ID'], where_clause = SQL_clause) as cursor:
+            for row in cursor:
+                if row[0] in changed_oids:
+                    previous_class, previous_crop_type = row[1], row[2]
                     row[1] = 0
-            cursor.updateRow(row)
+                    row[2] = 0
+                    cursor.updateRow(row)
+                    changes += [(row[0], row[3], 'CLASS', previous_class, 0), (row[0], row[3], 'Crop_Type', previous_crop_type, 0)]
 except RuntimeError:
-    arcpy.AddError('Please close ' + field_borders_feature_class + 'and ru-run tool')
+    arcpy.AddError('Please close ' + field_borders_feature_class + ' and re-run tool')
     sys.exit(0) 
 else:
-    arcpy.AddMessage('Set Field Border Feature Class attribute table fields CLASS and Crop_Type to 0 for the following Fallowing Program Fields: ' + str(program_fields_list))
-
-
-
+    arcpy.AddMessage('Set Field Border Feature Class attribute table fields CLASS and Crop_Type to 0 for ' + str(len(changed_oids)) + ' features of the following Fallowing Program Fields: ' + str(sorted(set(changed_rows['FIELD_ID'].tolist()))))
+finally:
+    # Record changes made, even if the tool stopped part way, so they can be undone
+    if changes:
+        record_changes(dataset = field_borders_path, changes = changes, tool = '1.10_Record_and_Update_Fallowing_Program_Fields')
+        arcpy.AddMessage('Recorded ' + str(len(changes)) + ' changes in Change Journal: ' + journal_path(field_borders_path))
@@ -5,20 +5,23 @@
 # Name:             2.00_Prepare_Feature_Class_for_Accuracy_Assessment_Selection.py
 # Author:           JM and modified by TW and KM, USBR
 # Created:          
-# Updated:          20200601 
+# Updated:          20261019
 # Version:          Created using Python 3.6.8 
 
-# Requires:         ArcGIS Pro 
+# Requires:         ArcGIS Pro, numpy
 
 # Notes:            This script is intended to be used for a Script Tool within ArcGIS Pro; it is not intended as a stand-alone script.
 
 # Description:      This tool identifies fields that can be used as either training points or accuracy assessment points for the classification.
+#                   Attribute table fields are read once into arrays, the criteria are evaluated as boolean masks over all fields at once, and EXTRAFIELD and aa are written in one bulk operation;
+#                   optionally, as a dry run, it only reports the number of fields meeting each criterion without modifying the feature class.
 
 #----------------------------------------------------------------------------------------------
 
 # Tool setup:       The script tool's properties can be set as follows: 
 #                      Parameters tab:    
 #                           Field Borders Feature Class:    Feature Layer (Data Type) > Required (Type) > Input (Direction)
+#                           Dry Run:                        Boolean (Data Type) > Optional (Type) > Input (Direction)
 
 ###############################################################################################
 ###############################################################################################
@@ -26,90 +29,102 @@
 # This script will:
 
 # 0. Set-up
-# 1. Add new attribute table field EXTRAFIELD
-# 2. Populate a value of 1 for this attribute table field, EXTRAFIELD, for records meeting either one of the following two criteria:
-    # a) CLASS == 0 AND CROP_PCT > 0 AND Crop_Type != 0
-    # b) CLASS == 0 AND CROP_PCT == 0 AND Crop_Type == 1403
-# 3. Add new attribute table fields aa and aa_domain
-# 4. Populate the aa field with a value of 1 for records meeting either one of the following two criteria:
-    # a) CLASS == 1 AND Crop_Type != 0
-    # b) EXTRAFIELD == 1
+# 1. Read CLASS, CROP_PCT, Crop_Type, and GROWTH_STA of all fields in one pass
+# 2. Find records with EXTRAFIELD value of 1, meeting either one of the following two criteria:
+    # a) CLASS == 0 AND CROP_PCT > 0 AND Crop_Type != 0 AND GROWTH_STA > 0
+    # b) CLASS == 0 AND CROP_PCT == 0 (or <NULL>) AND Crop_Type == 1403
+# 3. Find records with aa value of 1, meeting any one of the following three criteria:
+    # a) CLASS == 1 AND Crop_Type != 0 AND CROP_PCT is not <NULL> AND GROWTH_STA != 0
+    # b) CLASS == 1 AND Crop_Type == 1403
+    # c) EXTRAFIELD == 1
+# 4. Report number of records meeting each criterion (and stop if Dry Run is checked)
+# 5. Replace attribute table fields EXTRAFIELD, aa, and aa_domain, writing EXTRAFIELD and aa in one bulk operation
 
 #----------------------------------------------------------------------------------------------
 
 # 0. Set-up
 
 # 0.0 Install necessary packages
-import arcpy
+import arcpy, numpy, sys
+from crop_catalogue import fallow_crop_code
 
 # 0.1 Read in tool parameters
 
 # User selects Field Borders Feature Class 
 field_borders_feature_class = arcpy.GetParameterAsText(0)
 
+# User checks box for whether only to report number of records meeting each criterion, without modifying Field Borders Feature Class
+dry_run = arcpy.GetParameterAsText(1) == 'true'
+
 # 0.2 Set environment settings
 
 # Set overwrite permissions to true in case user reruns tool (and redraws aoi)
-arcpy.env.overwriteOuptut = True
+arcpy.env.overwriteOutput = True
 
 #----------------------------------------------------------------------------------------------
 
-# 1. Add three new fields: EXTRAFIELD, aa, and aa_domain
+# 1. Read CLASS, CROP_PCT, Crop_Type, and GROWTH_STA of all fields in one pass
 
-new_fields = ['EXTRAFIELD', 'aa', 'aa_domain']
+# <NULL> Crop_Type and GROWTH_STA are read as 0; <NULL> CLASS and CROP_PCT as -9999, so that <NULL> CROP_PCT can be told apart from 0
+field_array = arcpy.da.FeatureClassToNumPyArray(in_table = field_borders_feature_class, field_names = ['OID@', 'CLASS', 'CROP_PCT', 'Crop_Type', 'GROWTH_STA'], skip_nulls = False,
+                                                null_value = {'CLASS': -9999, 'CROP_PCT': -9999, 'Crop_Type': 0, 'GROWTH_STA': 0})
 
-existing_fields = [field.name for field in arcpy.ListFields(field_borders_feature_class)] 
+class_value = field_array['CLASS']
+crop_type = field_array['Crop_Type']
+crop_pct_null = field_array['CROP_PCT'] == -9999
 
-for i in new_fields:
-    if i in existing_fields:
-        arcpy.DeleteField_management(in_table = field_borders_feature_class, drop_field = i)
-    arcpy.AddField_management(in_table = field_borders_feature_class, field_name = i, field_type = 'SHORT')
+# Truncate CROP_PCT and GROWTH_STA to integers, as with int(), so that e.g. CROP_PCT of 0.5 is not greater than 0
+crop_pct = numpy.trunc(numpy.where(crop_pct_null, 0, field_array['CROP_PCT']))
+growth_stage = numpy.trunc(field_array['GROWTH_STA'])
 
-#----------------------------------------------
+#----------------------------------------------------------------------------------------------
 
-# 2. Populate a value of 1 for this new field, ‘EXTRAFIELD’, for records meeting either one of the following two criteria:
-    # a) CLASS == 0 AND CROP_PCT > 0 AND Crop_Type != 0 AND GROWTH_STA > 0
-    # b) CLASS == 0 AND CROP_PCT == 0 AND Crop_Type == 14.03
-    
-fields = ['CLASS', 'CROP_PCT', 'EXTRAFIELD', 'Crop_Type', 'GROWTH_STA']
-
-with arcpy.da.UpdateCursor(in_table = field_borders_feature_class, field_names = fields) as cursor:
-    for row in cursor:
-        # Note: int(0 if row[1] is None else row[1])) > 0 means: if CROP_PCT is <NULL> (None), return 0, otherwise return the value of CROP_PCT as an interger
-        if (row[0] == 0 and int(0 if row[1] is None else row[1]) > 0 and int(0 if row[3] is None else row[3]) != 0 and int(0 if row[4] is None else row[4]) > 0) : 
-            row[2] = 1
-        
-        elif (row[0] == 0 and (row[1] is None or row[1] == 0) and row[3] == 1403):
-            row[2] = 1
-        # Otherwise, assign EXTRAFIELD a value of 0
-        else:
-            row[2] = 0
-        cursor.updateRow(row)
-
-#----------------------------------------------
-
-# 4. Populate the aa field with a value of 1 for records meeting either one of the following two criteria:
-    # a) CLASS == 1 AND Crop_Type != 0 AND CROP_PCT != 0 AND GROWTH_STA != 0
-    # b) CLASS == 1 AND Crop_Type == 1403
-    # b) EXTRAFIELD == 1
-    
-field_list = ['CLASS', 'EXTRAFIELD', 'aa', 'Crop_Type', 'CROP_PCT', 'GROWTH_STA',]
-with arcpy.da.UpdateCursor(in_table = field_borders_feature_class, field_names = field_list) as cursor:
-    for row in cursor:
-        # if CLASS == 1 and Crop_Type != 0 
-        if (row[0] == 1 and int(0 if row[3] is None else row[3]) != 0 and row[4] is not None and int(0 if row[5] is None else row[5]) != 0):
-            # set aa = 1
-            row[2] = 1
-        # if CLASS == 1 AND Crop_Type == 1403
-        elif (row[0] == 1 and row[3] == 1403):
-             # set aa = 1
-            row[2] = 1
-        # if EXTRAFIELD == 1, set aa = 1 (already checked for Crop_Type != 0 above)
-        elif (row[1] == 1):
-             # set aa = 1
-            row[2] = 1
-        cursor.updateRow(row)
+# 2. Find records with EXTRAFIELD value of 1
+
+# Create dictionary with key: value pair as criterion: boolean mask of records meeting it
+extrafield_rules = {'EXTRAFIELD a) CLASS == 0 AND CROP_PCT > 0 AND Crop_Type != 0 AND GROWTH_STA > 0': (class_value == 0) & (crop_pct > 0) & (crop_type != 0) & (growth_stage > 0),
+                    'EXTRAFIELD b) CLASS == 0 AND CROP_PCT == 0 AND Crop_Type == 1403': (class_value == 0) & (crop_pct_null | (field_array['CROP_PCT'] == 0)) & (crop_type == fallow_crop_code)}
+
+extrafield = numpy.logical_or.reduce(list(extrafield_rules.values()))
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Find records with aa value of 1
+
+aa_rules = {'aa a) CLASS == 1 AND Crop_Type != 0 AND CROP_PCT is not <NULL> AND GROWTH_STA != 0': (class_value == 1) & (crop_type != 0) & ~crop_pct_null & (growth_stage != 0),
+            'aa b) CLASS == 1 AND Crop_Type == 1403': (class_value == 1) & (crop_type == fallow_crop_code),
+            'aa c) EXTRAFIELD == 1': extrafield}
+
+aa = numpy.logical_or.reduce(list(aa_rules.values()))
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Report number of records meeting each criterion (and stop if Dry Run is checked)
+
+for rule, mask in list(extrafield_rules.items()) + list(aa_rules.items()):
+    arcpy.AddMessage(rule + ': ' + str(int(mask.sum())) + ' records')
+arcpy.AddMessage('EXTRAFIELD = 1: ' + str(int(extrafield.sum())) + ' records; aa = 1: ' + str(int(aa.sum())) + ' of ' + str(len(field_array)) + ' records')
+
+if dry_run:
+    arcpy.AddMessage('Dry run: ' + field_borders_feature_class + ' was not modified')
+    sys.exit(0)
+
+#----------------------------------------------------------------------------------------------
+
+# 5. Replace attribute table fields EXTRAFIELD, aa, and aa_domain, writing EXTRAFIELD and aa in one bulk operation
+
+new_fields = ['EXTRAFIELD', 'aa', 'aa_domain']
 
+# Delete any pre-existing fields in one schema change
+delete_fields_list = [f.name for f in arcpy.ListFields(dataset = field_borders_feature_class) if f.name in new_fields]
+if delete_fields_list:
+    arcpy.DeleteField_management(in_table = field_borders_feature_class, drop_field = delete_fields_list)
 
+# Add and populate EXTRAFIELD and aa (SHORT, i.e. 16 bit integers; 0 where criteria are not met) matched by OID
+flag_array = numpy.rec.fromarrays([field_array['OID@'], extrafield.astype(numpy.int16), aa.astype(numpy.int16)], names = ['FLAG_OID', 'EXTRAFIELD', 'aa'])
+arcpy.da.ExtendTable(in_table = field_borders_feature_class, table_match_field = arcpy.Describe(field_borders_feature_class).OIDFieldName, in_array = flag_array, array_match_field = 'FLAG_OID')
 
+# Add aa_domain, to be populated by Tool 3.00
+arcpy.AddField_management(in_table = field_borders_feature_class, field_name = 'aa_domain', field_type = 'SHORT')
 
+arcpy.AddMessage('Populated EXTRAFIELD and aa of ' + field_borders_feature_class)
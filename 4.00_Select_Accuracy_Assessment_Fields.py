@@ -0,0 +1,139 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             4.00_Select_Accuracy_Assessment_Fields.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         ArcGIS Pro, numpy
+
+# Notes:            This script is intended to be used for a Script Tool within ArcGIS Pro; it is not intended as a stand-alone script.
+
+# Description:      This tool selects accuracy assessment fields (aa = 2) from fields available for training or accuracy assessment (aa = 1 or 2, as populated by Tool 2.00) with an aa_domain (Tool 3.00),
+#                   as a stratified random sample by aa_domain; the sample is allocated among domains in proportion to their number of fields or acreage, and drawn with a seed so it can be reproduced.
+#                   Fields not sampled are set to aa = 1 (training), so re-running the tool replaces rather than adds to a previous sample. Run before Tool 5.00, which splits fields on aa.
+#                   All fields of the feature class are sampled, even if a layer with a selection is given. Only fields whose aa changes are written, and each change is recorded in the Change Journal.
+
+#----------------------------------------------------------------------------------------------
+
+# Tool setup:       The script tool's properties can be set as follows:
+#
+#                      Parameters tab:
+#                           Field Borders Feature Class     Feature Layer (Data Type) > Required (Type) > Input (Direction)
+#                           Sample Percentage               Double (Data Type) > Required (Type) > Input (Direction) > Range 0-100 (Filter) > Default: 30
+#                           Allocation                      String (Data Type) > Optional (Type) > Input (Direction) > Value List Filter: Proportional, Acreage Weighted > Default: Proportional
+#                           Random Seed                     Long (Data Type) > Optional (Type) > Input (Direction) > Default: 0
+#                           Minimum Fields per Domain       Long (Data Type) > Optional (Type) > Input (Direction) > Default: 1
+#                           Allocation Table                Table (Data Type) > Optional (Type) > Output (Direction)
+
+###############################################################################################
+###############################################################################################
+
+# This script will:
+
+# 0. Set-up
+# 1. Read FIELD_ID, aa, aa_domain, and ACRES of all fields in one pass
+# 2. Draw stratified random sample of fields by aa_domain
+# 3. Write aa (2 for sampled fields, 1 for other candidate fields) of fields whose aa changed
+# 4. Write allocation of sample among aa_domains to Allocation Table
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import arcpy, numpy, sys
+from aa_sampling import stratified_sample
+from change_journal import record_changes
+from classified_sweep import write_table
+
+#--------------------------------------------
+
+# 0.1 Read in tool parameters
+
+# User selects Field Borders Feature Class
+field_borders_feature_class = arcpy.GetParameterAsText(0)
+
+# User selects percentage of candidate fields to select as accuracy assessment fields
+sample_percentage = float(arcpy.GetParameterAsText(1))
+
+# User selects how sample is allocated among aa_domains: Proportional (to number of fields) or Acreage Weighted
+allocation_method = arcpy.GetParameterAsText(2) or 'Proportional'
+
+# User selects random seed (same seed and fields give the same sample)
+random_seed = int(arcpy.GetParameterAsText(3) or 0)
+
+# User selects minimum number of fields to sample from each aa_domain
+min_per_domain = int(arcpy.GetParameterAsText(4) or 1)
+
+# User optionally names Allocation Table
+allocation_table = arcpy.GetParameterAsText(5)
+
+# 0.2 Set environment settings
+arcpy.env.overwriteOutput = True
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Read FIELD_ID, aa, aa_domain, and ACRES of all fields in one pass
+
+# Read from the feature class itself (not a layer of it), so a selection on the layer does not leave fields out of the sample
+field_borders_path = arcpy.Describe(field_borders_feature_class).catalogPath
+
+field_array = arcpy.da.FeatureClassToNumPyArray(in_table = field_borders_path, field_names = ['OID@', 'FIELD_ID', 'aa', 'aa_domain', 'ACRES'], skip_nulls = False, null_value = 0)
+
+# Candidates are fields available for training or accuracy assessment that have an aa_domain
+candidates = numpy.isin(field_array['aa'], [1, 2]) & (field_array['aa_domain'] > 0)
+
+if not candidates.any():
+    arcpy.AddError('No fields with aa value of 1 or 2 and an aa_domain value in ' + field_borders_feature_class + '; please run Tools 2.00 and 3.00')
+    sys.exit(0)
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Draw stratified random sample of fields by aa_domain
+
+sample_size = int(round(candidates.sum() * sample_percentage / 100))
+
+sampled, summary = stratified_sample(strata = field_array['aa_domain'][candidates], sample_size = sample_size, acres = field_array['ACRES'][candidates], allocation_method = allocation_method, seed = random_seed, min_per_stratum = min_per_domain)
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Write aa (2 for sampled fields, 1 for other candidate fields) of fields whose aa changed
+
+# Create dictionary with key: value pair as OID: new aa, of candidate fields whose aa changed (fields that are not candidates, including those with <NULL> aa, are not written)
+aa = numpy.where(sampled, 2, 1)
+changed = aa != field_array['aa'][candidates]
+oid_aa = dict(zip(field_array['OID@'][candidates][changed].tolist(), aa[changed].tolist()))
+oids = sorted(oid_aa)
+
+# Create list of (OID, FIELD_ID, field, previous value, new value) of each change made, recorded in the Change Journal (see change_journal.py) even if the update stops part way, so a sample can be undone with Tool 0.70
+changes = []
+
+try:
+    try:
+        # Update fields in chunks of OIDs so where clauses stay within database limits on IN lists
+        for c in range(0, len(oids), 1000):
+            SQL_clause = """{} IN ({})""".format(arcpy.AddFieldDelimiters(field_borders_path, arcpy.Describe(field_borders_path).OIDFieldName), ', '.join(str(o) for o in oids[c:c + 1000]))
+            with arcpy.da.UpdateCursor(in_table = field_borders_path, field_names = ['OID@', 'aa', 'FIELD_ID'], where_clause = SQL_clause) as cursor:
+                for row in cursor:
+                    changes.append((row[0], row[2], 'aa', row[1], oid_aa[row[0]]))
+                    row[1] = oid_aa[row[0]]
+                    cursor.updateRow(row)
+    finally:
+        record_changes(dataset = field_borders_path, changes = changes, tool = '4.00_Select_Accuracy_Assessment_Fields')
+except RuntimeError:
+    arcpy.AddError('Please close ' + field_borders_feature_class + ' and re-run tool')
+    sys.exit(0)
+
+arcpy.AddMessage('Selected ' + str(int(sampled.sum())) + ' of ' + str(int(candidates.sum())) + ' candidate fields (' + str(len(summary)) + ' aa_domains) as accuracy assessment fields (aa = 2), with ' + allocation_method + ' allocation and random seed ' + str(random_seed))
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Write allocation of sample among aa_domains to Allocation Table
+
+if allocation_table:
+    summary_array = numpy.rec.fromarrays([summary['STRATUM'].astype(numpy.int32), summary['FIELDS'], summary['ACRES'], summary['SAMPLED'], summary['SAMP_ACRES']], names = ['aa_domain', 'FIELDS', 'ACRES', 'SAMPLED', 'SAMP_ACRES'])
+    write_table(in_array = summary_array, out_table = allocation_table)
+    arcpy.AddMessage('Generated Allocation Table: ' + allocation_table)
@@ -5,14 +5,14 @@
 # Name:             7.05_Prepare_Training_and_Accuracy_Fields_for_Pro_Classification.py 
 # Author:           Kelly Meehan, USBR
 # Created:          20201216
-# Updated:          20210216 
+# Updated:          20261019
 # Version:          Created using Python 3.6.8 
 
-# Requires:         ArcGIS Pro 
+# Requires:         ArcGIS Pro, numpy
 
 # Notes:            This script is intended to be used for a Script Tool within ArcGIS Pro; it is not intended as a stand-alone script.
 
-# Description:      Add two attribute table fields required for both Pro classification and accuracy assessment: classvalue (identical to existing crop_type) and classname (corresponding to crop_type numerical value).
+# Description:      Add two attribute table fields required for both Pro classification and accuracy assessment: classvalue (identical to existing crop_type) and classname (corresponding to crop_type numerical value in the crop catalogue of crop_catalogue.py).
 
 ###############################################################################################
 ###############################################################################################
@@ -20,15 +20,15 @@
 # This script will:
 
 # 0. Set-up
-# 1. Create dictionary as lookup table for crop numerical value to crop type name
-# 2. Add necessary attribute table fields, classvalue and classname to both Training Fields Shapefile and Accuracy Fields Shapefile
+# 1. Add necessary attribute table fields, classvalue and classname to both Training Fields Shapefile and Accuracy Fields Shapefile
 
 #----------------------------------------------------------------------------------------------
 
 # 0. Set-up
 
 # 0.0 Install necessary packages
-import arcpy
+import arcpy, numpy
+from crop_catalogue import crop_names, known_crop_codes
 
 #--------------------------------------------
 
@@ -42,22 +42,11 @@ accuracy_fields = arcpy.GetParameterAsText(1)
 
 #----------------------------------------------------------------------------------------------
 
-# 1. Create dictionary as lookup table for crop numerical value to crop type name
+# 1. Add necessary attribute table fields, classvalue and classname to both Training Fields Shapefile and Accuracy Fields Shapefile
 
-# Create list of all possible crop numbers
-crop_code = [100, 200, 400, 401, 402, 403, 404, 405, 500, 501, 502, 503, 600, 601, 602, 603, 604, 605, 606, 700, 701, 702, 703, 704, 705, 706, 800, 801, 802, 803, 804, 806, 1000, 1100, 1103, 1104, 1200, 1201, 1202, 1203, 1204, 1205, 1206, 1207, 1208, 1209, 1300, 1301, 1302, 1303, 1304, 1305, 1306, 1400, 1402, 1403, 1600, 1601, 1602, 1603, 1604, 1800, 1801, 1802, 1803, 1804, 1805, 1806, 1807, 1808, 1809, 1900, 1901, 1902, 1903, 1904, 2000, 2001, 2100, 3400, 3401, 3402, 3403, 3404]
-
-# Create list of all crop names in corresponding order to crop_code
-crop_name = ['Alfalfa', 'Cotton', 'Small Grains', 'Oats', 'Rye', 'Barley', 'Millet', 'Wheat', 'Field Grain', 'Corn', 'Sorghum', 'Milo', 'Lettuce', 'Head Lettuce', 'Green Leaf Lettuce', 'Red Leaf Lettuce', 'Spinach', 'Other Lettuce', 'Chard', 'Melons', 'Watermelon', 'Honeydew', 'Cantaloupe', 'Squash', 'Strawberries', 'Cucumbers', 'Bermuda/Rye', 'Bermuda', 'Bermuda with Rye', 'Klein', 'Timothy', 'Fallowed Bermuda', 'Tomatoes', 'Sudan', 'Sesbania', 'Clover', 'Legume', 'Green Beans', 'Dry Beans', 'Garbonzo Beans', 'Peas', 'Peanuts', 'Peppers', 'Potatoes', 'Egglant', 'Okra', 'Crucifers', 'Broccoli', 'Cauliflower', 'Cabbage', 'Boy-choy', 'Mustard', 'Kale', 'Fallow', 'Fallow', 'Fallow', 'Oil Crops', 'Safflower', 'Canola', 'Sunflower', 'Sesame', 'Small Vegetables', 'Carrots', 'Cilantro', 'Celery', 'Garlic', 'Onions', 'Scallions', 'Parsley', 'Radishes', 'Commercial Flowers', 'Root Vegetables', 'Beets', 'Parsnip', 'Turnip and Rutabaga', 'Chard', 'Perennial Vegetables', 'Artichokes', 'Sugar Beets', 'Miscellaneous Herbs', 'Anise', 'Mint', 'Basil', 'Other Herb']
-
-# Create dictionary with key: value pair as crop_code: crop_name
-crop_dictionary = dict(zip(crop_code, crop_name))
-
-#----------------------------------------------------------------------------------------------
-
-# 2. Add necessary attribute table fields, classvalue and classname to both Training Fields Shapefile and Accuracy Fields Shapefile
-
-# Create function to add attribute table fields classvalue and classname, and setting their values equal to crop_type, and the corresponding crop_name in crop_dictionary
+# Create function to add attribute table fields classvalue and classname, and setting their values equal to crop_type, and the corresponding crop name in the crop catalogue (see crop_catalogue.py):
+#   crop_type of all fields is read in one pass and mapped to crop names in one vectorized pass; fields with a crop_type not in the crop catalogue are given classname Unknown <crop_type> (Unknown if <NULL>)
+#   and reported, rather than stopping the tool part way. Returns dictionary with key: value pair as unknown crop_type: number of fields
 def add_classvalue_classname(feature_class_updating):
 
     # Add two new attribute table fields: classvalue and classsname
@@ -68,21 +57,31 @@ def add_classvalue_classname(feature_class_updating):
     if not arcpy.ListFields(dataset = feature_class_updating, wild_card = 'classname'):
         arcpy.AddField_management(in_table = feature_class_updating, field_name = 'classname', field_type = 'TEXT')
     
-    # Copy attribute table field, Crop_Type values to new column classname
-    arcpy.CalculateField_management(in_table = feature_class_updating, field = 'classvalue', expression = '!crop_type!', expression_type = 'PYTHON3')
-    
-    # Populate classname attribute table field values using key: value in dictionary
-    with arcpy.da.UpdateCursor(feature_class_updating, ['classvalue', 'classname']) as cursor:
+    field_array = arcpy.da.FeatureClassToNumPyArray(in_table = feature_class_updating, field_names = ['OID@', 'crop_type'], skip_nulls = False, null_value = -9999)
+
+    # Map crop_type to crop name, naming unknown crop types by their value
+    crop_types = field_array['crop_type'].astype(numpy.int64)
+    class_names = crop_names(crop_types = crop_types)
+    unknown = ~known_crop_codes(crop_types = crop_types)
+    class_names[unknown] = ['Unknown' if c == -9999 else 'Unknown ' + str(c) for c in crop_types[unknown].tolist()]
+
+    # Create dictionary with key: value pair as OID: (classvalue, classname)
+    oid_classes = dict(zip(field_array['OID@'].tolist(), zip([None if c == -9999 else c for c in crop_types.tolist()], class_names.tolist())))
+
+    # Populate classvalue (copy of crop_type) and classname in one update cursor pass
+    with arcpy.da.UpdateCursor(feature_class_updating, ['OID@', 'classvalue', 'classname']) as cursor:
         for row in cursor:
-            x = row[0]
-            row[1] = crop_dictionary[x]          
+            row[1], row[2] = oid_classes[row[0]]
             cursor.updateRow(row)
 
-# Run function for Training Fields Shapefile
-add_classvalue_classname(feature_class_updating = training_fields)
+    unknown_codes, unknown_counts = numpy.unique(crop_types[unknown], return_counts = True)
+    return dict(zip(unknown_codes.tolist(), unknown_counts.tolist()))
 
-# Run function for Accuracy Assessment Shapefile
-add_classvalue_classname(feature_class_updating = accuracy_fields)
+for feature_class in [training_fields, accuracy_fields]:
+    unknown_crop_types = add_classvalue_classname(feature_class_updating = feature_class)
+    if unknown_crop_types:
+        arcpy.AddWarning(feature_class + ' has fields with a crop_type not in the crop catalogue (crop_type: number of fields), given classname Unknown <crop_type>: ' + ', '.join(('<NULL>' if c == -9999 else str(c)) + ': ' + str(n) for c, n in unknown_crop_types.items()))
+    arcpy.AddMessage('Populated classvalue and classname of ' + feature_class)
 
 #----------------------------------------------------------------------------------------------
 
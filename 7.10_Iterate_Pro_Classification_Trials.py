@@ -5,7 +5,7 @@
 # Name:             7.10_Iterate_Pro_Classification_Trials.py 
 # Author:           Kelly Meehan, USBR
 # Created:          20201216
-# Updated:          20210217 
+# Updated:          20261019 
 # Version:          Created using Python 3.6.8 
 
 # Requires:         ArcGIS Pro 
@@ -27,6 +27,11 @@
 #                           Geodatabase                     Workspace (Data Type) > Required (Type) > Input (Direction)
 #                           Training Fields Shapefile       Feature Class (Data Type) > Required (Type) > Input (Direction)
 #                           Accuracy Fields Shapefile       Feature Class (Data Type) > Required (Type) > Input (Direction)
+#                           Classifier Backend              String (Data Type) > Optional (Type) > Input (Direction) > Value List Filter: ArcGIS, scikit-learn > Default: ArcGIS
+#                           Number of Cores                 Long (Data Type) > Optional (Type) > Input (Direction) > Default: -1 (all cores; used by scikit-learn Random Trees)
+#                           Parameter Grid File             File (Data Type) > Optional (Type) > Input (Direction) > File Filter: json, yaml, yml (see parameter_grid.py for format; default grid used if blank)
+#                           Dry Run                         Boolean (Data Type) > Optional (Type) > Input (Direction) > Default: unchecked
+#                           Segmentation Storage            String (Data Type) > Optional (Type) > Input (Direction) > Value List Filter: Mean Color Raster, Segment Labels > Default: Mean Color Raster
 
 ###############################################################################################
 ###############################################################################################
@@ -34,11 +39,16 @@
 # This script will:
 
 # 0. Set-up
-# 1. Create list of tuples for all combinations of OBIA attributes to iterate through (NOTE: MEAN and SD not included as no auxilary raster used) 
-# 2. Create list of combinations of segmentation arguments to iterate through
-# 3. Generate Segmentation Rasters
-# 4. Run SVM classifications
-# 6. Run iterations of Random Trees classifier over all unique classifier attributes (called Segment Attributes in Pro Tool GUI)
+# 1. Read Parameter Grid File and create list of trials (segmentation arguments, classifier, and OBIA attributes) to iterate through (NOTE: MEAN and SD not included as no auxilary raster used) 
+# 2. If Dry Run, report number of trials and estimated cost from Trial Ledger and exit
+# 3. Generate Segmentation Rasters (or compact segment ID rasters and per-segment mean color tables, from which mean color rasters are rebuilt only when needed)
+# 4. Extract segment attributes (COLOR, COUNT, COMPACTNESS, RECTANGULARITY) once per segmented raster into a per-segment feature matrix
+# 5. Create function to run Support Vector Machine classifications
+# 6. Create function to run Maximum Likelihood classifications
+# 7. Create function to run Random Trees classifications
+# 8. Create function to run classifications with the scikit-learn backend, trained on column slices of the per-segment feature matrix
+# 9. Iterate through segmented rasters (extracting segment attributes once, for the scikit-learn backend) and run the classifiers and classifier attributes (called Segment Attributes in Pro Tool GUI) of each trial
+# 10. Generate accuracy assessment summary table for each of the three classifiers
 
 #----------------------------------------------------------------------------------------------
 
@@ -46,8 +56,12 @@
 
 # 0.0 Install necessary packages
 
-import arcpy, itertools, os, pandas, re
-from arcpy.sa import SegmentMeanShift, TrainSupportVectorMachineClassifier, TrainRandomTreesClassifier, TrainMaximumLikelihoodClassifier, ClassifyRaster
+import arcpy, numpy, os, pandas, re, sys
+from arcpy.sa import SegmentMeanShift, ComputeSegmentAttributes, TrainSupportVectorMachineClassifier, TrainRandomTreesClassifier, TrainMaximumLikelihoodClassifier, ClassifyRaster
+from trial_ledger import create_ledger, create_run_id, record_stage
+from parameter_grid import build_trials, estimate_cost, load_grid_spec, trials_by_segmentation
+from segment_attributes import attribute_columns, compute_segment_attributes, label_segments, load_segment_attributes, save_segment_attributes
+from segment_cache import iterate_blocks, load_segment_means, mean_color_block, mean_color_nodata_value, save_segment_means, segment_means
 
 #--------------------------------------------
 
@@ -77,6 +91,25 @@ training_fields = arcpy.GetParameterAsText(6)
 # User selects Accuracy Fields Shapefile
 accuracy_fields = arcpy.GetParameterAsText(7)
 
+# User selects Classifier Backend: ArcGIS (Train * Classifier tools writing .ecd files) or scikit-learn (in-memory models trained on per-segment feature matrices)
+classifier_backend = arcpy.GetParameterAsText(8) or 'ArcGIS'
+
+# User selects Number of Cores used to train Random Trees with the scikit-learn backend (-1 uses all cores)
+number_of_cores = int(arcpy.GetParameterAsText(9) or -1)
+
+# Import scikit-learn backend only if selected, as ArcGIS backend does not require it
+if classifier_backend == 'scikit-learn':
+    from segment_classifiers import classify_segment_block, predict_segments, train_classifier
+
+# User optionally selects Parameter Grid File (JSON or YAML) of segmentation arguments, classifiers, and classifier attributes to iterate through
+parameter_grid_file = arcpy.GetParameterAsText(10)
+
+# User selects whether to only report number of trials and estimated cost (Dry Run) rather than run them
+dry_run = arcpy.GetParameterAsText(11) == 'true'
+
+# User selects Segmentation Storage: Mean Color Raster (3-band output of Segment Mean Shift saved for every segmentation) or Segment Labels (compressed 32-bit segment ID raster plus per-segment mean color table; mean color raster written only if an ArcGIS classifier needs it, and deleted once that segmentation's trials have run)
+segmentation_storage = arcpy.GetParameterAsText(12) or 'Mean Color Raster'
+
 #--------------------------------------------
 
 # 0.2 Set environment settings
@@ -87,62 +120,144 @@ arcpy.env.overwriteOutput = True
 # 0.3 Check out Spatial Analyst Extension
 arcpy.CheckOutExtension('Spatial')
 
+# 0.4 Create Trial Ledger (SQLite database in Documents Directory) recording wall time, CPU time, peak memory, and input/output bytes of every stage (summarize with Tool 7.11)
+trial_ledger = create_ledger(os.path.join(docs_path, 'trial_ledger.sqlite'))
+run_id = create_run_id()
+arcpy.AddMessage('Recording stages of run ' + run_id + ' in Trial Ledger: ' + trial_ledger)
+
 #----------------------------------------------------------------------------------------------
 
-# 1. Create list of tuples for all combinations of classifier OBIA attributes to iterate through (NOTE: MEAN and SD not included as no auxilary raster used) 
+# 1. Read Parameter Grid File and create list of trials (segmentation arguments, classifier, and OBIA attributes) to iterate through (NOTE: MEAN and SD not included as no auxilary raster used) 
 
-# Create list of all attributes to include, save for color
-classifier_attributes = ['COUNT', 'COMPACTNESS', 'RECTANGULARITY']
+# Read grid spec (default grid of spectral detail, spatial detail, minimum segment size, band indexes, and classifier attributes if no Parameter Grid File selected) and create list of trials,
+# each a tuple of (segmentation arguments, classifier string, classifier attributes string), e.g. (('5', '10', '20', '2 3 4'), 'svm', 'COUNT;COLOR'); report an invalid Parameter Grid File and exit
+try:
+    grid_spec = load_grid_spec(grid_file = parameter_grid_file)
+    trials_list = build_trials(grid_spec = grid_spec)
+except ValueError as e:
+    arcpy.AddError(str(e))
+    sys.exit(0)
 
-# Create list of all possible combinations with three attributes
-unique_classifier_attributes = []
-for l in range(1, len(classifier_attributes)+1):
-    for subset in itertools.combinations(classifier_attributes, l):
-        unique_classifier_attributes.append(subset)
+# Create dictionary with key: value pair as band indexes passed to Segment Mean Shift: band indexes used in file names
+bands_indexes_dictionary = grid_spec['segmentation']['band_indexes']
 
-# Convert list of tuples to list of strings of attributes joined by semicolons
-unique_classifier_attributes_list = [';'.join(w) for w in unique_classifier_attributes]
+# Create dictionary with key: value pair as segmentation arguments: list of (classifier string, classifier attributes string) to run on rasters segmented with those arguments
+trials_dictionary = trials_by_segmentation(trials = trials_list)
 
-# Add Color attribute to each element in list to ensure it's use in every iteration
-unique_classifier_attributes_list = [s + ';COLOR' for s in unique_classifier_attributes_list]
-unique_classifier_attributes_list.insert(0, 'COLOR')
+# Create list of unique segmentation arguments (only those used by at least one trial)
+unique_segmentation_arguments_list = list(trials_dictionary.keys())
 
 #----------------------------------------------------------------------------------------------
 
-# 2. Create list of combinations of segmentation arguments to iterate through
-     
-# Create list of spectral detail arguments to iterate through and pass to spectral detail parameter
-spectral_detail_list = ['5', '10', '15', '20']
+# 2. If Dry Run, report number of trials and estimated cost from Trial Ledger and exit
 
-# Create list of spatial detail arguments to iterate through and pass to spatial detail parameter
-spatial_detail_list = ['5', '10', '15', '20']
+arcpy.AddMessage(str(len(trials_list)) + ' trials over ' + str(len(unique_segmentation_arguments_list)) + ' segmentations (each of Fields Borders and Training Fields Subset Rasters)')
 
-# Create list of minimum segment size arguments to iterate through and pass to maximum segment size parameter
-min_segment_size_list = ['10', '20', '30']
+if dry_run:
+    total_seconds, stage_seconds = estimate_cost(trials = trials_list, ledger_path = trial_ledger, band_indexes_dictionary = bands_indexes_dictionary, classifier_backend = classifier_backend)
+    for stage, seconds in stage_seconds.items():
+        if seconds is None:
+            arcpy.AddWarning('No timings of ' + stage + ' stage in Trial Ledger; estimate excludes it')
+        else:
+            arcpy.AddMessage('Estimated ' + stage + ' time: ' + str(round(seconds / 3600, 2)) + ' hours')
+    arcpy.AddMessage('Estimated total time: ' + str(round(total_seconds / 3600, 2)) + ' hours')
+    sys.exit(0)
 
-# Create list of band selection arguments to iterate through and pass to band indexes parameter
-bands_indexes_dictionary = {'2 3 4': '234', '3 4 5': '345'} # Landsat-7 download with bands 1-5, 7 or Landsat-8 with bands 2-7 downloaded 
-#bands_indexes_dictionary = {'2 3 7': '237', '3 7 9': '379'} # Sentinel-2 download with bands 2-8, 10-12 downloaded
-band_indexes_list = list(bands_indexes_dictionary.keys())
-
-# Create list of all parameters iterating through in Segment Mean Shift function
-parameters_master_list = [spectral_detail_list, spatial_detail_list, min_segment_size_list, band_indexes_list]
+#----------------------------------------------------------------------------------------------
 
-# Create one master list of tuples, each of which is a unique combination of the four individual segmentation parameter lists unpacked
-unique_segmentation_arguments_list = list(itertools.product(*parameters_master_list))
+# 3. Generate Segmentation Rasters (or compact segment ID rasters and per-segment mean color tables, from which mean color rasters are rebuilt only when needed)
 
-#----------------------------------------------------------------------------------------------
+# NOTE: with Segment Labels storage, segmented raster paths below are still used as names (of classified rasters, definition files, and Trial Ledger stages) but the mean color raster itself only exists once materialized
 
-# 3. Generate Segmentation Rasters
-segmented_rasters_list = glob.glob(str(img_path) + '/*fields*.tif')
 segmented_rasters_list = []
 
+# Create dictionary with key: value pair as segmented raster: segmentation arguments tuple (used to look up trials of segmented raster)
+segmentation_arguments_dictionary = {}
+
+# Create dictionary with key: value pair as segmented raster: segmentation parameters (recorded in Trial Ledger for every stage using that segmented raster)
+segmentation_parameters_dictionary = {}
+
+# Create dictionary with key: value pair as classified raster (normalized path): trial parameters (recorded in Trial Ledger for the assess stage of that classified raster)
+classified_raster_parameters_dictionary = {}
+
+# Create function returning parameters of a trial (segmentation parameters, classifier, and classifier attributes) to record in Trial Ledger
+def trial_parameters(segmented_raster, classifier_string = None, classifier_attributes = None):
+    parameters = dict(segmentation_parameters_dictionary.get(segmented_raster, {}))
+    if classifier_string:
+        parameters.update({'classifier': classifier_string, 'classifier_attributes': classifier_attributes, 'classifier_backend': classifier_backend})
+    return parameters
+
+# Create function returning parameters of the trial that generated a classified raster (classifier only if unknown, e.g. raster not generated by this run)
+def classified_raster_parameters(classified_raster, classifier_string):
+    return classified_raster_parameters_dictionary.get(os.path.normcase(os.path.abspath(str(classified_raster))), {'classifier': classifier_string})
+
+# Create function returning segment ID raster and mean color table file stored alongside (or instead of) a segmented raster
+def segment_label_files(segmented_raster):
+    return os.path.splitext(segmented_raster)[0] + '_segment_ids.tif', os.path.splitext(segmented_raster)[0] + '_segment_means.npz'
+
+# Create function to save segment ID raster (the index raster output by Compute Segment Attributes) as a compressed 32-bit unsigned GeoTIFF
+def save_segment_id_raster(segmented_raster, segment_id_raster):
+    arcpy.env.compression = 'LZW'
+    arcpy.CopyRaster_management(in_raster = ComputeSegmentAttributes(in_segmented_raster = segmented_raster, used_attributes = 'COUNT'), out_rasterdataset = segment_id_raster, pixel_type = '32_BIT_UNSIGNED')
+    arcpy.ClearEnvironment('compression')
+
+# Create function to save segment ID raster and per-segment mean color table of a segmented raster (in place of the mean color raster)
+def save_segment_labels(segmented_raster, segment_id_raster, segment_means_file):
+    save_segment_id_raster(segmented_raster = segmented_raster, segment_id_raster = segment_id_raster)
+    segment_ids, means = segment_means(segment_array = arcpy.RasterToNumPyArray(in_raster = segment_id_raster, nodata_to_value = 0), band_array = arcpy.RasterToNumPyArray(in_raster = segmented_raster))
+    save_segment_means(segment_means_file, segment_ids, means)
+
+# Create function to write a raster block by block from a segment ID raster, so the full raster is never held in memory
+#   block_function maps a block of segment IDs to a 2D block (one band) or a 3D (band, row, column) block, with nodata_value where there is no segment (and nowhere else)
+def write_segment_blocks(segment_id_raster, block_function, output_raster, pixel_type, number_of_bands = 1, nodata_value = 0):
+    
+    describe = arcpy.Describe(segment_id_raster)
+    cell_width = describe.meanCellWidth
+    cell_height = describe.meanCellHeight
+    block_rasters = []
+    
+    for row, column, block_rows, block_columns in iterate_blocks(rows = describe.height, columns = describe.width):
+        lower_left_corner = arcpy.Point(describe.extent.XMin + column * cell_width, describe.extent.YMax - (row + block_rows) * cell_height)
+        segment_block = arcpy.RasterToNumPyArray(in_raster = segment_id_raster, lower_left_corner = lower_left_corner, ncols = block_columns, nrows = block_rows, nodata_to_value = 0)
+        block_raster = os.path.splitext(output_raster)[0] + '_block_' + str(len(block_rasters)) + '.tif'
+        arcpy.NumPyArrayToRaster(in_array = block_function(segment_block), lower_left_corner = lower_left_corner, x_cell_size = cell_width, y_cell_size = cell_height, value_to_nodata = nodata_value).save(block_raster)
+        block_rasters.append(block_raster)
+    
+    # Mosaic blocks into output raster and delete blocks
+    arcpy.MosaicToNewRaster_management(input_rasters = block_rasters, output_location = os.path.dirname(output_raster), raster_dataset_name_with_extension = os.path.basename(output_raster), coordinate_system_for_the_raster = describe.spatialReference, pixel_type = pixel_type, number_of_bands = number_of_bands)
+    for b in block_rasters:
+        arcpy.Delete_management(in_data = b)
+    
+    # Set NoData value of every band of output raster to that of the blocks
+    arcpy.SetRasterProperties_management(in_raster = output_raster, nodata = ';'.join(str(b) + ' ' + str(nodata_value) for b in range(1, number_of_bands + 1)))
+
+# Create set of mean color rasters materialized from Segment Labels by this run (deleted once all trials of their segmentation have run)
+materialized_rasters = set()
+
+# Create function to write the mean color raster of a segmentation saved as Segment Labels, if it does not already exist (needed by the ArcGIS Train * Classifier and Classify Raster tools, or to view)
+def materialize_mean_color_raster(segmented_raster):
+    
+    if arcpy.Exists(segmented_raster):
+        return segmented_raster
+    
+    segment_id_raster, segment_means_file = segment_label_files(segmented_raster)
+    with record_stage(trial_ledger, run_id, 'materialize', segmented_raster, parameters = trial_parameters(segmented_raster), inputs = [segment_id_raster, segment_means_file], outputs = [segmented_raster]):
+        segment_ids, means = load_segment_means(segment_means_file)
+        
+        # Write NoData as a value no segment has as a band mean (so a band mean of 0 is kept), widening to 16 bits if every 8-bit value is a band mean
+        pixel_type = '8_BIT_UNSIGNED'
+        nodata_value = mean_color_nodata_value(means)
+        if nodata_value is None:
+            means, nodata_value, pixel_type = means.astype(numpy.uint16), 65535, '16_BIT_UNSIGNED'
+        
+        write_segment_blocks(segment_id_raster = segment_id_raster, block_function = lambda b: mean_color_block(segment_block = b, segment_ids = segment_ids, means = means, nodata_value = nodata_value), output_raster = segmented_raster, pixel_type = pixel_type, number_of_bands = means.shape[1], nodata_value = nodata_value)
+    materialized_rasters.add(segmented_raster)
+    
+    return segmented_raster
+
 # Generate function to iterate through the following layers: segmentation, classifier, and classifier attributes 
 def generate_segmentation_rasters(raster_to_segment, spectral, spatial, size, bands):
     
-    # Generate segmented raster
-    segmented_raster = SegmentMeanShift(in_raster = raster_to_segment, spectral_detail = spectral, spatial_detail = spatial, min_segment_size = size, band_indexes = bands)
-    
     #segmented_raster_name = os.path.basename(raster_to_segment).split(sep = '.', maxsplit = 1)[0]
 
     raster_basename = os.path.basename(raster_to_segment).rsplit(sep = '_', maxsplit = 1)[0]
@@ -151,8 +266,19 @@ def generate_segmentation_rasters(raster_to_segment, spectral, spatial, size, ba
     output_segmented_raster_name = raster_basename + '_' + segment_attributes_string + '.tif'
     output_segmented_raster = os.path.join(img_path, output_segmented_raster_name)
     
-    # Save segmented raster
-    segmented_raster.save(output_segmented_raster)
+    segmentation_arguments_dictionary[output_segmented_raster] = (spectral, spatial, size, bands)
+    segmentation_parameters_dictionary[output_segmented_raster] = {'spectral_detail': int(spectral), 'spatial_detail': int(spatial), 'min_segment_size': int(size), 'band_indexes': bands_indexes_dictionary[bands]}
+    
+    # Generate and save segmented raster (or its segment ID raster and mean color table)
+    if segmentation_storage == 'Segment Labels':
+        segment_id_raster, segment_means_file = segment_label_files(output_segmented_raster)
+        with record_stage(trial_ledger, run_id, 'segment', output_segmented_raster, parameters = trial_parameters(output_segmented_raster), inputs = [raster_to_segment], outputs = [segment_id_raster, segment_means_file]):
+            segmented_raster = SegmentMeanShift(in_raster = raster_to_segment, spectral_detail = spectral, spatial_detail = spatial, min_segment_size = size, band_indexes = bands)
+            save_segment_labels(segmented_raster = segmented_raster, segment_id_raster = segment_id_raster, segment_means_file = segment_means_file)
+    else:
+        with record_stage(trial_ledger, run_id, 'segment', output_segmented_raster, parameters = trial_parameters(output_segmented_raster), inputs = [raster_to_segment], outputs = [output_segmented_raster]):
+            segmented_raster = SegmentMeanShift(in_raster = raster_to_segment, spectral_detail = spectral, spatial_detail = spatial, min_segment_size = size, band_indexes = bands)
+            segmented_raster.save(output_segmented_raster)
         
     # Add raster to list to iterate through later
     segmented_rasters_list.append(output_segmented_raster)   
@@ -163,17 +289,79 @@ def generate_segmentation_rasters(raster_to_segment, spectral, spatial, size, ba
     
     #arcpy.conversion.RasterToPolygon(in_raster = segmented_raster, out_polygon_features = segmented_polygons, simplify = 'NO_SIMPLIFY', create_multipart_features = 'SINGLE_OUTER_PART')
    
-# Create all possible combinations (based on given lists) of segmentations for Field Borders Subset Raster
+# Create all segmentations used by trials for Field Borders Subset Raster
 for i in unique_segmentation_arguments_list:
     generate_segmentation_rasters(fields_subset, *i)
 
-# Create all possible combinations (based on given lists) of segmentations for Training Fields Subset Raster 
+# Create all segmentations used by trials for Training Fields Subset Raster 
 for i in unique_segmentation_arguments_list:
     generate_segmentation_rasters(training_subset, *i)
     
 #----------------------------------------------------------------------------------------------
     
-# 4. Run iterations of Support Vector Machine classifications
+# 4. Extract segment attributes (COLOR, COUNT, COMPACTNESS, RECTANGULARITY) once per segmented raster into a per-segment feature matrix
+
+# NOTE: all four attribute families are computed in one pass and saved next to the segmented raster (*_attributes.npz), so every classifier and classifier attributes combination takes a column slice of the same feature matrix instead of recomputing them
+
+# Create dictionary with key: value pair as segmented raster: segment attributes file
+segment_attributes_dictionary = {}
+
+# Create function to compute the feature matrix and training label of each segment for a segmented raster
+def extract_segment_attributes(segmented_raster):
+    
+    segment_attributes_file = os.path.splitext(segmented_raster)[0] + '_attributes.npz'
+    segment_id_raster, segment_means_file = segment_label_files(segmented_raster)
+    segment_attributes_dictionary[segmented_raster] = segment_attributes_file
+    
+    # Segmentation stored as Segment Labels is read from its mean color table rather than a mean color raster
+    segmentation_file = segment_means_file if os.path.isfile(segment_means_file) else segmented_raster
+    
+    # Reuse segment attributes already extracted from this segmented raster (e.g. by a previous run of the tool)
+    if os.path.isfile(segment_attributes_file) and os.path.getmtime(segment_attributes_file) >= os.path.getmtime(segmentation_file) and arcpy.Exists(segment_id_raster):
+        return segment_attributes_file
+    
+    with record_stage(trial_ledger, run_id, 'extract', segment_attributes_file, parameters = trial_parameters(segmented_raster), inputs = [segmentation_file, training_fields], outputs = [segment_id_raster, segment_attributes_file]):
+        compute_and_save_segment_attributes(segmented_raster = segmented_raster, segment_id_raster = segment_id_raster, segment_attributes_file = segment_attributes_file)
+    
+    return segment_attributes_file
+
+# Create function to generate segment ID raster, feature matrix, and segment training labels of a segmented raster
+def compute_and_save_segment_attributes(segmented_raster, segment_id_raster, segment_attributes_file):
+    
+    segment_means_file = segment_label_files(segmented_raster)[1]
+    
+    # Generate and save segment ID raster (the index raster output by Compute Segment Attributes), used to write classified rasters with the scikit-learn backend (already saved with Segment Labels storage)
+    if not os.path.isfile(segment_means_file):
+        save_segment_id_raster(segmented_raster = segmented_raster, segment_id_raster = segment_id_raster)
+    
+    # Rasterize Training Fields Shapefile classvalue on the same grid as the segment ID raster
+    arcpy.env.snapRaster = segment_id_raster
+    arcpy.env.extent = segment_id_raster
+    training_class_raster = r'in_memory\training_class_raster'
+    arcpy.PolygonToRaster_conversion(in_features = training_fields, value_field = 'classvalue', out_rasterdataset = training_class_raster, cellsize = segment_id_raster)
+    arcpy.ClearEnvironment('snapRaster')
+    arcpy.ClearEnvironment('extent')
+    
+    # Read segment IDs, segment mean colors (rebuilt in memory from mean color table with Segment Labels storage), and training classes into numpy arrays
+    segment_array = arcpy.RasterToNumPyArray(in_raster = segment_id_raster, nodata_to_value = 0)
+    if os.path.isfile(segment_means_file):
+        segment_ids, means = load_segment_means(segment_means_file)
+        band_array = mean_color_block(segment_block = segment_array, segment_ids = segment_ids, means = means)
+    else:
+        band_array = arcpy.RasterToNumPyArray(in_raster = segmented_raster)
+    class_array = arcpy.RasterToNumPyArray(in_raster = training_class_raster, nodata_to_value = 0)
+    
+    # Compute feature matrix and label each segment with the majority class of its training pixels
+    segment_ids, feature_matrix, column_names = compute_segment_attributes(segment_array = segment_array, band_array = band_array)
+    labels = label_segments(segment_ids = segment_ids, segment_array = segment_array, class_array = class_array)
+    
+    save_segment_attributes(segment_attributes_file, segment_ids, feature_matrix, column_names, labels)
+    
+    arcpy.Delete_management(in_data = training_class_raster)
+
+#----------------------------------------------------------------------------------------------
+    
+# 5. Run iterations of Support Vector Machine classifications
 
 #REMOVE
 #arcpy.env.workspace = img_path
@@ -208,28 +396,20 @@ def iterate_svm_classifer(segmented_raster_classifying, classifier_attributes):
     definition_file_svm = os.path.join(img_path, definition_file_name_svm)
      
     # Run training
-    TrainSupportVectorMachineClassifier(in_raster = segmented_raster_classifying, in_training_features = training_fields, out_classifier_definition = definition_file_svm, max_samples_per_class = 0, used_attributes = classifier_attributes)
-    
-    # Run classification
-    classified_raster_svm = ClassifyRaster(in_raster = segmented_raster_classifying, in_classifier_definition = definition_file_svm)    
+    with record_stage(trial_ledger, run_id, 'train', definition_file_svm, parameters = trial_parameters(segmented_raster_classifying, 'svm', classifier_attributes), inputs = [segmented_raster_classifying, training_fields], outputs = [definition_file_svm]):
+        TrainSupportVectorMachineClassifier(in_raster = segmented_raster_classifying, in_training_features = training_fields, out_classifier_definition = definition_file_svm, max_samples_per_class = 0, used_attributes = classifier_attributes)
     
-    # Save classification output
+    # Run classification and save classification output
     classified_raster_name_svm = os.path.splitext(definition_file_svm)[0] + '.tif'
-    classified_raster_svm.save(classified_raster_name_svm)
+    with record_stage(trial_ledger, run_id, 'classify', classified_raster_name_svm, parameters = trial_parameters(segmented_raster_classifying, 'svm', classifier_attributes), inputs = [segmented_raster_classifying, definition_file_svm], outputs = [classified_raster_name_svm]):
+        classified_raster_svm = ClassifyRaster(in_raster = segmented_raster_classifying, in_classifier_definition = definition_file_svm)
+        classified_raster_svm.save(classified_raster_name_svm)
     classified_rasters_svm.append(classified_raster_svm)
-
-# Iterate through segmented rasters and then obia attribute combinations
-
-for s in segmented_rasters_list:
-    print(s)
-    
-    for o in unique_classifier_attributes_list:
-        print(o)
-        iterate_svm_classifer(segmented_raster_classifying = s, classifier_attributes = o)
+    classified_raster_parameters_dictionary[os.path.normcase(os.path.abspath(classified_raster_name_svm))] = trial_parameters(segmented_raster_classifying, 'svm', classifier_attributes)
 
 #----------------------------------------------------------------------------------------------
 
-# 5. Run iterations of Maximum Likelihood classifications
+# 6. Run iterations of Maximum Likelihood classifications
 
 classified_rasters_ml = []
 
@@ -244,30 +424,20 @@ def iterate_ml_classifier(segmented_raster_classifying, classifier_attributes):
     definition_file_ml = os.path.join(img_path, definition_file_ml)
      
     # Run training
-    TrainMaximumLikelihoodClassifier(in_raster = segmented_raster_classifying, in_training_features = training_fields, out_classifier_definition = definition_file_ml, used_attributes = classifier_attributes)
+    with record_stage(trial_ledger, run_id, 'train', definition_file_ml, parameters = trial_parameters(segmented_raster_classifying, 'ml', classifier_attributes), inputs = [segmented_raster_classifying, training_fields], outputs = [definition_file_ml]):
+        TrainMaximumLikelihoodClassifier(in_raster = segmented_raster_classifying, in_training_features = training_fields, out_classifier_definition = definition_file_ml, used_attributes = classifier_attributes)
     
-    # Run classification
-    classified_raster_ml = ClassifyRaster(in_raster = segmented_raster_classifying, in_classifier_definition = definition_file_ml)    
-    
-    # Save classification output
+    # Run classification and save classification output
     classified_raster_name_ml = os.path.splitext(definition_file_ml)[0] + '.tif'
-    classified_raster_ml.save(classified_raster_name_ml)
+    with record_stage(trial_ledger, run_id, 'classify', classified_raster_name_ml, parameters = trial_parameters(segmented_raster_classifying, 'ml', classifier_attributes), inputs = [segmented_raster_classifying, definition_file_ml], outputs = [classified_raster_name_ml]):
+        classified_raster_ml = ClassifyRaster(in_raster = segmented_raster_classifying, in_classifier_definition = definition_file_ml)
+        classified_raster_ml.save(classified_raster_name_ml)
     classified_rasters_ml.append(classified_raster_ml)
-
-    # Create 
-# Iterate through segmented rasters and then obia attribute combinations
-
-for l in segmented_rasters_list:
-    print(l)
-    
-    for c in unique_classifier_attributes_list:
-        print(c)
-        iterate_ml_classifier(segmented_raster_classifying = l, classifier_attributes = c)
+    classified_raster_parameters_dictionary[os.path.normcase(os.path.abspath(classified_raster_name_ml))] = trial_parameters(segmented_raster_classifying, 'ml', classifier_attributes)
 
 #----------------------------------------------------------------------------------------------
 
-
-# 6. Run Random Trees classifications
+# 7. Run Random Trees classifications
 
 classified_rasters_rt = []
 
@@ -283,28 +453,88 @@ def iterate_rt_classifier(segmented_raster_classifying, classifier_attributes):
     definition_file_rt = os.path.join(img_path, definition_file_rt)
      
     # Run training
-    TrainRandomTreesClassifier(in_raster = segmented_raster_classifying, in_training_features = training_fields, out_classifier_definition = definition_file_rt, used_attributes = classifier_attributes)
+    with record_stage(trial_ledger, run_id, 'train', definition_file_rt, parameters = trial_parameters(segmented_raster_classifying, 'rt', classifier_attributes), inputs = [segmented_raster_classifying, training_fields], outputs = [definition_file_rt]):
+        TrainRandomTreesClassifier(in_raster = segmented_raster_classifying, in_training_features = training_fields, out_classifier_definition = definition_file_rt, used_attributes = classifier_attributes)
     
-    # Run classification
-    classified_raster_rt = ClassifyRaster(in_raster = segmented_raster_classifying, in_classifier_definition = definition_file_rt)    
-    
-    # Save classification output
+    # Run classification and save classification output
     classified_raster_name_rt = os.path.splitext(definition_file_rt)[0] + '.tif'
-    classified_raster_rt.save(classified_raster_name_rt)
+    with record_stage(trial_ledger, run_id, 'classify', classified_raster_name_rt, parameters = trial_parameters(segmented_raster_classifying, 'rt', classifier_attributes), inputs = [segmented_raster_classifying, definition_file_rt], outputs = [classified_raster_name_rt]):
+        classified_raster_rt = ClassifyRaster(in_raster = segmented_raster_classifying, in_classifier_definition = definition_file_rt)
+        classified_raster_rt.save(classified_raster_name_rt)
     classified_rasters_rt.append(classified_raster_rt)
+    classified_raster_parameters_dictionary[os.path.normcase(os.path.abspath(classified_raster_name_rt))] = trial_parameters(segmented_raster_classifying, 'rt', classifier_attributes)
+
+#----------------------------------------------------------------------------------------------
+
+# 8. Run classifications with the scikit-learn backend, trained on column slices of the per-segment feature matrix
+
+# Create dictionary with key: value pair as classifier string: list of classified rasters
+classified_rasters_dictionary = {'svm': classified_rasters_svm, 'ml': classified_rasters_ml, 'rt': classified_rasters_rt}
 
-# Iterate through segmented rasters and then obia attribute combinations
+# Create function to write a classified raster (GeoTIFF) by predicting blocks of the segment ID raster, so the full raster is never held in memory
+def write_classified_raster(segment_id_raster, segment_ids, segment_classes, output_raster):
+    write_segment_blocks(segment_id_raster = segment_id_raster, block_function = lambda b: classify_segment_block(segment_block = b, segment_ids = segment_ids, segment_classes = segment_classes), output_raster = output_raster, pixel_type = '16_BIT_UNSIGNED')
 
-for r in segmented_rasters_list:
-    print(r)
+# Create dictionary with key: value pair as segment attributes file: loaded feature matrix (holding only the segmented raster currently being classified)
+loaded_segment_attributes = {}
+
+# Create function to train one classifier on the columns of the feature matrix selected by classifier attributes, and write the classified raster
+def iterate_sklearn_classifier(segmented_raster_classifying, classifier_attributes, classifier_string):
+    
+    raster_basename = os.path.splitext(segmented_raster_classifying)[0] 
+    classifier_attributes_name = classifier_attributes.replace(';', '_')
+    
+    # Load feature matrix of segmented raster only once (i.e. keep it in memory for all classifiers and classifier attribute combinations)
+    segment_attributes_file = segment_attributes_dictionary[segmented_raster_classifying]
+    if segment_attributes_file not in loaded_segment_attributes:
+        loaded_segment_attributes.clear()
+        loaded_segment_attributes[segment_attributes_file] = load_segment_attributes(segment_attributes_file)
+    segment_ids, feature_matrix, column_names, labels = loaded_segment_attributes[segment_attributes_file]
+    columns = attribute_columns(column_names = column_names, classifier_attributes = classifier_attributes)
+    
+    classified_raster_name = os.path.join(img_path, os.path.basename(raster_basename) + '_' + classifier_string + '_' + classifier_attributes_name + '.tif')
+    parameters = trial_parameters(segmented_raster_classifying, classifier_string, classifier_attributes)
+    
+    # Run training
+    with record_stage(trial_ledger, run_id, 'train', classified_raster_name, parameters = parameters, inputs = [segment_attributes_file]):
+        classifier = train_classifier(classifier_string = classifier_string, feature_matrix = feature_matrix, labels = labels, columns = columns, n_jobs = number_of_cores)
+    
+    # Run classification and save classification output
+    with record_stage(trial_ledger, run_id, 'classify', classified_raster_name, parameters = parameters, inputs = [raster_basename + '_segment_ids.tif'], outputs = [classified_raster_name]):
+        segment_classes = predict_segments(classifier = classifier, feature_matrix = feature_matrix, columns = columns)
+        write_classified_raster(segment_id_raster = raster_basename + '_segment_ids.tif', segment_ids = segment_ids, segment_classes = segment_classes, output_raster = classified_raster_name)
+    classified_rasters_dictionary[classifier_string].append(classified_raster_name)
+    classified_raster_parameters_dictionary[os.path.normcase(os.path.abspath(classified_raster_name))] = parameters
+
+#----------------------------------------------------------------------------------------------
+
+# 9. Iterate through segmented rasters, extracting segment attributes once (scikit-learn backend only, as the ArcGIS Train* tools compute their own), and then through the classifier and obia attribute combinations of each trial
+
+# Create dictionary with key: value pair as classifier string: ArcGIS backend function running that classifier
+arcgis_classifier_functions_dictionary = {'svm': iterate_svm_classifer, 'ml': iterate_ml_classifier, 'rt': iterate_rt_classifier}
+
+for s in segmented_rasters_list:
+    print(s)
+    
+    if classifier_backend == 'scikit-learn':
+        extract_segment_attributes(segmented_raster = s)
+    
+    for c, o in trials_dictionary[segmentation_arguments_dictionary[s]]:
+        print(c, o)
+        if classifier_backend == 'scikit-learn':
+            iterate_sklearn_classifier(segmented_raster_classifying = s, classifier_attributes = o, classifier_string = c)
+        else:
+            materialize_mean_color_raster(segmented_raster = s)
+            arcgis_classifier_functions_dictionary[c](segmented_raster_classifying = s, classifier_attributes = o)
     
-    for u in unique_classifier_attributes_list:
-        print(u)
-        iterate_rt_classifier(segmented_raster_classifying = r, classifier_attributes = u)
+    # Delete mean color raster materialized from Segment Labels once all trials of its segmentation have run (it can be rebuilt from the segment ID raster and mean color table)
+    if s in materialized_rasters:
+        arcpy.Delete_management(in_data = s)
+        materialized_rasters.discard(s)
 
 #----------------------------------------------------------------------------------------------
 
-# 7. Generate accuracy assessment summary table for each of the three classifiers
+# 10. Generate accuracy assessment summary table for each of the three classifiers
 
 # Create Accuracy Assessment Points with attribute table field GrndTruth populated with values from Accuracy Assessment Feature Class
 
@@ -326,11 +556,13 @@ def generate_master_accuracy_assessment(classified_raster_list, classifier_strin
         raster_name = os.path.splitext(raster_basename)[0]
         #accuracy_assessment_points_name = raster_basename.replace('fields', 'accuracy_assessment')
         accuracy_assessment_points = r'in_memory\accuracy_assessment_points' 
-        arcpy.sa.UpdateAccuracyAssessmentPoints(in_class_data = v, in_points = accuracy_points, out_points = accuracy_assessment_points, target_field = 'CLASSIFIED')
-        
-        # Create Confusion Matrix
         confusion_matrix_table = os.path.join(gdb_path, raster_name.replace('fields', 'accuracy_assessment'))
-        arcpy.sa.ComputeConfusionMatrix(in_accuracy_assessment_points = accuracy_assessment_points, out_confusion_matrix = confusion_matrix_table)
+        
+        with record_stage(trial_ledger, run_id, 'assess', confusion_matrix_table, parameters = classified_raster_parameters(classified_raster = v, classifier_string = classifier_string), inputs = [str(v), accuracy_points]):
+            arcpy.sa.UpdateAccuracyAssessmentPoints(in_class_data = v, in_points = accuracy_points, out_points = accuracy_assessment_points, target_field = 'CLASSIFIED')
+            
+            # Create Confusion Matrix
+            arcpy.sa.ComputeConfusionMatrix(in_accuracy_assessment_points = accuracy_assessment_points, out_confusion_matrix = confusion_matrix_table)
     
         # Get list of Pro confusion matrix column names
         confusion_matrix_fields = [field.name for field in arcpy.ListFields(dataset = confusion_matrix_table)]
@@ -0,0 +1,72 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             7.11_Summarize_Trial_Ledger.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         ArcGIS Pro
+
+# Notes:            This script is intended to be used for a Script Tool within ArcGIS Pro; it is not intended as a stand-alone script.
+
+# Description:      This tool summarizes the Trial Ledger written by Tool 7.10: the slowest stages (segment, extract, train, classify, assess)
+#                   and, for each stage, wall time per value of each trial parameter (cost curves), so the parameter grid can be pruned by cost as well as accuracy.
+
+#----------------------------------------------------------------------------------------------
+
+# Tool setup:       The script tool's properties can be set as follows:
+#
+#                      Parameters tab:
+#                           Trial Ledger                    File (Data Type) > Required (Type) > Input (Direction) > File Filter: sqlite
+#                           Number of Stages                Long (Data Type) > Optional (Type) > Input (Direction) > Default: 20
+#                           Run ID                          String (Data Type) > Optional (Type) > Input (Direction)
+#                           Summary Text File               File (Data Type) > Optional (Type) > Output (Direction)
+
+###############################################################################################
+###############################################################################################
+
+# This script will:
+
+# 0. Set-up
+# 1. Summarize slowest stages and per-parameter cost curves from Trial Ledger
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import arcpy
+from trial_ledger import format_summary, summarize_ledger
+
+#--------------------------------------------
+
+# 0.1 Read in tool parameters
+
+# User selects Trial Ledger (<Documents Directory>/trial_ledger.sqlite)
+trial_ledger = arcpy.GetParameterAsText(0)
+
+# User selects number of slowest stages to list
+number_of_stages = int(arcpy.GetParameterAsText(1) or 20)
+
+# User optionally restricts summary to a single run of Tool 7.10 (run ID is printed when Tool 7.10 starts)
+run_id = arcpy.GetParameterAsText(2)
+
+# User optionally provides text file to which summary is written
+summary_text_file = arcpy.GetParameterAsText(3)
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Summarize slowest stages and per-parameter cost curves from Trial Ledger
+
+slowest, cost_curves = summarize_ledger(ledger_path = trial_ledger, number_of_stages = number_of_stages, run_id = run_id)
+
+summary = format_summary(slowest, cost_curves)
+
+arcpy.AddMessage(summary)
+
+if summary_text_file:
+    with open(summary_text_file, 'w') as f:
+        f.write(summary)
+    arcpy.AddMessage('Wrote Trial Ledger summary: ' + summary_text_file)
@@ -5,7 +5,7 @@
 # Name:             7.50_Recode_through_BadLabel.py
 # Author:           Kelly Meehan, USBR
 # Created:          20180618
-# Updated:          20200825 
+# Updated:          20261019 
 # Version:          Created using Python 3.6.8 
 
 # Requires:         ArcGIS Pro 
@@ -27,6 +27,7 @@
 #                           Documents Directory             Workspace (Data Type) > Required (Type) > Input (Direction)                    
 #                           Geodatabase                     Workspace (Data Type) > Required (Type) > Input (Direction)
 #                           Iteration Number                String (Data Type) > Required (Type) > Input (Direction)
+#                           Materialize Label Shapefiles    Boolean (Data Type) > Optional (Type) > Input (Direction) > Default unchecked
 #
 #                       Validation tab:
 #
@@ -104,23 +105,19 @@
 # This script will:
 
 # 0. Set-up
-# 1. Make a copy of Classified Raster and save as Classified Tiff
-# 2. Delete attribute table field: Crop if already present in Classified Tiff
-# 3. Add attribute table field, Crop, to Classified Tiff
-# 4. Populate attribute table field, Crop, with extracted CROP_TYPE value from concatenated Signame 
-# 5. Reclassify Classified Tiff based on attribute table field, Crop
-# 6. In Edited Field Borders Shapefile attribute table field, MAJORITY, assign each field a classification value based on what the majority of pixels were assigned to  
-# 7. Create Label Shapefile, an exact copy of Edited Field Borders Shapefile
-# 8. Create two new fields: Crop_label and crop to Label Shapefile   
-# 9. Populate Label Shapefile attribute table fields, Crop_label and crop, to values of MAJORITY and CROP_TYPE, respectively
-# 10. Overwrite Label Shapefile attribute table field, Crop_label with known value, crop (i.e. CROP_TYPE) for known static ground truth fields ('CLASS' == 2)
-# 11. Create Label Frequency Table with sum acreage for fields aggregated by the unique combination of : CLASS, aa, crop, and Crop_label
-# 12. Convert Label Frequency Table to Excel table
-# 13. Rename MAJORITY attribute table field name to MAJORITY** in Edited Field Borders Shapefile, allowing subsequent iterations to reuse the name MAJORITY
-# 14. Create Bad Label Shapefile representing training fields misclassified
-# 15. Generate Label Shapefile that were training fields, regardless of whether classified correctly or not
-# 16. Cross-tabulate area of misclassified pixels by Signame and CROP_TYPE
-# 17. Generate Bad Signame Excel Workbook, a pivoted and manipulated version of Bad Signame Geodatabase Table
+# 1. Create lookup table of Classified Raster attribute table Value to CROP_TYPE value extracted from concatenated Signame 
+# 2. Rasterize feature IDs of Edited Field Borders Shapefile on the grid of Classified Raster
+# 3. In one pass over Classified Raster, count pixels of each Value per field and write Reclassified Raster (crop codes, via lookup table)
+# 4. Compute MAJORITY crop code of each FIELD_ID from pixel counts and write Zonal Statistics Majority Table and Class Fractions Table (top 3 crop codes, pixel fractions, and purity of each FIELD_ID)
+# 5. Delete pre-existing attribute table fields MAJORITY or MAJORITY** from Edited Field Borders Shapefile
+# 6. In Edited Field Borders Shapefile attribute table field, MAJORITY** (where ** corresponds to this iteration), assign each field a classification value based on what the majority of pixels were assigned to  
+# 7. Create Label Table (FIELD_ID, MAJORITY, Crop_label, and crop of each field, with Crop_label overwritten by crop for known static ground truth fields, 'CLASS' == 2) and save in Label Store
+# 8. Report fields whose Crop_label changed since the previous iteration, and acreage shift per crop
+# 9. If requested, materialize Label Shapefile, Bad Label Shapefile (training fields misclassified), and Training Label Shapefile
+# 10. Create Label Frequency Table with sum acreage for fields aggregated by the unique combination of : CLASS, aa, crop, and Crop_label
+# 11. Convert Label Frequency Table to Excel table
+# 12. Cross-tabulate area of misclassified pixels by Signame and CROP_TYPE
+# 13. Generate Bad Signame Excel Workbook, a pivoted and manipulated version of Bad Signame Geodatabase Table, from Iteration Store of all iterations
 
 #----------------------------------------------------------------------------------------------
 
@@ -128,8 +125,13 @@
 
 # 0.0 Install necessary packages
 
-import arcpy, os, pandas, re, sys, psutil, time
-from arcpy.sa import RemapValue, Reclassify, ZonalStatisticsAsTable, TabulateArea 
+import arcpy, numpy, os, sys, time
+from classified_sweep import field_class_counts, materialize_label_shapefiles, rasterize_feature_ids, sweep_classified_raster, write_table
+from crop_catalogue import known_crop_codes, signame_crop_code
+from iteration_store import export_workbook, file_is_locked, import_workbook, iteration_store_path, save_iteration
+from label_store import bad_mask, compare_labels, create_labels, label_frequency, label_store_path, load_labels, previous_labels_path, save_labels, training_mask
+from signature_analytics import count_above, default_sweep_thresholds, index_signature_table, score_signatures, sweep_thresholds, write_removal_criteria, write_sweep
+from zonal_tables import apply_lookup_table, compile_lookup_table, crosstabulate, lookup_table, tabulate_area, zonal_majority, zonal_top_classes
 
 #--------------------------------------------
 
@@ -156,6 +158,9 @@ gdb_path = arcpy.GetParameterAsText(5)
 # User selects two digit classification iteration number
 iteration_number = arcpy.GetParameterAsText(6)
 
+# User checks whether to also write Label, Bad Label, and Training Label Shapefiles (otherwise labels are only kept in Label Store, in Documents Directory)
+materialize_label_shapefiles_is_checked = arcpy.GetParameterAsText(7) == 'true'
+
 #--------------------------------------------
 
 # 0.2 Set environment settings
@@ -174,162 +179,165 @@ arcpy.CheckOutExtension('Spatial')
 
 #----------------------------------------------------------------------------------------------
 
-# 1. Make a copy of Classified Raster and save as Classified Tiff (so as to avoid in later steps error 00499: table is not editable)
-
-classified_tiff = os.path.splitext(classified_raster)[0] + '.tif'
+# 1. Create lookup table of Classified Raster attribute table Value to CROP_TYPE value extracted from concatenated Signame (Unclassified and blank Signames are given 0, i.e. NoData)
 
-arcpy.CopyRaster_management(in_raster = classified_raster, out_rasterdataset = classified_tiff)
+# NOTE: Classified Raster attribute table is only read, so no copy to Classified Tiff (previously needed to add and populate an attribute table field, Crop) is required
 
-arcpy.AddMessage('Generated Classified Tiff: ' + classified_tiff)
+with arcpy.da.SearchCursor(in_table = classified_raster, field_names = ['Value', 'Class_Name']) as cursor:
+    value_class_names = [(row[0], row[1]) for row in cursor]
 
-#----------------------------------------------------------------------------------------------
+class_values = [v for v, n in value_class_names]
+class_crop_codes = numpy.array([signame_crop_code(n) for v, n in value_class_names], dtype = numpy.int64)
+value_lookup_table = compile_lookup_table(values = class_values, codes = class_crop_codes)
 
-# 2. Delete attribute table field, Crop, if already present in Classified Tiff (ignoring case)
+# Report crop codes extracted from Signames that are not in the crop catalogue (see crop_catalogue.py), as they are likely mistyped
+unknown_crop_codes = numpy.unique(class_crop_codes[(class_crop_codes > 0) & ~known_crop_codes(crop_types = class_crop_codes)])
+if len(unknown_crop_codes):
+    arcpy.AddWarning('Crop codes extracted from Signames of Classified Raster not in the crop catalogue: ' + ', '.join(str(c) for c in unknown_crop_codes.tolist()))
 
-tiff_fields = [field.name.upper() for field in arcpy.ListFields(dataset = classified_tiff)]
-for i in tiff_fields:
-    if i == 'CROP':
-        arcpy.DeleteField_management(in_table = classified_tiff, drop_field = i)
+arcpy.AddMessage('Created lookup table of Classified Raster Value to crop code value extracted from Signame')
 
 #----------------------------------------------------------------------------------------------
 
-# 3. Add attribute table field, Crop, to Classified Tiff
+# 2. Rasterize feature IDs of Edited Field Borders Shapefile on the grid of Classified Raster
 
-arcpy.AddField_management(in_table = classified_tiff, field_name = 'Crop', field_type = 'SHORT')
-
-arcpy.AddMessage('Added attribute table field: Crop to Classified Tiff')
+feature_id_raster = rasterize_feature_ids(features = edited_field_borders_shapefile, classified_raster = classified_raster, feature_id_raster = r'in_memory\field_borders_fid_raster')
 
 #----------------------------------------------------------------------------------------------
 
-# 4. Populate attribute table field, Crop, with extracted crop type value from concatenated Signame 
-
-input_table_fields = ['Class_Name', 'Crop']
-with arcpy.da.UpdateCursor(in_table = classified_tiff, field_names = input_table_fields) as cursor:
-    for row in cursor:
-        if row[0] == 'Unclassified':
-            row[1] = 'Unclassified'
-        elif row[0] == ' ':
-           row[1] = ''
-        else:
-            row[1] = row[0].split('-')[2] 
-            cursor.updateRow(row)
-            
-arcpy.AddMessage(''''Populated Classified Tiff's attribute table field, Crop, with crop code value extracted from Signame''')
-
-#----------------------------------------------------------------------------------------------
-
-# 5. Reclassify Classified Tiff based on attribute table field, Crop
+# 3. In one pass over Classified Raster, count pixels of each Value per field and write Reclassified Raster (crop codes, via lookup table; pixels outside fields are NoData as with mask environment)
 
 region_and_time = os.path.basename(edited_field_borders_shapefile).rsplit(sep = '_', maxsplit = 1)[0]
 region_and_time_caps = region_and_time.upper()
 reclassified_raster_name = region_and_time + '_reclassified_' + iteration_number + '.img'
 reclassified_raster = os.path.join(img_path, reclassified_raster_name)
 
-remap_values = RemapValue([[0,'NODATA']])
-
-if 'out_reclassify' in locals():
-    arcpy.AddMessage('delecting out_reclassify')
-    del out_reclassify
-    
-out_reclassify = Reclassify(in_raster = classified_tiff, reclass_field = 'Crop', remap = remap_values, missing_values = 'DATA') # NOTE: Passing argument 'DATA' to missing_values parameter allows you to leave all values other than 0 as they are.
+# Test whether pre-existing Reclassified Raster can be deleted (i.e. if re-running tool it may be locked) and exit script if not  
+if arcpy.Exists(reclassified_raster):
+    try:
+        arcpy.Delete_management(in_data = reclassified_raster)
+    except arcpy.ExecuteError:
+        arcpy.AddError('Cannot overwrite pre-existing ' + reclassified_raster + '; please re-run tool once more')
+        sys.exit(0)
 
-# Test whether Reclassified Raster can be generated (i.e. if re-running tool it may not be able to delete pre-exising raster) and exit script if not  
 try:
-    out_reclassify.save(reclassified_raster)
-except RuntimeError:
-    arcpy.AddError('Cannot overwrite pre-existing ' + reclassified_raster + '; please re-run tool once more')
+    feature_counts = sweep_classified_raster(classified_raster = classified_raster, feature_id_raster = feature_id_raster, value_lookup_table = value_lookup_table, reclassified_raster = reclassified_raster)
+except arcpy.ExecuteError:
+    arcpy.AddError('Could not generate Reclassified Raster ' + reclassified_raster + ':\n' + arcpy.GetMessages(2))
     sys.exit(0)
 
-arcpy.AddMessage('Generated Reclassified Raster based on attribute table field, Crop')
+arcpy.Delete_management(in_data = feature_id_raster)
 
-# Delete output reclassified raster variable otherwise it will cause a lock (ERROR 000871: Unable to delete the output) if the tool is re-run for the same iteration
-del out_reclassify
+arcpy.AddMessage('Generated Reclassified Raster based on crop code extracted from Signame')
 
 #----------------------------------------------------------------------------------------------
 
-# 6. In Edited Field Borders Shapefile attribute table field, MAJORITY, assign each field a classification value based on what the majority of pixels were assigned to  
-
-# Create Zonal Statistics Majority Table 
+# 4. Compute MAJORITY crop code of each FIELD_ID from pixel counts and write Zonal Statistics Majority Table, and Class Fractions Table (top 3 crop codes of each FIELD_ID with pixel fractions, PURITY, and MARGIN) from the same counts
 
-edited_field_borders_shapefile_name = os.path.basename(edited_field_borders_shapefile)
 majority_table_name = region_and_time_caps + '_majority_' + iteration_number + '.dbf'
 majority_table = os.path.join(docs_path, majority_table_name)
 
-ZonalStatisticsAsTable(in_zone_data = edited_field_borders_shapefile, zone_field = 'FIELD_ID', in_value_raster = reclassified_raster, out_table = majority_table, ignore_nodata = 'DATA', statistics_type = 'MAJORITY')
+field_counts = field_class_counts(feature_counts = feature_counts, features = edited_field_borders_shapefile, value_lookup_table = value_lookup_table)
+field_ids, majority_codes, pixel_counts = zonal_majority(*field_counts)
+
+write_table(in_array = numpy.rec.fromarrays([field_ids, pixel_counts.astype(numpy.int64), majority_codes], names = ['FIELD_ID', 'COUNT', 'MAJORITY']), out_table = majority_table)
 
 arcpy.AddMessage('Generated Zonal Statistics Majority Table: ' + majority_table)
 
-# Delete attribute table fields: MAJORITY or MAJORITY** (where ** corresponds to this iteration) in case user needs to re-run this same iteration
+# Class Fractions Table lets mixed (ambiguous) fields be found by filtering on PURITY or MARGIN without re-tabulating area
+class_fractions_table_name = region_and_time_caps + '_class_fractions_' + iteration_number + '.dbf'
+class_fractions_table = os.path.join(docs_path, class_fractions_table_name)
 
-delete_fields_list = ['MAJORITY', 'MAJORITY' + iteration_number]
-for d in delete_fields_list:
-    if arcpy.ListFields(dataset = edited_field_borders_shapefile, wild_card = d):
-        arcpy.DeleteField_management(in_table = edited_field_borders_shapefile, drop_field = d)
-        arcpy.AddMessage('Deleting pre-existing field from Edited Field Borders Shapefile: ' + str(d)) 
+write_table(in_array = zonal_top_classes(*field_counts, zone_field = 'FIELD_ID'), out_table = class_fractions_table)
 
-# Join the majority values from the output table of Zonal Statistics as Table to the Edited Field Borders Shapefile
+arcpy.AddMessage('Generated Class Fractions Table: ' + class_fractions_table)
 
-arcpy.JoinField_management(in_data = edited_field_borders_shapefile, in_field = 'FIELD_ID', join_table = majority_table, join_field  = 'FIELD_ID', fields = 'MAJORITY')
+#----------------------------------------------------------------------------------------------
 
-arcpy.AddMessage('Joined MAJORITY field from Zonal Statistics Table to Edited Field Borders Shapefile') 
+# 5. Delete attribute table fields: MAJORITY (left by earlier versions of this tool) or MAJORITY** (where ** corresponds to this iteration) in case user needs to re-run this same iteration
+
+majority_field = 'MAJORITY' + iteration_number
+
+delete_fields_list = [d for d in ['MAJORITY', majority_field] if arcpy.ListFields(dataset = edited_field_borders_shapefile, wild_card = d)]
+if delete_fields_list:
+    arcpy.DeleteField_management(in_table = edited_field_borders_shapefile, drop_field = delete_fields_list)
+    arcpy.AddMessage('Deleting pre-existing fields from Edited Field Borders Shapefile: ' + ', '.join(delete_fields_list)) 
 
 #----------------------------------------------------------------------------------------------
 
-# 7. Create Label Shapefile, an exact copy of Edited Field Borders Shapefile
+# 6. In Edited Field Borders Shapefile attribute table field, MAJORITY** (where ** corresponds to this iteration), assign each field a classification value based on what the majority of pixels were assigned to  
 
-label_shapefile_name = region_and_time_caps + '_label_' + iteration_number + '.shp'
-label_shapefile = os.path.join(covs_path, label_shapefile_name)
+# Add and populate the field in one bulk operation from the FIELD_ID majorities in memory (field type SHORT, as 16 bit integers), rather than joining field MAJORITY and then renaming it by copying its values to a new field
+#   Fields without a majority (i.e. no classified pixels) are given 0, as with a shapefile join
 
-arcpy.Copy_management(in_data = edited_field_borders_shapefile, out_data = label_shapefile)
+arcpy.da.ExtendTable(in_table = edited_field_borders_shapefile, table_match_field = 'FIELD_ID', in_array = numpy.rec.fromarrays([field_ids, majority_codes.astype(numpy.int16)], names = ['FIELD_ID', majority_field]), array_match_field = 'FIELD_ID')
 
-arcpy.AddMessage('Created Label Shapefile: ' + label_shapefile)
+arcpy.AddMessage('Added ' + majority_field + ' field from Zonal Statistics majorities to Edited Field Borders Shapefile') 
 
 #----------------------------------------------------------------------------------------------
 
-# 8. Create two new attribute table fields to Label Shapefile, Crop_label and crop 
+# 7. Create Label Table of Edited Field Borders Shapefile (FIELD_ID, MAJORITY, Crop_label, crop, CLASS, aa, and ACRES of each field) in memory and save in Label Store
+
+# Crop_label and crop are MAJORITY and CROP_TYPE divided by 100, with Crop_label overwritten with known value, crop (i.e. CROP_TYPE), for known static ground truth fields ('CLASS' == 2)
+
+feature_array = arcpy.da.FeatureClassToNumPyArray(in_table = edited_field_borders_shapefile, field_names = ['OID@', 'FIELD_ID', 'CROP_TYPE', 'CLASS', 'aa', 'ACRES'], null_value = 0)
+labels = create_labels(feature_array = feature_array, majority_field_ids = field_ids, majority_codes = majority_codes)
 
-add_fields_list = ['Crop_label', 'crop']
-for a in add_fields_list:
-    if arcpy.ListFields(dataset = label_shapefile, wild_card = a):
-        arcpy.DeleteField_management(in_table = label_shapefile, drop_field = a)
-    arcpy.AddField_management(in_table = label_shapefile, field_name = a, field_type = 'SHORT')
+labels_path = label_store_path(directory = docs_path, region_and_time = region_and_time_caps, iteration = iteration_number)
+save_labels(path = labels_path, labels = labels)
 
-arcpy.AddMessage('Added attribute table fields: Crop_label and crop to Label Shapefile')
+arcpy.AddMessage('Saved Label Table in Label Store: ' + labels_path)
 
 #----------------------------------------------------------------------------------------------
 
-# 9. Populate Label Shapefile attribute table fields, Crop_label and crop, with values from MAJORITY and CROP_TYPE, respectively
+# 8. Report fields whose Crop_label changed since the previous iteration, and acreage shift per crop
 
-comparison_fields = ['Crop_label', 'MAJORITY', 'crop', 'CROP_TYPE', 'CLASS']
-with arcpy.da.UpdateCursor(label_shapefile, comparison_fields) as cursor:
-    for row in cursor:
-        row[0] = row[1]/100
-        row[2] = row[3]/100
-        cursor.updateRow(row)
+previous_labels = previous_labels_path(directory = docs_path, region_and_time = region_and_time_caps, iteration = iteration_number)
+
+if previous_labels:
+    previous_iteration, previous_path = previous_labels
+    changed_fields, crop_shift = compare_labels(previous_labels = load_labels(path = previous_path), labels = labels)
+    
+    label_changes_table_name = region_and_time_caps + '_label_changes_' + iteration_number + '.dbf'
+    label_changes_table = os.path.join(docs_path, label_changes_table_name)
+    write_table(in_array = changed_fields, out_table = label_changes_table)
+    
+    arcpy.AddMessage(str(len(changed_fields)) + ' fields (' + str(round(changed_fields['ACRES'].sum(), 1)) + ' acres) changed Crop_label since iteration ' + previous_iteration + '; see Label Changes Table: ' + label_changes_table)
+    for c in crop_shift[crop_shift['SHIFT'] != 0]:
+        arcpy.AddMessage('Crop_label ' + str(c['Crop_label']) + ': ' + str(round(c['PREV_ACRES'], 1)) + ' to ' + str(round(c['ACRES'], 1)) + ' acres (' + '{:+.1f}'.format(c['SHIFT']) + ')')
+else:
+    arcpy.AddMessage('No Label Table of a previous iteration in Label Store; skipping comparison')
 
 #----------------------------------------------------------------------------------------------
 
-# 10. Overwrite Label Shapefile attribute table field, Crop_label with known value, crop (i.e. CROP_TYPE) for known static ground truth fields ('CLASS' == 2
-        if row[4] == 2:
-            row[0] = row[2]
-            cursor.updateRow(row)
+# 9. If requested, materialize Label Shapefile (a copy of Edited Field Borders Shapefile with Crop_label and crop), Bad Label Shapefile (training fields misclassified), and Training Label Shapefile
 
-arcpy.AddMessage('Populated Crop_label and crop attribute table values within Label Shapefile to match MAJORITY and CROP_TYPE and burned in CROP_TYPE for known static fields')
+if materialize_label_shapefiles_is_checked:
+    label_shapefile_name = region_and_time_caps + '_label_' + iteration_number + '.shp'
+    label_shapefile = os.path.join(covs_path, label_shapefile_name)
+    bad_shapefile_name = region_and_time_caps + '_bad_label_' + iteration_number + '.shp'
+    bad_shapefile = os.path.join(covs_path, bad_shapefile_name)
+    training_label_shapefile_name = region_and_time_caps + '_training_label_' + iteration_number + '.shp'
+    training_label_shapefile = os.path.join(covs_path, training_label_shapefile_name)
+    
+    materialize_label_shapefiles(features = edited_field_borders_shapefile, labels = labels, label_shapefile = label_shapefile, bad_shapefile = bad_shapefile, training_label_shapefile = training_label_shapefile)
+    
+    arcpy.AddMessage('Created Label Shapefile, Bad Label Shapefile, and Training Label Shapefile: ' + label_shapefile + ', ' + bad_shapefile + ', ' + training_label_shapefile)
 
 #----------------------------------------------------------------------------------------------
 
-# 11. Create Label Frequency Table with sum acreage for fields aggregated by the unique combination of: CLASS, aa, crop, and Crop_label
+# 10. Create Label Frequency Table with sum acreage for fields aggregated by the unique combination of: CLASS, aa, crop, and Crop_label
 
 frequency_table_name = region_and_time_caps + '_label_' + iteration_number + '_fre.dbf'
 frequency_table = os.path.join(docs_path, frequency_table_name)
 
-arcpy.Frequency_analysis(in_table = label_shapefile, out_table = frequency_table, frequency_fields = ['CLASS', 'aa', 'crop', 'Crop_label'], summary_fields = 'ACRES')
+write_table(in_array = label_frequency(labels = labels), out_table = frequency_table)
 
 arcpy.AddMessage('Created Label Frequency Table')
 
 #----------------------------------------------------------------------------------------------
 
-# 12. Convert Label Frequency Table to Excel file
+# 11. Convert Label Frequency Table to Excel file
 
 frequency_table_xlsx_name = os.path.splitext(frequency_table_name)[0] + '.xlsx'
 frequency_table_xlsx = os.path.join(docs_path, frequency_table_xlsx_name)
@@ -340,97 +348,55 @@ arcpy.AddMessage('Coverted Label Frequency Table to Excel file')
 
 #----------------------------------------------------------------------------------------------
 
-# 13. Rename MAJORITY attribute table field name to MAJORITY** in Edited Field Borders Shapefile, allowing subsequent iterations to reuse the name MAJORITY
-
-# Used workaround of creating new empty field with desired name, copy values, delete old field since cannot use arcpy.AlterField_management (as it only works on filegeodatabase shapefile) 
-
-field_borders_fields  = [field.name for field in arcpy.ListFields(dataset = edited_field_borders_shapefile)]
-
-for field in field_borders_fields:
-    if field == 'MAJORITY':
-        arcpy.AddField_management(in_table = edited_field_borders_shapefile, field_name = 'MAJORITY' + iteration_number, field_type = 'SHORT')
-        arcpy.CalculateField_management(in_table = edited_field_borders_shapefile, field = 'MAJORITY' + iteration_number, expression = "!MAJORITY!", expression_type = 'PYTHON3')
-        arcpy.DeleteField_management(in_table = edited_field_borders_shapefile, drop_field = 'MAJORITY')
-
-#----------------------------------------------------------------------------------------------
-
-# 14. Create Bad Label Shapefile representing training fields misclassified
-
-bad_shapefile_name = region_and_time_caps + '_bad_label_' + iteration_number + '.shp'
-bad_shapefile = os.path.join(covs_path, bad_shapefile_name)
-
-arcpy.Select_analysis(in_features = label_shapefile, out_feature_class = bad_shapefile, where_clause = "\"crop\" > 0 AND \"crop\" <> \"Crop_label\" AND \"aa\" = 1")
-
-arcpy.AddMessage('Created Bad Label Shapefile')
-
-#----------------------------------------------------------------------------------------------
-
-# 15. Generate training Label Shapefile, a subset of Label Shapefile that were training fields, regardless of whether classified correctly or not
-
-training_label_shapefile_name = region_and_time_caps + '_training_label_' + iteration_number + '.shp'
-training_label_shapefile = os.path.join(covs_path, training_label_shapefile_name)
-
-arcpy.Select_analysis(in_features = label_shapefile, out_feature_class = training_label_shapefile, where_clause = "\"crop\" > 0 AND \"aa\" = 1")
-
-arcpy.AddMessage('Created Training Label Shapefile')
-
-#----------------------------------------------------------------------------------------------
-
-# 16. Cross-tabulate area of misclassified pixels by Signame and CROP_TYPE
+# 12. Cross-tabulate area of misclassified pixels by Signame and CROP_TYPE
 
 # Create Bad Signame Geodatabase Table, a cross-tabulation of area for each misclassified CROP_TYPE by responsible Signame
 #   Each row represents misclassified crop types (found within Bad Label Shapefile)
 #   Each column represents the corresponding signame that was responsible for the wrong label
-#       Note that the column headers read VALUE_*, which correspond to an actual Signame within Classified Tiff; the prefix Value is given as a geodatabase table cannot start with a number and tabulate area runs off of Value 
-#   Values within the table are total area in meters of misclassified training fields broken up CROP_TYPE and a value (corresponding to a Signame within Classified Tiff)
+#       Note that the column headers read VALUE_*, which correspond to an actual Signame within Classified Raster; the prefix Value is given as a geodatabase table cannot start with a number and tabulate area runs off of Value 
+#   Values within the table are total area in meters of misclassified training fields broken up CROP_TYPE and a value (corresponding to a Signame within Classified Raster)
+
+#   Both tables are cross-tabulated in memory from the pixel counts of each Value per field taken in the single pass over Classified Raster (step 3): each field of
+#   Training Label Shapefile (and, for the Bad Signame table, only if that field is in Bad Label Shapefile) is given its crop, and (crop, Value) areas are summed with one bincount
 
 bad_sig_table_name = region_and_time_caps + '_bad_signames_' + iteration_number
 bad_sig_table = os.path.join(gdb_path, bad_sig_table_name)
 
-# Try to generate Bad Signame Geodatabase Table
-try:
-    TabulateArea(in_zone_data = bad_shapefile, zone_field = 'crop', in_class_data = classified_tiff, class_field = 'Value', out_table = bad_sig_table)
-
-# If an exception is raised (Execute Error: ERROR 010151: No features found) catch and handle it by giving warning and proceeding
-
-except arcpy.ExecuteError:
-    e = sys.exc_info()[1]
-    arcpy.AddWarning(e.args[0])
-    result = arcpy.GetCount_management(bad_shapefile)
-    if int(result[0]) > 0:
-        pass
-    else:
-        arcpy.AddWarning('Bad Label Shapefile has no features and so Bad Signame Geodatabase Table was not generated. Continuing...')
-
-# Create Training Label Signame Geodatabase Table, a cross-tabulation of area for Signame for all training fields regardless of whether they were misclassified or not
-#   Rows, columns, and values represent the same as in Bad Signame Geodatabase Table 
-#   Analysis is merely expanded to cover all training fields, not merely those misclassified (as the signature could still be contributing to the cumulative effect of mislabeling fields
-
 training_label_sig_table_name = region_and_time_caps + '_training_label_signames_' + iteration_number
 training_label_sig_table = os.path.join(gdb_path, training_label_sig_table_name)
 
-TabulateArea(in_zone_data = training_label_shapefile, zone_field = 'crop', in_class_data = classified_tiff, class_field = 'Value', out_table = training_label_sig_table)
+# Flag training fields and those misclassified (i.e. the features of Training Label and Bad Label Shapefiles) in Label Table (of Edited Field Borders Shapefile, so sharing feature IDs)
+training_label = training_mask(labels = labels)
+bad_label = bad_mask(labels = labels)
 
-#----------------------------------------------------------------------------------------------
+# Look up crop of each (feature ID, Value) pixel count, for training fields and for misclassified training fields only
+feature_ids, values, counts = feature_counts
+training_crops = apply_lookup_table(table = lookup_table(values = labels['OID'][training_label], codes = labels['crop'][training_label]), array = feature_ids)
+bad_crops = apply_lookup_table(table = lookup_table(values = labels['OID'][bad_label], codes = labels['crop'][bad_label]), array = feature_ids)
 
-# 17. Generate Bad Signame Excel Workbook, a pivoted and manipulated version of Bad Signame Geodatabase Table
+# Cross-tabulate area (in map units) of each Value of Classified Raster for each crop
+describe_classified_raster = arcpy.Describe(classified_raster)
+cell_area = describe_classified_raster.meanCellWidth * describe_classified_raster.meanCellHeight
 
-# Create numpy array from Training Label Signame Geodatabase Table
-numpy_array_training_label_sig = arcpy.da.TableToNumPyArray(in_table = training_label_sig_table, field_names = '*')
+pandas_training_label_sig = tabulate_area(*crosstabulate(zone_array = training_crops, class_array = values, class_values = class_values, weights = counts), cell_area = cell_area, zone_field = 'CROP')
+pandas_bad_sig = tabulate_area(*crosstabulate(zone_array = bad_crops, class_array = values, class_values = class_values, weights = counts), cell_area = cell_area, zone_field = 'CROP')
 
-# Create pandas data frame from numpy array
-pandas_training_label_sig = pandas.DataFrame(data = numpy_array_training_label_sig)
+# Write Training Label Signame and Bad Signame Geodatabase Tables (Bad Signame Geodatabase Table only if there are misclassified training fields, as Tabulate Area would fail with no features)
+write_table(in_array = pandas_training_label_sig.to_records(index = False), out_table = training_label_sig_table)
 
-# Replace column names from Bad Signame Geodatabase Table (derived from Reclassified Tiff attribute table, Value) to match corresponding Signame
+if len(pandas_bad_sig) > 0:
+    write_table(in_array = pandas_bad_sig.to_records(index = False), out_table = bad_sig_table)
+else:
+    arcpy.AddWarning('There are no misclassified training fields (Bad Label Shapefile would have no features) and so Bad Signame Geodatabase Table was not generated. Continuing...')
+
+#----------------------------------------------------------------------------------------------
 
-# Create dictionary from Classified Tiff where key: value is Value: Class_Name
-sig_dictionary = {}
+# 13. Generate Bad Signame Excel Workbook, a pivoted and manipulated version of Bad Signame Geodatabase Table
 
-# Populate empty dictionary key: value pairs using attribute table fields: Value and Class_Name from Classified Tiff
+# Replace column names from Bad Signame Geodatabase Table (derived from Reclassified Tiff attribute table, Value) to match corresponding Signame
 
-with arcpy.da.UpdateCursor(classified_tiff, ['Value', 'Class_Name']) as eCursor: 
-    for row in eCursor:
-        sig_dictionary[row[0]] = row[1]
+# Create dictionary from Classified Raster where key: value is Value: Class_Name (attribute table fields read in step 1)
+sig_dictionary = dict(value_class_names)
 
 # Add string Value_ to each key in dictionary so that dictionary reads old: new column names for data frame
 sig_dictionary = {f'VALUE_{k}': v for k, v in sig_dictionary.items()}
@@ -443,9 +409,6 @@ pandas_training_label_sig.rename(columns = sig_dictionary, inplace = True)
 
 # Manipulate and pivot pandas data frame 
 
-# Delete OBJECTID column
-pandas_training_label_sig.drop('OBJECTID', axis = 1, inplace = True)
-
 # Rename spurious column name CROP to true name Signame
 pandas_training_label_sig = pandas_training_label_sig.rename({'CROP':'Signame'}, axis = 1)
 
@@ -466,32 +429,13 @@ pandas_training_label_sig['Total_Area'] = pandas_training_label_sig[column_heade
 
 # Add Crop_label column, with value extracted from Signame
 
-crop_label_list = pandas_training_label_sig.index.str.split('-').str[2].tolist() 
-pandas_training_label_sig['Crop_label'] = pandas.to_numeric(crop_label_list)
-pandas_training_label_sig['Crop_label'] = pandas_training_label_sig['Crop_label'].div(100)
-pandas_training_label_sig['Crop_label'].fillna(-9999, inplace = True)
-pandas_training_label_sig['Crop_label'] = pandas_training_label_sig['Crop_label'].astype(int) 
-pandas_training_label_sig['Crop_label'] = pandas_training_label_sig['Crop_label'].astype(str) 
-
-# Create two empty columns and set as numeric by filling with value of 0 instead of '' (which would create a series of string data type instead)
-pandas_training_label_sig['Good'] = 0
-pandas_training_label_sig['Bad'] = 0
-
-# Create a new column that will be the normazized index (i.e. ranging from -1 to 1) of badness, where 1 is the worst (i.e. signature always classified incorrectly)
-pandas_training_label_sig['Badness_Index'] = 0
-
-# For each signature, aggregate area based on whether it was good (i.e. for the correct crop), or bad (i.e. classified area known to be another crop)
-
-# Loop through each column, then loop through each row and if the Crop_label value for that row is the same as the column you're looping through, add that value to Good, otherwise add to Bad column
-for h in column_headers:
-    for i, row in pandas_training_label_sig.iterrows(): 
-        if pandas_training_label_sig.at[i, 'Crop_label'] == h:
-            pandas_training_label_sig.at[i, 'Good'] = pandas_training_label_sig.at[i, 'Good'] + pandas_training_label_sig.at[i, h]
-        else:
-            pandas_training_label_sig.at[i, 'Bad'] = pandas_training_label_sig.at[i, 'Bad'] + pandas_training_label_sig.at[i, h]
+# Crop_label is the crop code (extracted as in step 1) divided by 100, or -9999 for Signames without a crop code
+signame_crop_codes = numpy.array([signame_crop_code(n) for n in pandas_training_label_sig.index], dtype = numpy.int64)
+pandas_training_label_sig['Crop_label'] = numpy.where(signame_crop_codes > 0, signame_crop_codes // 100, -9999).astype(str)
 
-# Calculate badness index 
-pandas_training_label_sig['Badness_Index'] = ((pandas_training_label_sig['Bad'] - pandas_training_label_sig['Good']) / (pandas_training_label_sig['Bad'] + pandas_training_label_sig['Good']))
+# For each signature, aggregate area based on whether it was good (i.e. for the correct crop), or bad (i.e. classified area known to be another crop), and calculate badness index,
+# a normazized index (i.e. ranging from -1 to 1) of badness, where 1 is the worst (i.e. signature always classified incorrectly), in one masked reduction (see signature_analytics.py)
+pandas_training_label_sig = score_signatures(signature_table = pandas_training_label_sig, crop_columns = column_headers)
 
 # Create list of columns to total
 columns_to_total = list(pandas_training_label_sig.columns.values)
@@ -504,68 +448,49 @@ for i in columns_not_total:
 # Add summary row (i.e. total sum per column) 
 pandas_training_label_sig.loc['Total',:] = pandas_training_label_sig[columns_to_total].sum(axis = 0)
 
-# Print text (which can be copied and pasted into ERDAS IMAGINE Signature Editor criteria search) of recommended signatures to delete 
+# Write text files (which can be copied and pasted into ERDAS IMAGINE Signature Editor criteria search) of recommended signatures to delete, and a sweep of Badness_Index thresholds with area and pixels of each crop the removed signatures classified
+
+# Index signatures by Badness_Index once, so that signatures above each threshold are found by binary search
+signature_index = index_signature_table(signature_table = pandas_training_label_sig, crop_columns = column_headers)
 
 badness_thresholds = [-0.5, -0.7, -1]
 
-for b in badness_thresholds:
-    list_signatures_remove = pandas_training_label_sig.index[pandas_training_label_sig['Badness_Index'] > b].tolist()
-    list_signatures_remove = ['$"Signature Name" == "{}"'.format(i) for i in list_signatures_remove]
-    string_signatures_remove = ' OR '.join(list_signatures_remove)
-    arcpy.AddMessage('The following text can be copied into ERDAS IMAGINE Signature Editor Criteria box; it corresponds to Signames that had a Badness Index of ' + str(b) + ' greater than : ' + string_signatures_remove)
+criteria_files = write_removal_criteria(signature_index = signature_index, thresholds = badness_thresholds, directory = docs_path, base_name = region_and_time_caps + '_remove_signatures_' + iteration_number)
+
+for b, f in zip(badness_thresholds, criteria_files):
+    arcpy.AddMessage(str(count_above(signature_index, b)) + ' Signames had a Badness Index greater than ' + str(b) + '; text to copy into ERDAS IMAGINE Signature Editor Criteria box is in: ' + f)
+
+signature_sweep_file = os.path.join(docs_path, region_and_time_caps + '_signature_sweep_' + iteration_number + '.csv')
+write_sweep(df_sweep = sweep_thresholds(signature_index = signature_index, thresholds = sorted(set(default_sweep_thresholds.tolist() + badness_thresholds)), cell_area = cell_area), sweep_file = signature_sweep_file)
+
+arcpy.AddMessage('Generated Signature Threshold Sweep (Signames removed and area and pixels lost per crop for each Badness Index threshold): ' + signature_sweep_file)
 
-# 16.4 Create Excel file from pandas data frame 
+# 13.1 Save pandas data frame as this iteration in Iteration Store, and export Bad Signame Excel Workbook with one sheet per iteration from Iteration Store
 
 bad_sig_excel_name = region_and_time_caps + '_Bad_Signame_Workbook.xlsx'
 bad_sig_excel = os.path.join(docs_path, bad_sig_excel_name)
-iteration_name = 'iteration_' + iteration_number
-
-# Import function, load_workbook, from openpyxl which allows you to add a sheet to an already existing Excel file
-from openpyxl import load_workbook 
-
-# Define function returning boolean value of whether or not a file has a handle on it (Source: https://stackoverflow.com/questions/11114492/check-if-a-file-is-not-open-nor-being-used-by-another-process)
-if os.path.isfile(bad_sig_excel): 
-
-    def has_handle(file_path):
-            for proc in psutil.process_iter():
-                try:
-                    for item in proc.open_files():
-                        if file_path == item.path:
-                            return True
-                except Exception:
-                    pass
-        
-            return False
-                
-# Test whether Bad Signame Excel Workbook has a handle on it (is open on the local computer) and pause the script to give the user a chance to close it so as to avoid PermissionError (below)
-    my_test = has_handle(bad_sig_excel)
-    if my_test == True:
-        while my_test == True:
-            arcpy.AddWarning('Please close ' + bad_sig_excel + ' in order to proceed')
-            time.sleep(5)
-            my_test = has_handle(bad_sig_excel)
-        arcpy.AddMessage(bad_sig_excel + ' is now closed; continuing...')
-
-# Once Bad Signame Excel Workbook has no handle on it, add a sheet for this iteration, or create the Excel file if one does not exist (in the case of first iteration)
-
-    book = load_workbook(bad_sig_excel)
-    writer = pandas.ExcelWriter(bad_sig_excel, engine ='openpyxl') 
-    writer.book = book
-    writer.sheets = dict((ws.title, ws) for ws in book.worksheets)
-    
-    pandas_training_label_sig.to_excel(writer, iteration_name)
-    
-    try:
-        writer.save()
-    except PermissionError:
-        arcpy.AddError('Please close ' + bad_sig_excel + ' and re-run tool')
-        sys.exit(0)       
-    else:
-        arcpy.AddMessage('Added new sheet in Bad Signatures Excel Workbook: ' + str(bad_sig_excel) + ' for iteration number: ' + str(iteration_number))
+iteration_store = iteration_store_path(directory = docs_path, region_and_time = region_and_time_caps)
 
-else:
-    pandas_training_label_sig.to_excel(excel_writer = bad_sig_excel, sheet_name = iteration_name)
-    arcpy.AddMessage('Generated Bad Signatures Excel Table: ' + str(bad_sig_excel))
+# Import sheets of any pre-existing Bad Signame Excel Workbook (i.e. generated before the Iteration Store) so that earlier iterations are kept when the workbook is re-exported (only read while the Iteration Store has no iterations)
+imported_iterations = import_workbook(store = iteration_store, table_name = 'bad_signame', workbook = bad_sig_excel)
+if imported_iterations:
+    arcpy.AddMessage('Imported iterations from pre-existing Bad Signame Excel Workbook into Iteration Store: ' + ', '.join(imported_iterations))
 
+save_iteration(store = iteration_store, table_name = 'bad_signame', iteration = iteration_number, data_frame = pandas_training_label_sig)
+arcpy.AddMessage('Saved iteration number: ' + str(iteration_number) + ' in Iteration Store: ' + iteration_store)
 
+# Test whether Bad Signame Excel Workbook is locked (i.e. open in Excel) and pause the script to give the user a chance to close it so as to avoid PermissionError (below)
+if file_is_locked(bad_sig_excel):
+    while file_is_locked(bad_sig_excel):
+        arcpy.AddWarning('Please close ' + bad_sig_excel + ' in order to proceed')
+        time.sleep(5)
+    arcpy.AddMessage(bad_sig_excel + ' is now closed; continuing...')
 
+# Once Bad Signame Excel Workbook is not locked, write it from Iteration Store (this iteration is already saved, so re-running export alone is enough if it fails)
+try:
+    export_workbook(store = iteration_store, table_name = 'bad_signame', workbook = bad_sig_excel)
+except PermissionError:
+    arcpy.AddError('Please close ' + bad_sig_excel + ' and re-run tool')
+    sys.exit(0)
+else:
+    arcpy.AddMessage('Generated Bad Signatures Excel Workbook: ' + str(bad_sig_excel) + ' with sheet for iteration number: ' + str(iteration_number))
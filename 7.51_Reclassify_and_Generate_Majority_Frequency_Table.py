@@ -5,7 +5,7 @@
 # Name:             7.51_Reclassify_and_Generate_Majority_Frequency_Table.py
 # Author:           Kelly Meehan, USBR
 # Created:          20180618
-# Updated:          20210223 
+# Updated:          20261019 
 # Version:          Created using Python 3.6.8 
 
 # Requires:         ArcGIS Pro 
@@ -13,19 +13,21 @@
 # Notes:            This script is intended to be used for a Script Tool within ArcGIS Pro; it is not intended as a stand-alone script.
 
 # Description:      This is the version of Tool 7.50, but for classifications run in Pro. Run after Image Classification. It will create Frequency Table that is needed for Tool 10.
+#                   Several Classified Rasters (e.g. candidates from Tool 7.10) can be processed at once, in parallel, as consecutive iterations.
 
 #----------------------------------------------------------------------------------------------
 
 # Tool setup:       The script tool's properties can be set as follows: 
 #
 #                      Parameters tab:    
-#                           Classified Raster               Raster Layer (Data Type) > Required (Type) > Input (Direction)  
+#                           Classified Raster(s)            Raster Layer (Data Type) > Required (Type) > Input (Direction) > Multiple values checked  
 #                           Field Borders Feature Class     Feature Layer (Data Type) > Required (Type) > Input (Direction)
 #                           Image Directory                 Workspace (Data Type) > Required (Type) > Input (Direction)                    
 #                           Shapefile Directory             Workspace (Data Type) > Required (Type) > Input (Direction)                    
 #                           Documents Directory             Workspace (Data Type) > Required (Type) > Input (Direction)                    
-#                           Geodatabase                     Workspace (Data Type) > Required (Type) > Input (Direction)
 #                           Iteration Number                String (Data Type) > Required (Type) > Input (Direction)
+#                           Materialize Label Shapefiles    Boolean (Data Type) > Optional (Type) > Input (Direction) > Default unchecked
+#                           Parallel Processes              Long (Data Type) > Optional (Type) > Input (Direction)
 #
 #                       Validation tab:
 #
@@ -103,22 +105,14 @@
 # This script will:
 
 # 0. Set-up
-# 1. Assign variable to base name used in nomenclature 
-# 2. Delete attribute table field: Crop if already present in Classified Tiff
-# 3. Add attribute table field, Crop, to Classified Tiff
-# 4. Populate attribute table field, Crop, with extracted CROP_TYPE value from concatenated Signame 
-# 5. Reclassify Classified Tiff based on attribute table field, Crop
-# 6. In Edited Field Borders Shapefile attribute table field, MAJORITY, assign each field a classification value based on what the majority of pixels were assigned to  
-# 7. Create Label Shapefile, an exact copy of Edited Field Borders Shapefile
-# 8. Create two new fields: Crop_label and crop to Label Shapefile   
-# 9. Populate Label Shapefile attribute table fields, Crop_label and crop, to values of MAJORITY and CROP_TYPE, respectively
-# 10. Overwrite Label Shapefile attribute table field, Crop_label with known value, crop (i.e. CROP_TYPE) for known static ground truth fields ('CLASS' == 2)
-# 11. Create Label Frequency Table with sum acreage for fields aggregated by the unique combination of : CLASS, aa, crop, and Crop_label
-# 12. Convert Label Frequency Table to Excel table
-# 13. Rename MAJORITY attribute table field name to MAJORITY** in Edited Field Borders Shapefile, allowing subsequent iterations to reuse the name MAJORITY
-# 14. Create Bad Label Shapefile representing training fields misclassified
-# 15. Generate Label Shapefile that were training fields, regardless of whether classified correctly or not
-
+# 1. For each Classified Raster (in parallel processes if several), in one pass over the raster count pixels of each Value per field and write Reclassified Raster (crop codes, via lookup table of Value to Classvalue),
+#    then write Zonal Statistics Majority Table, Class Fractions Table (top 3 crop codes of each field with pixel fractions, PURITY, and MARGIN), and Label Table (FIELD_ID, MAJORITY, Crop_label, and crop of each field, with Crop_label overwritten by crop for known static ground truth fields, 'CLASS' == 2) in Label Store
+# 2. If several Classified Rasters, write Majority Iterations Table, the majority of each field keyed by iteration
+# 3. In Edited Field Borders Shapefile attribute table fields, MAJRTY** (where ** corresponds to each iteration), assign each field a classification value based on what the majority of pixels were assigned to (written once, for all iterations)
+# 4. For each iteration, report fields whose Crop_label changed since the previous iteration, and acreage shift per crop
+# 5. For each iteration, if requested, materialize Label Shapefile, Bad Label Shapefile (training fields misclassified), and Training Label Shapefile
+# 6. For each iteration, create Label Frequency Table with sum acreage for fields aggregated by the unique combination of : CLASS, aa, crop, and Crop_label
+# 7. For each iteration, convert Label Frequency Table to Excel table
 
 #----------------------------------------------------------------------------------------------
 
@@ -127,256 +121,182 @@
 # # 0.0 Install necessary packages
 
 import arcpy, os, sys
-from arcpy.sa import RemapValue, Reclassify, ZonalStatisticsAsTable
-
-#--------------------------------------------
-  
-# 0.1 Read in tool parameters
-
-# User selects Classified Raster (ERDAS IMAGINE .img file)
-classified_raster = arcpy.GetParameterAsText(0) 
-
-# User selects Edited Field Borders Shapefile
-edited_field_borders_shapefile = arcpy.GetParameterAsText(1)
-
-# User selects Image Directory
-img_path = arcpy.GetParameterAsText(2)
-
-# User selects Coverage Directory
-covs_path = arcpy.GetParameterAsText(3)
-
-# User selects Documents Directory
-docs_path = arcpy.GetParameterAsText(4)
-
-# User selects two digit classification iteration number
-iteration_number = arcpy.GetParameterAsText(5)
+from classified_sweep import materialize_label_shapefiles, write_table
+from label_store import compare_labels, label_frequency, label_store_path, load_labels, previous_labels_path
+from majority_batch import run_batch, write_majority_fields, write_results_table
 
 #--------------------------------------------
 
-# 0.2 Set environment settings
-
-# Overwrite output
-arcpy.env.overwriteOutput = True
+# Create function reporting changes since previous iteration, materializing label shapefiles (if requested), and creating Label Frequency Table (and Excel file) of one iteration from its Label Table
+def run_tool_seven_point_five(iteration_number, labels):
 
-# Set mask
-arcpy.env.mask = edited_field_borders_shapefile
-
-# Set snap raster
-arcpy.env.snapRaster = classified_raster
-
-# 0.3 Check out Spatial Analyst Extension
-arcpy.CheckOutExtension('Spatial')   
-    
-#----------------------------------------------------------------------------------------------
-
-def run_tool_seven_point_five(input_raster):
-   # 1. Make a copy of Classified Raster and save as Classified Tiff (so as to avoid in later steps error 00499: table is not editable)
-
-    classified_tiff = classified_raster
-    classified_tiff_name = os.path.basename(os.path.splitext(classified_raster)[0])
-    #iteration_number = classified_tiff_name.split('fields_', 1)[1]
-    
-    #arcpy.CopyRaster_management(in_raster = classified_raster, out_rasterdataset = classified_tiff)
+    # 4. Report fields whose Crop_label changed since the previous iteration, and acreage shift per crop
     
-    #arcpy.AddMessage('Generated Classified Tiff: ' + classified_tiff)
+    previous_labels = previous_labels_path(directory = docs_path, region_and_time = region_and_time_caps, iteration = iteration_number)
     
-    #----------------------------------------------------------------------------------------------
+    if previous_labels:
+        previous_iteration, previous_path = previous_labels
+        changed_fields, crop_shift = compare_labels(previous_labels = load_labels(path = previous_path), labels = labels)
     
-    # 2. Delete attribute table field, Crop, if already present in Classified Tiff (ignoring case)
+        label_changes_table_name = region_and_time_caps + '_label_changes_' + iteration_number + '.dbf'
+        label_changes_table = os.path.join(docs_path, label_changes_table_name)
+        write_table(in_array = changed_fields, out_table = label_changes_table)
     
-    tiff_fields = [field.name.upper() for field in arcpy.ListFields(dataset = classified_tiff)]
-    for i in tiff_fields:
-        if i == 'CROP':
-            arcpy.DeleteField_management(in_table = classified_tiff, drop_field = i)
+        arcpy.AddMessage(str(len(changed_fields)) + ' fields (' + str(round(changed_fields['ACRES'].sum(), 1)) + ' acres) changed Crop_label since iteration ' + previous_iteration + '; see Label Changes Table: ' + label_changes_table)
+        for c in crop_shift[crop_shift['SHIFT'] != 0]:
+            arcpy.AddMessage('Crop_label ' + str(c['Crop_label']) + ': ' + str(round(c['PREV_ACRES'], 1)) + ' to ' + str(round(c['ACRES'], 1)) + ' acres (' + '{:+.1f}'.format(c['SHIFT']) + ')')
+    else:
+        arcpy.AddMessage('No Label Table of a previous iteration in Label Store; skipping comparison')
     
     #----------------------------------------------------------------------------------------------
     
-    # 3. Add attribute table field, Crop, to Classified Tiff
+    # 5. If requested, materialize Label Shapefile (a copy of Edited Field Borders Shapefile with Crop_label and crop), Bad Label Shapefile (training fields misclassified), and Training Label Shapefile
     
-    arcpy.AddField_management(in_table = classified_tiff, field_name = 'Crop', field_type = 'SHORT')
+    if materialize_label_shapefiles_is_checked:
+        label_shapefile_name = region_and_time_caps + '_label_' + iteration_number + '.shp'
+        label_shapefile = os.path.join(covs_path, label_shapefile_name)
+        bad_shapefile_name = region_and_time_caps + '_bad_label_' + iteration_number + '.shp'
+        bad_shapefile = os.path.join(covs_path, bad_shapefile_name)
+        training_label_shapefile_name = region_and_time_caps + '_training_label_' + iteration_number + '.shp'
+        training_label_shapefile = os.path.join(covs_path, training_label_shapefile_name)
     
-    arcpy.AddMessage('Added attribute table field: Crop to Classified Tiff')
-    
-    #----------------------------------------------------------------------------------------------
+        materialize_label_shapefiles(features = edited_field_borders_shapefile, labels = labels, label_shapefile = label_shapefile, bad_shapefile = bad_shapefile, training_label_shapefile = training_label_shapefile)
     
-    # 4. Populate attribute table field, Crop, with extracted crop type value from concatenated Signame 
-    
-    input_table_fields = ['Classvalue', 'Crop']# , 'Value']
-    with arcpy.da.UpdateCursor(in_table = classified_tiff, field_names = input_table_fields) as cursor:
-        for row in cursor:
-            row[1] = row[0]
-            #row[2] = row[0]
-            cursor.updateRow(row)
-                
-    arcpy.AddMessage(''''Populated Classified Tiff's attribute table field, Crop, with crop code value extracted from Signame''')
+        arcpy.AddMessage('Created Label Shapefile, Bad Label Shapefile, and Training Label Shapefile: ' + label_shapefile + ', ' + bad_shapefile + ', ' + training_label_shapefile)
     
     #----------------------------------------------------------------------------------------------
     
-    # 5. Reclassify Classified Tiff based on attribute table field, Crop
-    
-    region_and_time = os.path.basename(os.path.splitext(edited_field_borders_shapefile)[0]).rsplit(sep = '_', maxsplit = 1)[0]
-    region_and_time_caps = region_and_time.upper()
-    reclassified_raster_name = region_and_time + '_reclassified_' + iteration_number + '.img'
-    reclassified_raster = os.path.join(img_path, reclassified_raster_name)
-    
-    # Create dynamic remap values based on crop types present
-    
-    with arcpy.da.SearchCursor(classified_tiff, 'Crop') as cursor:
-        crop_list = sorted({row[0] for row in cursor})
-    
-    remap_list = [eval('[' +  str(i) + ' , ' + str(i) + ']') for i in crop_list]
+    # 6. Create Label Frequency Table with sum acreage for fields aggregated by the unique combination of: CLASS, aa, crop, and Crop_label
     
-    remap_values = RemapValue(remap_list)
-    
-    if 'out_reclassify' in locals():
-        arcpy.AddMessage('deleting out_reclassify')
-        del out_reclassify
-        
-    out_reclassify = Reclassify(in_raster = classified_tiff, reclass_field = 'Crop', remap = remap_values, missing_values = 'DATA')
- 
-    # Test whether Reclassified Raster can be generated (i.e. if re-running tool it may not be able to delete pre-exising raster) and exit script if not  
-    
-    try:
-        out_reclassify.save(reclassified_raster)
-    except RuntimeError:
-        arcpy.AddError('Cannot overwrite pre-existing ' + reclassified_raster + '; please re-run tool once more')
-        sys.exit(0)
+    frequency_table_name = region_and_time_caps + '_label_' + iteration_number + '_fre.dbf'
+    frequency_table = os.path.join(docs_path, frequency_table_name)
     
-    arcpy.AddMessage('Generated Reclassified Raster based on attribute table field, Crop')
+    write_table(in_array = label_frequency(labels = labels), out_table = frequency_table)
     
-    # Delete output reclassified raster variable otherwise it will cause a lock (ERROR 000871: Unable to delete the output) if the tool is re-run for the same iteration
-    del out_reclassify
+    arcpy.AddMessage('Created Label Frequency Table')
     
     #----------------------------------------------------------------------------------------------
     
-    # 6. In Edited Field Borders Shapefile attribute table field, MAJORITY, assign each field a classification value based on what the majority of pixels were assigned to  
-    
-    # Create Zonal Statistics Majority Table 
-    
-    edited_field_borders_shapefile_name = os.path.basename(edited_field_borders_shapefile)
-    majority_table_name = region_and_time_caps + '_majority_' + iteration_number + '.dbf'
-    majority_table = os.path.join(docs_path, majority_table_name)
-    
-    ZonalStatisticsAsTable(in_zone_data = edited_field_borders_shapefile, zone_field = 'FIELD_ID', in_value_raster = reclassified_raster, out_table = majority_table, ignore_nodata = 'DATA', statistics_type = 'MAJORITY')
+    # 7. Convert Label Frequency Table to Excel file
     
-    arcpy.AddMessage('Generated Zonal Statistics Majority Table: ' + majority_table)
-    
-    # Delete attribute table fields: MAJORITY or MAJORITY** (where ** corresponds to this iteration) in case user needs to re-run this same iteration
-    
-    delete_fields_list = ['MAJORITY', 'MJRTY' + iteration_number]
-    for d in delete_fields_list:
-        if arcpy.ListFields(dataset = edited_field_borders_shapefile, wild_card = d):
-            arcpy.DeleteField_management(in_table = edited_field_borders_shapefile, drop_field = d)
-            arcpy.AddMessage('Deleting pre-existing field from Edited Field Borders Shapefile: ' + str(d)) 
-    
-    # Join the majority values from the output table of Zonal Statistics as Table to the Edited Field Borders Shapefile
+    frequency_table_xlsx_name = os.path.splitext(frequency_table_name)[0] + '.xlsx'
+    frequency_table_xlsx = os.path.join(docs_path, frequency_table_xlsx_name)
     
-    arcpy.JoinField_management(in_data = edited_field_borders_shapefile, in_field = 'FIELD_ID', join_table = majority_table, join_field  = 'FIELD_ID', fields = 'MAJORITY')
+    arcpy.TableToExcel_conversion(Input_Table = frequency_table, Output_Excel_File = frequency_table_xlsx)
     
-    arcpy.AddMessage('Joined MAJORITY field from Zonal Statistics Table to Edited Field Borders Shapefile') 
+    arcpy.AddMessage('Coverted Label Frequency Table to Excel file')
     
-    #----------------------------------------------------------------------------------------------
+#----------------------------------------------------------------------------------------------
+
+# Run tool code only in the main process (parallel processes import this script, see majority_batch.py)
+
+if __name__ == '__main__':
+
+    # 0.1 Read in tool parameters
     
-    # 7. Create Label Shapefile, an exact copy of Edited Field Borders Shapefile
+    # User selects one or more Classified Rasters (ERDAS IMAGINE .img file)
+    classified_raster_list = arcpy.GetParameterAsText(0).split(';')
     
-    label_shapefile_name = region_and_time_caps + '_label_' + iteration_number + '.shp'
-    label_shapefile = os.path.join(covs_path, label_shapefile_name)
+    # User selects Edited Field Borders Shapefile
+    edited_field_borders_shapefile = arcpy.GetParameterAsText(1)
     
-    arcpy.Copy_management(in_data = edited_field_borders_shapefile, out_data = label_shapefile)
+    # User selects Image Directory
+    img_path = arcpy.GetParameterAsText(2)
     
-    arcpy.AddMessage('Created Label Shapefile: ' + label_shapefile)
+    # User selects Coverage Directory
+    covs_path = arcpy.GetParameterAsText(3)
     
-    #----------------------------------------------------------------------------------------------
+    # User selects Documents Directory
+    docs_path = arcpy.GetParameterAsText(4)
     
-    # 8. Create two new attribute table fields to Label Shapefile, Crop_label and crop 
+    # User selects two digit classification iteration number (of the first Classified Raster; each further Classified Raster is given the next iteration number)
+    iteration_number = arcpy.GetParameterAsText(5)
     
-    add_fields_list = ['Crop_label', 'crop']
-    for a in add_fields_list:
-        if arcpy.ListFields(dataset = label_shapefile, wild_card = a):
-            arcpy.DeleteField_management(in_table = label_shapefile, drop_field = a)
-        arcpy.AddField_management(in_table = label_shapefile, field_name = a, field_type = 'SHORT')
+    # User checks whether to also write Label, Bad Label, and Training Label Shapefiles (otherwise labels are only kept in Label Store, in Documents Directory)
+    materialize_label_shapefiles_is_checked = arcpy.GetParameterAsText(6) == 'true'
     
-    arcpy.AddMessage('Added attribute table fields: Crop_label and crop to Label Shapefile')
+    # User selects number of parallel processes for several Classified Rasters (default: number of processors less one)
+    parallel_processes = int(arcpy.GetParameterAsText(7)) if arcpy.GetParameterAsText(7) else None
     
-    #----------------------------------------------------------------------------------------------
+    #--------------------------------------------
     
-    # 9. Populate Label Shapefile attribute table fields, Crop_label and crop, with values from MAJORITY and CROP_TYPE, respectively
+    # 0.2 Set environment settings
     
-    comparison_fields = ['Crop_label', 'MAJORITY', 'crop', 'CROP_TYPE', 'CLASS']
-    with arcpy.da.UpdateCursor(label_shapefile, comparison_fields) as cursor:
-        for row in cursor:
-            row[0] = row[1]/100
-            row[2] = row[3]/100
-            cursor.updateRow(row)
+    # Overwrite output
+    arcpy.env.overwriteOutput = True
     
-    #----------------------------------------------------------------------------------------------
+    # 0.3 Assign iteration number to each Classified Raster and variable to base name used in nomenclature
     
-    # 10. Overwrite Label Shapefile attribute table field, Crop_label with known value, crop (i.e. CROP_TYPE) for known static ground truth fields ('CLASS' == 2
-            if row[4] == 2:
-                row[0] = row[2]
-                cursor.updateRow(row)
+    # Create dictionary with key: value pair as iteration number: Classified Raster
+    iteration_dictionary = {str(int(iteration_number) + i).zfill(len(iteration_number)): c.strip("'") for i, c in enumerate(classified_raster_list)}
     
-    arcpy.AddMessage('Populated Crop_label and crop attribute table values within Label Shapefile to match MAJORITY and CROP_TYPE and burned in CROP_TYPE for known static fields')
+    region_and_time = os.path.basename(os.path.splitext(edited_field_borders_shapefile)[0]).rsplit(sep = '_', maxsplit = 1)[0]
+    region_and_time_caps = region_and_time.upper()
     
     #----------------------------------------------------------------------------------------------
     
-    # 11. Create Label Frequency Table with sum acreage for fields aggregated by the unique combination of: CLASS, aa, crop, and Crop_label
-    
-    frequency_table_name = region_and_time_caps + '_label_' + iteration_number + '_fre.dbf'
-    frequency_table = os.path.join(docs_path, frequency_table_name)
+    # 1. For each Classified Raster (in parallel processes if several), in one pass over the raster count pixels of each Value per field and write Reclassified Raster, Zonal Statistics Majority Table, Class Fractions Table, and Label Table
     
-    arcpy.Frequency_analysis(in_table = label_shapefile, out_table = frequency_table, frequency_fields = ['CLASS', 'aa', 'crop', 'Crop_label'], summary_fields = 'ACRES')
+    # NOTE: Classified Raster attribute tables and Edited Field Borders Shapefile are only read, so Classified Rasters can be processed at the same time
     
-    arcpy.AddMessage('Created Label Frequency Table')
+    jobs = [{'classified_raster': c,
+             'features': edited_field_borders_shapefile,
+             'iteration_number': i,
+             'reclassified_raster': os.path.join(img_path, region_and_time + '_reclassified_' + i + '.img'),
+             'majority_table': os.path.join(docs_path, region_and_time_caps + '_majority_' + i + '.dbf'),
+             'class_fractions_table': os.path.join(docs_path, region_and_time_caps + '_class_fractions_' + i + '.dbf'),
+             'labels_path': label_store_path(directory = docs_path, region_and_time = region_and_time_caps, iteration = i)} for i, c in iteration_dictionary.items()]
     
-    #----------------------------------------------------------------------------------------------
+    arcpy.AddMessage('Processing ' + str(len(jobs)) + ' Classified Raster(s) as iteration(s): ' + ', '.join(iteration_dictionary))
     
-    # 12. Convert Label Frequency Table to Excel file
+    # Test whether pre-existing Reclassified Rasters and tables can be deleted (i.e. if re-running tool they may be locked) and exit script if not
     
-    frequency_table_xlsx_name = os.path.splitext(frequency_table_name)[0] + '.xlsx'
-    frequency_table_xlsx = os.path.join(docs_path, frequency_table_xlsx_name)
+    for job in jobs:
+        for output in [job['reclassified_raster'], job['majority_table'], job['class_fractions_table']]:
+            if arcpy.Exists(output):
+                try:
+                    arcpy.Delete_management(in_data = output)
+                except arcpy.ExecuteError:
+                    arcpy.AddError('Cannot overwrite pre-existing ' + output + '; please re-run tool once more')
+                    sys.exit(0)
     
-    arcpy.TableToExcel_conversion(Input_Table = frequency_table, Output_Excel_File = frequency_table_xlsx)
+    # Report the iteration that failed, with its error messages, and exit script
     
-    arcpy.AddMessage('Coverted Label Frequency Table to Excel file')
+    results = []
+    try:
+        for r in run_batch(jobs = jobs, max_workers = parallel_processes):
+            results.append(r)
+            arcpy.AddMessage('Generated Reclassified Raster' + (' (Value already crop code, so no remap applied)' if r['identity_remap'] else '') + ', Zonal Statistics Majority Table, Class Fractions Table, and Label Table of iteration: ' + r['iteration_number'])
+    except RuntimeError as e:
+        arcpy.AddError(str(e))
+        sys.exit(0)
     
     #----------------------------------------------------------------------------------------------
     
-    # 13. Rename MAJORITY attribute table field name to MAJORITY** in Edited Field Borders Shapefile, allowing subsequent iterations to reuse the name MAJORITY
-    
-    # Used workaround of creating new empty field with desired name, copy values, delete old field since cannot use arcpy.AlterField_management (as it only works on filegeodatabase shapefile) 
+    # 2. If several Classified Rasters, write Majority Iterations Table, the majority of each field keyed by iteration
     
-    field_borders_fields = [field.name for field in arcpy.ListFields(dataset = edited_field_borders_shapefile)]
-    
-    for field in field_borders_fields:
-        if field == 'MAJORITY':
-            arcpy.AddField_management(in_table = edited_field_borders_shapefile, field_name = 'MAJRTY' + iteration_number, field_type = 'SHORT')
-            arcpy.CalculateField_management(in_table = edited_field_borders_shapefile, field = 'MAJRTY' + iteration_number, expression = "!MAJORITY!", expression_type = 'PYTHON3')
-            arcpy.DeleteField_management(in_table = edited_field_borders_shapefile, drop_field = 'MAJORITY')
+    if len(results) > 1:
+        majority_iterations_table_name = region_and_time_caps + '_majority_iterations_' + results[0]['iteration_number'] + '_' + results[-1]['iteration_number'] + '.dbf'
+        majority_iterations_table = os.path.join(docs_path, majority_iterations_table_name)
+        
+        write_results_table(results = results, out_table = majority_iterations_table)
+        
+        arcpy.AddMessage('Generated Majority Iterations Table: ' + majority_iterations_table)
     
     #----------------------------------------------------------------------------------------------
     
-    # 14. Create Bad Label Shapefile representing training fields misclassified
+    # 3. In Edited Field Borders Shapefile attribute table fields, MAJRTY** (where ** corresponds to each iteration), assign each field a classification value based on what the majority of pixels were assigned to
     
-    bad_shapefile_name = region_and_time_caps + '_bad_label_' + iteration_number + '.shp'
-    bad_shapefile = os.path.join(covs_path, bad_shapefile_name)
+    # Delete pre-existing fields MAJORITY or MAJRTY** (in case user needs to re-run the same iterations), then add and populate the fields of all iterations in one bulk operation
     
-    arcpy.Select_analysis(in_features = label_shapefile, out_feature_class = bad_shapefile, where_clause = "\"crop\" > 0 AND \"crop\" <> \"Crop_label\" AND \"aa\" = 1")
+    majority_fields = write_majority_fields(features = edited_field_borders_shapefile, results = results, field_prefix = 'MAJRTY')
     
-    arcpy.AddMessage('Created Bad Label Shapefile')
+    arcpy.AddMessage('Added fields from Zonal Statistics majorities to Edited Field Borders Shapefile: ' + ', '.join(majority_fields)) 
     
     #----------------------------------------------------------------------------------------------
     
-    # 15. Generate training Label Shapefile, a subset of Label Shapefile that were training fields, regardless of whether classified correctly or not
-    
-    training_label_shapefile_name = region_and_time_caps + '_training_label_' + iteration_number + '.shp'
-    training_label_shapefile = os.path.join(covs_path, training_label_shapefile_name)
-    
-    arcpy.Select_analysis(in_features = label_shapefile, out_feature_class = training_label_shapefile, where_clause = "\"crop\" > 0 AND \"aa\" = 1")
+    # 4.-7. For each iteration, report changes, materialize label shapefiles (if requested), and create Label Frequency Table (and Excel file), in order of iteration
     
-    arcpy.AddMessage('Created Training Label Shapefile')
-    
-    #----------------------------------------------------------------------------------------------
-
-run_tool_seven_point_five(input_raster = classified_raster)
-
+    for r in results:
+        arcpy.AddMessage('Iteration: ' + r['iteration_number'])
+        run_tool_seven_point_five(iteration_number = r['iteration_number'], labels = r['labels'])
@@ -0,0 +1,154 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             aa_domains.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         numpy
+
+# Notes:            This module is imported by 3.00_Create_AA_Domains.py and crop_catalogue.py; it is not intended as a stand-alone script.
+#                   It works on numpy arrays only (no arcpy), so attribute tables are read and written by the calling script tool.
+
+# Description:      This module holds the accuracy assessment (AA) stratified domains as a declarative table: each crop code group is given a domain for each CROP_PCT band
+#                   (< 20, >= 20 and <= 60, and > 60), with Small Grains instead split by growth stage (senescent, GROWTH_STA = 5); the table is checked (no domain or crop code used twice)
+#                   and compiled into a (crop code x percent band) lookup table, so domains of all fields are assigned in one vectorized pass.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Define AA domain table
+# 2. Compile AA domain table into a lookup table of crop code and CROP_PCT band
+# 3. Assign AA domain of each field
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import numpy
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Define AA domain table
+
+# CROP_PCT band edges: band 0 is CROP_PCT < 20, band 1 is 20 <= CROP_PCT <= 60, band 2 is CROP_PCT > 60 (upper edge just above 60 so that 60 falls in band 1)
+percent_band_edges = numpy.array([20, numpy.nextafter(60, numpy.inf)])
+
+# Growth stage (GROWTH_STA) of senescent small grains
+senescent_growth_stage = 5
+
+# Each row: crop code group name, crop codes (list, or range for a span of codes), domains for CROP_PCT bands (< 20, 20 - 60, > 60), and domain of senescent fields (GROWTH_STA = 5) if different
+aa_domain_table = [
+    ('Alfalfa', [100], (1, 2, 3), None),
+    ('Cotton', [200], (4, 5, 6), None),
+    ('Small Grains', range(400, 500), (7, 8, 8), 9),
+    ('Field Grains', range(500, 600), (10, 11, 12), None),
+    ('Lettuce (General) and Head Lettuce', [600, 601], (13, 14, 15), None),
+    ('Leaf Lettuce (Green and Red) and Other Lettuce', [602, 603, 605], (16, 17, 18), None),
+    ('Spinach', [604], (19, 20, 21), None),
+    ('Melons (General) and Cucumbers', [700, 706], (22, 23, 24), None),
+    ('Watermelon, Honeydew, and Cantaloupe', [701, 702, 703], (25, 26, 27), None),
+    ('Squash', [704], (28, 29, 30), None),
+    ('Strawberries', [705], (31, 32, 33), None),
+    ('Tomatoes', [1000], (34, 35, 36), None),
+    ('Sudan', [1100], (37, 38, 39), None),
+    ('Sesbania', [1101, 1103], (40, 41, 42), None),
+    ('Clover', [1102, 1104], (43, 44, 45), None),
+    ('Legumes (General)', [1200], (46, 47, 48), None),
+    ('Beans (Green, Dry, and Garbanzo)', [1201, 1202, 1203], (49, 50, 51), None),
+    ('Peas', [1204], (52, 53, 54), None),
+    ('Peanuts', [1205], (55, 56, 57), None),
+    ('Peppers', [1206], (58, 59, 60), None),
+    ('Potatoes', [1207], (61, 62, 63), None),
+    ('Eggplant', [1208], (64, 65, 66), None),
+    ('Okra', [1209], (67, 68, 69), None),
+    ('Crucifers (General)', [1300], (70, 71, 72), None),
+    ('Broccoli, Cauliflower, and Cabbage', [1301, 1302, 1303], (73, 74, 75), None),
+    ('Bok-choy', [1304], (76, 77, 78), None),
+    ('Mustard', [1305], (79, 80, 81), None),
+    ('Kale', [1306], (82, 83, 84), None),
+    ('Fallow', [1403], (85, 85, 85), None),
+    ('Oil Crops', range(1600, 1700), (86, 87, 88), None),
+    ('Small Vegetables (General)', [1800], (89, 90, 91), None),
+    ('Carrots', [1801], (92, 93, 94), None),
+    ('Cilantro', [1802], (95, 96, 97), None),
+    ('Celery', [1803], (98, 99, 100), None),
+    ('Garlic, Onions (Dry), and Onions', [1804, 1805, 1806], (101, 102, 103), None),
+    ('Parsley', [1807], (104, 105, 106), None),
+    ('Radishes', [1808], (107, 108, 109), None),
+    ('Commercial Flowers', [1809], (110, 111, 112), None),
+    ('Root Vegetables (General) and Beets (Table)', [1900, 1901], (113, 114, 115), None),
+    ('Parsnip', [1902], (116, 117, 118), None),
+    ('Turnip and Rutabaga', [1903], (119, 120, 121), None),
+    ('Chard', [1904], (122, 123, 124), None),
+    ('Perennial Vegetables (General)', [2000], (125, 126, 127), None),
+    ('Artichokes', [2001], (128, 129, 130), None),
+    ('Sugar Beets', [2100], (131, 132, 133), None),
+    ('Miscellaneous Herbs (General) and Basil', [3400, 3403], (134, 135, 136), None),
+    ('Anise', [3401], (137, 138, 139), None),
+    ('Mint', [3402], (140, 141, 142), None),
+    ('Other Herb', [3404], (143, 144, 145), None),
+    ]
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Compile AA domain table into a lookup table of crop code and CROP_PCT band
+
+# Create function returning (crop code x CROP_PCT band) lookup table of domains (0 where crop code has no domain) and lookup table of crop code to senescent domain (0 if none);
+# raises ValueError if a crop code is in more than one group or a domain is given to more than one group
+def compile_domain_table(domain_table = aa_domain_table):
+
+    max_code = max(max(codes) for name, codes, band_domains, senescent_domain in domain_table)
+    band_lookup_table = numpy.zeros((max_code + 1, len(percent_band_edges) + 1), dtype = numpy.int16)
+    senescent_lookup_table = numpy.zeros(max_code + 1, dtype = numpy.int16)
+
+    # Create dictionary with key: value pair as domain: group name, to check that no domain is shared between groups
+    domain_groups = {}
+
+    for name, codes, band_domains, senescent_domain in domain_table:
+        codes = numpy.asarray(list(codes))
+        if band_lookup_table[codes].any():
+            raise ValueError('Crop code(s) of ' + name + ' already in another AA domain group: ' + str(codes[band_lookup_table[codes].any(axis = 1)].tolist()))
+        for d in set(band_domains) | ({senescent_domain} if senescent_domain else set()):
+            if d in domain_groups:
+                raise ValueError('AA domain ' + str(d) + ' given to both ' + domain_groups[d] + ' and ' + name)
+            domain_groups[d] = name
+        band_lookup_table[codes] = band_domains
+        if senescent_domain:
+            senescent_lookup_table[codes] = senescent_domain
+
+    return band_lookup_table, senescent_lookup_table
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Assign AA domain of each field
+
+# Create function returning AA domain of each field (0 where crop code has no domain, or CROP_PCT is missing (nan) and the domain depends on it), from arrays of crop code, CROP_PCT, and GROWTH_STA
+def assign_domains(crop_types, crop_pct, growth_stages, compiled_domain_table = None):
+
+    band_lookup_table, senescent_lookup_table = compiled_domain_table or compile_domain_table()
+
+    crop_types = numpy.asarray(crop_types, dtype = numpy.int64)
+    crop_pct = numpy.asarray(crop_pct, dtype = numpy.float64)
+    known = (crop_types >= 0) & (crop_types < len(band_lookup_table))
+    codes = numpy.where(known, crop_types, 0)
+
+    # Find CROP_PCT band of each field by binary search of band edges
+    bands = numpy.searchsorted(percent_band_edges, numpy.nan_to_num(crop_pct), side = 'right')
+    domains = numpy.where(known, band_lookup_table[codes, bands], 0)
+
+    # Fields without CROP_PCT only get a domain that does not depend on CROP_PCT (e.g. Fallow)
+    band_independent = (band_lookup_table[codes] == band_lookup_table[codes, :1]).all(axis = 1)
+    domains[numpy.isnan(crop_pct) & ~band_independent] = 0
+
+    # Senescent fields of groups split by growth stage (i.e. Small Grains)
+    senescent = known & (numpy.asarray(growth_stages) == senescent_growth_stage) & (senescent_lookup_table[codes] > 0)
+    domains[senescent] = senescent_lookup_table[codes[senescent]]
+
+    return domains
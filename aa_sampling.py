@@ -0,0 +1,107 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             aa_sampling.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         numpy
+
+# Notes:            This module is imported by 4.00_Select_Accuracy_Assessment_Fields.py; it is not intended as a stand-alone script.
+#                   It works on numpy arrays only (no arcpy), so attribute tables are read and written by the calling script tool.
+
+# Description:      This module draws a stratified random sample of fields by AA domain (aa_domain): the sample size is allocated among domains in proportion to their number of fields
+#                   (proportional) or their acreage (acreage weighted), and fields are drawn within each domain by sorting on random keys from a seeded generator,
+#                   so the same seed and fields always give the same sample.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Allocate sample size among strata
+# 2. Draw stratified random sample
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import numpy
+
+allocation_methods = ['Proportional', 'Acreage Weighted']
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Allocate sample size among strata
+
+# Create function returning number of fields to sample from each stratum, given stratum sizes (number of fields) and weights (number of fields or acreage):
+#   each stratum is first given min_per_stratum fields (or all its fields, if fewer), then the rest of sample_size is shared in proportion to weight by largest remainder,
+#   with strata that run out of fields capped and their share passed on to the others
+def allocate_samples(stratum_sizes, stratum_weights, sample_size, min_per_stratum = 0):
+
+    stratum_sizes = numpy.asarray(stratum_sizes, dtype = numpy.int64)
+    stratum_weights = numpy.asarray(stratum_weights, dtype = numpy.float64)
+    sample_size = min(int(sample_size), int(stratum_sizes.sum()))
+
+    allocation = numpy.minimum(stratum_sizes, min_per_stratum)
+    if allocation.sum() >= sample_size:
+        return allocation
+
+    while allocation.sum() < sample_size:
+        open_strata = (allocation < stratum_sizes) & (stratum_weights > 0)
+        if not open_strata.any():
+            open_strata = allocation < stratum_sizes
+            weights = open_strata.astype(numpy.float64)
+        else:
+            weights = numpy.where(open_strata, stratum_weights, 0)
+
+        remaining = sample_size - allocation.sum()
+        share = remaining * weights / weights.sum()
+        addition = numpy.floor(share).astype(numpy.int64)
+
+        # Give the fields left over by rounding down to the strata with the largest remainders
+        leftover = remaining - addition.sum()
+        if leftover > 0:
+            addition[numpy.argsort(-(share - addition), kind = 'mergesort')[:leftover]] += 1
+
+        allocation = numpy.minimum(allocation + addition, stratum_sizes)
+
+    return allocation
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Draw stratified random sample
+
+# Create function returning boolean mask of sampled fields and per-stratum summary (strata, number of fields, acreage, and number sampled) from array of stratum (e.g. aa_domain) of each field:
+#   sample_size is allocated by allocation method (Proportional: by number of fields; Acreage Weighted: by acres), and fields are drawn within each stratum in one vectorized pass
+#   by ranking them on random keys of a numpy.random.RandomState seeded with seed
+def stratified_sample(strata, sample_size, acres = None, allocation_method = 'Proportional', seed = 0, min_per_stratum = 0):
+
+    if allocation_method not in allocation_methods:
+        raise ValueError('Allocation method must be one of: ' + ', '.join(allocation_methods))
+
+    strata = numpy.asarray(strata)
+    acres = numpy.ones(len(strata)) if acres is None else numpy.asarray(acres, dtype = numpy.float64)
+
+    stratum_values, stratum_index, stratum_sizes = numpy.unique(strata, return_inverse = True, return_counts = True)
+    stratum_acres = numpy.bincount(stratum_index, weights = acres, minlength = len(stratum_values))
+    stratum_weights = stratum_sizes if allocation_method == 'Proportional' else stratum_acres
+
+    allocation = allocate_samples(stratum_sizes = stratum_sizes, stratum_weights = stratum_weights, sample_size = sample_size, min_per_stratum = min_per_stratum)
+
+    # Rank fields within each stratum by random key; fields ranked below the stratum's allocation are sampled
+    random_keys = numpy.random.RandomState(seed).random_sample(len(strata))
+    order = numpy.lexsort((random_keys, stratum_index))
+    stratum_starts = numpy.r_[0, numpy.cumsum(stratum_sizes)[:-1]]
+    rank = numpy.empty(len(strata), dtype = numpy.int64)
+    rank[order] = numpy.arange(len(strata)) - stratum_starts[stratum_index[order]]
+
+    sampled = rank < allocation[stratum_index]
+    summary = numpy.rec.fromarrays([stratum_values, stratum_sizes, stratum_acres, allocation, numpy.bincount(stratum_index, weights = acres * sampled, minlength = len(stratum_values))],
+                                   names = ['STRATUM', 'FIELDS', 'ACRES', 'SAMPLED', 'SAMP_ACRES'])
+
+    return sampled, summary
@@ -0,0 +1,171 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             change_journal.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         ArcGIS Pro, pandas
+
+# Notes:            This module is imported by the tools that edit field borders in place (0.50, 0.51 (via geometry_propagation.py), 0.60, 1.10, 3.00, and 4.00)
+#                   and by 0.70_Restore_from_Change_Journal.py; it is not intended as a stand-alone script.
+
+# Description:      This module keeps a Change Journal (SQLite database) of edits to attribute table fields (and geometry, as Esri JSON) of feature classes: one row per feature and field changed,
+#                   with OID, FIELD_ID, field, previous and new value, tool, and time stamp. The journal is append-only (updates and deletes are refused by the database),
+#                   so any feature class can be restored to its values at a point in time by writing back, for each feature and field changed since, the previous value of its first change after that time,
+#                   in place of full copies of the feature class before each edit.
+#                   The Change Journal of a feature class is change_journal.sqlite in the directory holding its geodatabase (or shapefile), e.g. the region directory created by Tool 0.00.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Find and create the Change Journal of a feature class
+# 2. Record changes
+# 3. Read changes and values at a point in time
+# 4. Restore a feature class to a point in time
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import arcpy, contextlib, datetime, os, pandas, re, sqlite3
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Find and create the Change Journal of a feature class
+
+# Create function returning catalog path of dataset (feature class path, or the feature class of a layer), as journal entries are keyed by it
+def dataset_path(dataset):
+    return os.path.normcase(os.path.abspath(arcpy.Describe(dataset).catalogPath))
+
+# Create function returning path of the Change Journal of a dataset: change_journal.sqlite in the directory holding its geodatabase, or its own directory if not in a geodatabase (e.g. shapefile)
+def journal_path(dataset):
+    path = dataset_path(dataset)
+    geodatabase = re.search(r'^(.*?\.gdb)(?=[\\/]|$)', path, re.IGNORECASE)
+    directory = os.path.dirname(geodatabase.group(1) if geodatabase else path)
+    return os.path.join(directory, 'change_journal.sqlite')
+
+# Create function returning connection to a Change Journal, creating its table (and triggers refusing updates and deletes, so it is append-only) if not present
+def connect(journal):
+
+    connection = sqlite3.connect(journal)
+    connection.execute('''CREATE TABLE IF NOT EXISTS changes (
+                              entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                              dataset TEXT NOT NULL,
+                              oid INTEGER NOT NULL,
+                              field_id INTEGER,
+                              field TEXT NOT NULL,
+                              old_value,
+                              new_value,
+                              tool TEXT,
+                              timestamp TEXT NOT NULL)''')
+    connection.execute('CREATE INDEX IF NOT EXISTS changes_dataset_timestamp ON changes (dataset, timestamp)')
+    connection.execute("CREATE TRIGGER IF NOT EXISTS changes_no_update BEFORE UPDATE ON changes BEGIN SELECT RAISE(ABORT, 'Change Journal is append-only'); END")
+    connection.execute("CREATE TRIGGER IF NOT EXISTS changes_no_delete BEFORE DELETE ON changes BEGIN SELECT RAISE(ABORT, 'Change Journal is append-only'); END")
+    return connection
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Record changes
+
+# Create function returning value as stored in the Change Journal: geometry as Esri JSON text, dates as ISO text, numpy scalars as Python numbers
+def journal_value(value):
+    if isinstance(value, arcpy.Geometry):
+        return value.JSON
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return value
+
+# Create function returning current time stamp, as recorded with changes (ISO, to the microsecond, so stamps sort in time order)
+def time_stamp(point_in_time = None):
+    return (point_in_time or datetime.datetime.now()).isoformat(sep = ' ', timespec = 'microseconds')
+
+# Create function recording changes of a dataset made by tool in its Change Journal in one transaction; changes is an iterable of (OID, FIELD_ID, field, previous value, new value)
+# with field 'SHAPE@' for geometry; changes where previous and new value are the same are not recorded. Returns number of changes recorded
+def record_changes(dataset, changes, tool, journal = None):
+
+    timestamp = time_stamp()
+    path = dataset_path(dataset)
+    entries = []
+    for oid, field_id, field, old_value, new_value in changes:
+        old_value, new_value = journal_value(old_value), journal_value(new_value)
+        if old_value != new_value:
+            entries.append((path, int(oid), None if field_id is None else int(field_id), field, old_value, new_value, tool, timestamp))
+
+    if entries:
+        with contextlib.closing(connect(journal or journal_path(dataset))) as connection:
+            with connection:
+                connection.executemany('INSERT INTO changes (dataset, oid, field_id, field, old_value, new_value, tool, timestamp) VALUES (?, ?, ?, ?, ?, ?, ?, ?)', entries)
+
+    return len(entries)
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Read changes and values at a point in time
+
+# Create function returning time stamp after which changes are read: that of point_in_time, or '' (before any change) if None
+def since_time_stamp(point_in_time):
+    return time_stamp(point_in_time) if point_in_time else ''
+
+# Create function returning data frame of changes of a dataset recorded after point_in_time (all changes if None), in the order recorded
+def read_changes(dataset, point_in_time = None, journal = None):
+    with contextlib.closing(connect(journal or journal_path(dataset))) as connection:
+        return pandas.read_sql_query('SELECT * FROM changes WHERE dataset = ? AND timestamp > ? ORDER BY entry_id', connection, params = (dataset_path(dataset), since_time_stamp(point_in_time)))
+
+# Create function returning dictionary with key: value pair as (OID, field): value at point_in_time (before any recorded change if None), of each feature and field changed after point_in_time
+# (the previous value of its first change after point_in_time)
+def values_at(dataset, point_in_time, journal = None):
+
+    # Read changes newest first, so that the first change after point_in_time of each feature and field is the one kept (values read directly, as pandas would turn integers with <NULL> into floats)
+    with contextlib.closing(connect(journal or journal_path(dataset))) as connection:
+        changes = connection.execute('SELECT oid, field, old_value FROM changes WHERE dataset = ? AND timestamp > ? ORDER BY entry_id DESC', (dataset_path(dataset), since_time_stamp(point_in_time))).fetchall()
+
+    return {(oid, field): old_value for oid, field, old_value in changes}
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Restore a feature class to a point in time
+
+# Create function writing back values at point_in_time (before any recorded change if None) of every feature and field changed since, in one update cursor pass (features selected by OID),
+# and recording the restore itself in the Change Journal, even if it stops part way (so a restore can in turn be undone); returns number of values restored
+def restore(dataset, point_in_time, tool = 'Restore', journal = None):
+
+    journal = journal or journal_path(dataset)
+    values = values_at(dataset = dataset, point_in_time = point_in_time, journal = journal)
+    if not values:
+        return 0
+
+    path = arcpy.Describe(dataset).catalogPath
+    fields = sorted({f for o, f in values})
+    has_field_id = any(f.name.upper() == 'FIELD_ID' for f in arcpy.ListFields(dataset = path))
+    cursor_fields = ['OID@', 'FIELD_ID' if has_field_id else 'OID@'] + fields
+    oids = sorted({o for o, f in values})
+
+    changes = []
+    try:
+        for c in range(0, len(oids), 1000):
+            SQL_clause = """{} IN ({})""".format(arcpy.AddFieldDelimiters(path, arcpy.Describe(path).OIDFieldName), ', '.join(str(o) for o in oids[c:c + 1000]))
+            with arcpy.da.UpdateCursor(in_table = path, field_names = cursor_fields, where_clause = SQL_clause) as cursor:
+                for row in cursor:
+                    row_changes = []
+                    for i, f in enumerate(fields, start = 2):
+                        if (row[0], f) in values:
+                            value = values[(row[0], f)]
+                            new_value = arcpy.AsShape(value, True) if f == 'SHAPE@' and value is not None else value
+                            row_changes.append((row[0], row[1] if has_field_id else None, f, row[i], new_value))
+                            row[i] = new_value
+                    cursor.updateRow(row)
+                    changes += row_changes
+    finally:
+        # Record values restored, even if the restore stopped part way, so they can be undone
+        record_changes(dataset = path, changes = changes, tool = tool, journal = journal)
+
+    return len(changes)
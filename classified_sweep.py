@@ -0,0 +1,135 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             classified_sweep.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         ArcGIS Pro, numpy
+
+# Notes:            This module is imported by 7.50_Recode_through_BadLabel.py and 7.51_Reclassify_and_Generate_Majority_Frequency_Table.py; it is not intended as a stand-alone script.
+
+# Description:      This module post-processes a classified raster in a single pass: it reads the classified raster block by block together with a raster of field feature IDs,
+#                   counts pixels of each classified Value in each field, and writes the reclassified (crop code) raster from the same blocks with a lookup table,
+#                   replacing the copy, attribute table edit, Reclassify, and Zonal Statistics as Table round trips; field majorities, top classes, and signature cross-tabulations are then taken from the counts.
+#                   Label shapefiles (copies of the field borders with Crop_label and crop) are only written on request, from the Label Table of label_store.py.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Rasterize feature IDs of a feature class on the grid of a classified raster
+# 2. In one pass over a classified raster, count pixels of each Value per feature and write reclassified raster
+# 3. Cross-tabulate pixel counts of each crop code per field (for majority and top classes of each field)
+# 4. Write numpy structured array to a table (replacing any pre-existing table)
+# 5. Materialize Label, Bad Label, and Training Label Shapefiles from a Label Table
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import arcpy, numpy, os
+from segment_cache import iterate_blocks
+from zonal_tables import apply_lookup_table, block_counts, crosstabulate, lookup_table, merge_counts
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Rasterize feature IDs of a feature class on the grid of a classified raster
+
+def rasterize_feature_ids(features, classified_raster, feature_id_raster):
+    arcpy.env.snapRaster = classified_raster
+    arcpy.env.extent = classified_raster
+    arcpy.PolygonToRaster_conversion(in_features = features, value_field = arcpy.Describe(features).OIDFieldName, out_rasterdataset = feature_id_raster, cell_assignment = 'CELL_CENTER', cellsize = classified_raster)
+    arcpy.ClearEnvironment('extent')
+    return feature_id_raster
+
+#----------------------------------------------------------------------------------------------
+
+# 2. In one pass over a classified raster, count pixels of each Value per feature and write reclassified raster
+
+# Create function returning feature IDs, Values, and pixel counts of every (feature ID, Value) combination of a classified raster, and (if reclassified_raster given)
+# writing the crop code of every pixel within a feature (Value looked up in value_lookup_table, as compiled by compile_lookup_table, so an identity remap is skipped; pixels outside features and of code 0 are NoData)
+def sweep_classified_raster(classified_raster, feature_id_raster, value_lookup_table, reclassified_raster = None, pixel_type = '16_BIT_UNSIGNED'):
+
+    describe = arcpy.Describe(classified_raster)
+    cell_width = describe.meanCellWidth
+    cell_height = describe.meanCellHeight
+    block_counts_list = []
+    block_rasters = []
+
+    for row, column, block_rows, block_columns in iterate_blocks(rows = describe.height, columns = describe.width):
+        lower_left_corner = arcpy.Point(describe.extent.XMin + column * cell_width, describe.extent.YMax - (row + block_rows) * cell_height)
+        value_block = arcpy.RasterToNumPyArray(in_raster = classified_raster, lower_left_corner = lower_left_corner, ncols = block_columns, nrows = block_rows, nodata_to_value = 0)
+        id_block = arcpy.RasterToNumPyArray(in_raster = feature_id_raster, lower_left_corner = lower_left_corner, ncols = block_columns, nrows = block_rows, nodata_to_value = -1)
+
+        block_counts_list.append(block_counts(zone_block = id_block, value_block = value_block))
+
+        if reclassified_raster:
+            code_block = apply_lookup_table(table = value_lookup_table, array = value_block)
+            code_block[id_block == -1] = 0
+            block_raster = os.path.splitext(reclassified_raster)[0] + '_block_' + str(len(block_rasters)) + '.tif'
+            arcpy.NumPyArrayToRaster(in_array = code_block, lower_left_corner = lower_left_corner, x_cell_size = cell_width, y_cell_size = cell_height, value_to_nodata = 0).save(block_raster)
+            block_rasters.append(block_raster)
+
+    # Mosaic blocks into reclassified raster and delete blocks
+    if block_rasters:
+        arcpy.MosaicToNewRaster_management(input_rasters = block_rasters, output_location = os.path.dirname(reclassified_raster), raster_dataset_name_with_extension = os.path.basename(reclassified_raster), coordinate_system_for_the_raster = describe.spatialReference, pixel_type = pixel_type, number_of_bands = 1)
+        for b in block_rasters:
+            arcpy.Delete_management(in_data = b)
+
+    return merge_counts(block_counts_list)
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Cross-tabulate pixel counts of each crop code per field (for majority and top classes of each field)
+
+# Create function returning zone values (e.g. FIELD_ID; features sharing a value form one zone), crop codes, and a (zone, crop code) matrix of pixel counts, from which
+# zonal_majority gives majority crop code of each zone and zonal_top_classes its top crop codes, fractions, and purity; NoData (crop code 0) is ignored, as Zonal Statistics with ignore_nodata DATA
+def field_class_counts(feature_counts, features, value_lookup_table, zone_field = 'FIELD_ID'):
+
+    feature_ids, values, counts = feature_counts
+    feature_array = arcpy.da.FeatureClassToNumPyArray(in_table = features, field_names = ['OID@', zone_field])
+
+    zones = apply_lookup_table(table = lookup_table(values = feature_array['OID@'], codes = feature_array[zone_field], nodata_value = -1, dtype = numpy.int64), array = feature_ids, nodata_value = -1)
+    codes = apply_lookup_table(table = value_lookup_table, array = values)
+
+    return crosstabulate(zone_array = zones, class_array = codes, zone_nodata_value = -1, class_nodata_value = 0, weights = counts)
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Write numpy structured array to a table (replacing any pre-existing table, as NumPyArrayToTable does not overwrite)
+
+def write_table(in_array, out_table):
+    if arcpy.Exists(out_table):
+        arcpy.Delete_management(in_data = out_table)
+    arcpy.da.NumPyArrayToTable(in_array = in_array, out_table = out_table)
+    return out_table
+
+#----------------------------------------------------------------------------------------------
+
+# 5. Materialize Label, Bad Label, and Training Label Shapefiles from a Label Table
+
+# Create function copying features to Label Shapefile with attribute table fields MAJORITY, Crop_label, and crop from labels (Label Table of features, matched by OID),
+# and selecting from it Bad Label Shapefile (misclassified training fields) and Training Label Shapefile (training fields)
+def materialize_label_shapefiles(features, labels, label_shapefile, bad_shapefile, training_label_shapefile):
+
+    arcpy.Copy_management(in_data = features, out_data = label_shapefile)
+
+    # Delete any pre-existing label fields in one schema change, then add and populate them in one bulk operation (matched by OID; Crop_label and crop as SHORT, i.e. 16 bit integers)
+    add_fields_list = ['MAJORITY', 'Crop_label', 'crop']
+    delete_fields_list = [f.name for f in arcpy.ListFields(dataset = label_shapefile) if f.name in add_fields_list]
+    if delete_fields_list:
+        arcpy.DeleteField_management(in_table = label_shapefile, drop_field = delete_fields_list)
+
+    label_array = numpy.rec.fromarrays([labels['OID'], labels['MAJORITY'], labels['Crop_label'].astype(numpy.int16), labels['crop'].astype(numpy.int16)], names = ['LABEL_OID'] + add_fields_list)
+    arcpy.da.ExtendTable(in_table = label_shapefile, table_match_field = arcpy.Describe(label_shapefile).OIDFieldName, in_array = label_array, array_match_field = 'LABEL_OID')
+
+    arcpy.Select_analysis(in_features = label_shapefile, out_feature_class = bad_shapefile, where_clause = "\"crop\" > 0 AND \"crop\" <> \"Crop_label\" AND \"aa\" = 1")
+    arcpy.Select_analysis(in_features = label_shapefile, out_feature_class = training_label_shapefile, where_clause = "\"crop\" > 0 AND \"aa\" = 1")
+
+    return label_shapefile, bad_shapefile, training_label_shapefile
@@ -0,0 +1,156 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             crop_catalogue.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         numpy
+
+# Notes:            This module is imported by 0.30, 1.10, 2.00, 3.00, 7.05, and 7.50; it is not intended as a stand-alone script.
+#                   It works on numpy arrays only (no arcpy), so attribute tables are read and written by the calling script tool.
+
+# Description:      This module holds the crop catalogue: each crop code (Crop_Type) with its crop name, and its crop group (the general code of its hundreds, e.g. 401 Oats is in group 400 Small Grains).
+#                   Codes of the Fallow group (14**) are flagged as fallow, with 1403 the code given to fallow fields, and AA domains of each crop code and CROP_PCT band are those of the AA domain table (see aa_domains.py).
+#                   The catalogue is checked (including that every crop code of the AA domain table is in it) and compiled into dense lookup tables indexed by crop code once, when the module is first imported, so crop codes of all fields are mapped
+#                   to names, groups, and fallow flags in one vectorized pass; codes not in the catalogue (including <NULL> read as a negative value) are reported as unknown rather than raising an error.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Define crop catalogue
+# 2. Compile crop catalogue into lookup tables of crop code
+# 3. Map crop codes to names, groups, and fallow flags
+# 4. Extract crop code from Signame
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import numpy
+from aa_domains import aa_domain_table, compile_domain_table
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Define crop catalogue
+
+# Crop code given to fallow fields
+fallow_crop_code = 1403
+
+# Crop group of fallow crop codes
+fallow_group_code = 1400
+
+# Each row: crop code and crop name; the general code of each crop group (e.g. 400 Small Grains) is listed first
+crop_catalogue = [
+    (100, 'Alfalfa'),
+    (200, 'Cotton'),
+    (400, 'Small Grains'), (401, 'Oats'), (402, 'Rye'), (403, 'Barley'), (404, 'Millet'), (405, 'Wheat'),
+    (500, 'Field Grain'), (501, 'Corn'), (502, 'Sorghum'), (503, 'Milo'),
+    (600, 'Lettuce'), (601, 'Head Lettuce'), (602, 'Green Leaf Lettuce'), (603, 'Red Leaf Lettuce'), (604, 'Spinach'), (605, 'Other Lettuce'), (606, 'Chard'),
+    (700, 'Melons'), (701, 'Watermelon'), (702, 'Honeydew'), (703, 'Cantaloupe'), (704, 'Squash'), (705, 'Strawberries'), (706, 'Cucumbers'),
+    (800, 'Bermuda/Rye'), (801, 'Bermuda'), (802, 'Bermuda with Rye'), (803, 'Klein'), (804, 'Timothy'), (806, 'Fallowed Bermuda'),
+    (1000, 'Tomatoes'),
+    (1100, 'Sudan'), (1101, 'Sesbania'), (1102, 'Clover'), (1103, 'Sesbania'), (1104, 'Clover'), # Sesbania and Clover are 1101 and 1102 in AA domains of Tool 3.00, 1103 and 1104 in crop codes of Tool 7.05
+    (1200, 'Legume'), (1201, 'Green Beans'), (1202, 'Dry Beans'), (1203, 'Garbonzo Beans'), (1204, 'Peas'), (1205, 'Peanuts'), (1206, 'Peppers'), (1207, 'Potatoes'), (1208, 'Egglant'), (1209, 'Okra'),
+    (1300, 'Crucifers'), (1301, 'Broccoli'), (1302, 'Cauliflower'), (1303, 'Cabbage'), (1304, 'Boy-choy'), (1305, 'Mustard'), (1306, 'Kale'),
+    (1400, 'Fallow'), (1402, 'Fallow'), (1403, 'Fallow'),
+    (1600, 'Oil Crops'), (1601, 'Safflower'), (1602, 'Canola'), (1603, 'Sunflower'), (1604, 'Sesame'),
+    (1800, 'Small Vegetables'), (1801, 'Carrots'), (1802, 'Cilantro'), (1803, 'Celery'), (1804, 'Garlic'), (1805, 'Onions'), (1806, 'Scallions'), (1807, 'Parsley'), (1808, 'Radishes'), (1809, 'Commercial Flowers'),
+    (1900, 'Root Vegetables'), (1901, 'Beets'), (1902, 'Parsnip'), (1903, 'Turnip and Rutabaga'), (1904, 'Chard'),
+    (2000, 'Perennial Vegetables'), (2001, 'Artichokes'),
+    (2100, 'Sugar Beets'),
+    (3400, 'Miscellaneous Herbs'), (3401, 'Anise'), (3402, 'Mint'), (3403, 'Basil'), (3404, 'Other Herb'),
+    ]
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Compile crop catalogue into lookup tables of crop code
+
+# Create function returning lookup tables indexed by crop code of crop name ('' where crop code is not in catalogue), crop group (0 where not in catalogue), and fallow flag;
+# raises ValueError if a crop code is listed more than once or the general code of its group is not in the catalogue
+def compile_catalogue(catalogue = crop_catalogue):
+
+    codes = numpy.array([code for code, name in catalogue], dtype = numpy.int64)
+    unique_codes, counts = numpy.unique(codes, return_counts = True)
+    if (counts > 1).any():
+        raise ValueError('Crop code(s) listed more than once in crop catalogue: ' + str(unique_codes[counts > 1].tolist()))
+
+    groups = codes // 100 * 100
+    missing_groups = numpy.setdiff1d(groups, codes)
+    if len(missing_groups):
+        raise ValueError('General code of crop group(s) not in crop catalogue: ' + str(missing_groups.tolist()))
+
+    name_lookup_table = numpy.full(codes.max() + 1, '', dtype = 'U' + str(max(len(name) for code, name in catalogue)))
+    name_lookup_table[codes] = [name for code, name in catalogue]
+
+    group_lookup_table = numpy.zeros(codes.max() + 1, dtype = numpy.int32)
+    group_lookup_table[codes] = groups
+
+    fallow_lookup_table = group_lookup_table == fallow_group_code
+
+    return name_lookup_table, group_lookup_table, fallow_lookup_table
+
+# Create function raising ValueError if a crop code of the AA domain table (see aa_domains.py) is not in the crop catalogue; groups given as a range of codes (e.g. range(400, 500) for Small Grains)
+# take any code of the group, so only the general code of the group (e.g. 400) must be in the catalogue
+def check_domain_codes(catalogue = crop_catalogue, domain_table = aa_domain_table):
+
+    catalogue_codes = {code for code, name in catalogue}
+    missing_codes = sorted({code for name, codes, band_domains, senescent_domain in domain_table for code in ([codes[0] // 100 * 100] if isinstance(codes, range) else codes)} - catalogue_codes)
+    if missing_codes:
+        raise ValueError('Crop code(s) of AA domain table not in crop catalogue: ' + str(missing_codes))
+
+# Compile lookup tables once per process (on first import of this module), after checking that every crop code of the AA domain table is in the crop catalogue
+check_domain_codes()
+name_lookup_table, group_lookup_table, fallow_lookup_table = compile_catalogue()
+
+# AA domain lookup tables of crop code and CROP_PCT band, and of crop code to senescent domain (see aa_domains.py), likewise compiled once per process
+aa_domain_lookup_tables = compile_domain_table()
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Map crop codes to names, groups, and fallow flags
+
+# Create function returning array of crop codes as int64 (with codes outside the lookup tables, e.g. <NULL> read as -9999, set to 0, which is not in the catalogue) and mask of crop codes in the catalogue
+def _catalogue_index(crop_types):
+    crop_types = numpy.asarray(crop_types, dtype = numpy.int64)
+    in_range = (crop_types >= 0) & (crop_types < len(name_lookup_table))
+    codes = numpy.where(in_range, crop_types, 0)
+    return codes, group_lookup_table[codes] > 0
+
+# Create function returning mask of crop codes in the crop catalogue
+def known_crop_codes(crop_types):
+    return _catalogue_index(crop_types)[1]
+
+# Create function returning array of crop names of crop codes, with unknown_name where crop code is not in the crop catalogue
+def crop_names(crop_types, unknown_name = ''):
+    codes, known = _catalogue_index(crop_types)
+    names = name_lookup_table[codes].astype(object)
+    names[~known] = unknown_name
+    return names
+
+# Create function returning array of crop groups (general code, e.g. 400) of crop codes, 0 where crop code is not in the crop catalogue
+def crop_groups(crop_types):
+    codes, known = _catalogue_index(crop_types)
+    return group_lookup_table[codes]
+
+# Create function returning mask of fallow crop codes (crop group 1400)
+def fallow_crop_codes(crop_types):
+    codes, known = _catalogue_index(crop_types)
+    return fallow_lookup_table[codes]
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Extract crop code from Signame
+
+# Create function returning crop code of a Signame (FIELD_ID - eCognition Segment number - Crop_Type - CROP_PCT - GROWTH_STA - CONDITION, see Tool 7.00), 0 if it has none (e.g. Unclassified or blank)
+def signame_crop_code(signame):
+    signame_parts = (signame or '').split('-')
+    if len(signame_parts) > 2 and signame_parts[2].strip().isdigit():
+        return int(signame_parts[2])
+    return 0
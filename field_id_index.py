@@ -0,0 +1,80 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             field_id_index.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         ArcGIS Pro, numpy
+
+# Notes:            This module is imported by 0.50_Reshape_Field_Borders.py, 0.60_Update_Field_Values.py, and 1.10_Record_and_Update_Fallowing_Program_Fields.py; it is not intended as a stand-alone script.
+
+# Description:      This module indexes the features of a feature class by FIELD_ID and REGION (FIELD_IDs are only unique within a region), reading both fields in one pass
+#                   and counting features per (FIELD_ID, REGION) with one numpy.unique, so that duplicate FIELD_IDs are found in O(n log n) rather than by counting each value in a list.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Index features by FIELD_ID and REGION
+# 2. Find duplicate FIELD_IDs per REGION
+# 3. Read FIELD_ID and REGION of a feature class and find its duplicate FIELD_IDs
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import arcpy, numpy
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Index features by FIELD_ID and REGION
+
+# Create function returning unique (FIELD_ID, REGION) keys, index of each feature's key in them, and number of features per key
+def index_field_ids(field_ids, regions):
+    keys = numpy.rec.fromarrays([numpy.asarray(field_ids), numpy.asarray(regions)], names = ['FIELD_ID', 'REGION'])
+    unique_keys, key_index, key_counts = numpy.unique(keys, return_inverse = True, return_counts = True)
+    return unique_keys, key_index.ravel(), key_counts
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Find duplicate FIELD_IDs per REGION
+
+# Create function returning structured array of (FIELD_ID, REGION) keys shared by more than one feature: FIELD_ID, REGION, and COUNT (number of features)
+def duplicate_field_ids(field_ids, regions):
+    unique_keys, key_index, key_counts = index_field_ids(field_ids = field_ids, regions = regions)
+    duplicated = key_counts > 1
+    return numpy.rec.fromarrays([unique_keys['FIELD_ID'][duplicated], unique_keys['REGION'][duplicated], key_counts[duplicated]], names = ['FIELD_ID', 'REGION', 'COUNT'])
+
+# Create function returning boolean mask of features whose (FIELD_ID, REGION) key is shared with another feature
+def duplicate_mask(field_ids, regions):
+    unique_keys, key_index, key_counts = index_field_ids(field_ids = field_ids, regions = regions)
+    return key_counts[key_index] > 1
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Read FIELD_ID and REGION of a feature class and find its duplicate FIELD_IDs
+
+# Create function returning structured array of OID, FIELD_ID, and REGION of each feature read in one pass (REGION '' if the feature class has no REGION field; <NULL> FIELD_ID as -1 and REGION as '')
+def read_field_ids(feature_class):
+
+    has_region = any(f.name.upper() == 'REGION' for f in arcpy.ListFields(dataset = feature_class))
+    field_array = arcpy.da.FeatureClassToNumPyArray(in_table = feature_class, field_names = ['OID@', 'FIELD_ID'] + (['REGION'] if has_region else []), skip_nulls = False,
+                                                    null_value = {'FIELD_ID': -1, 'REGION': ''})
+
+    regions = field_array['REGION'] if has_region else numpy.full(len(field_array), '', dtype = 'U1')
+    return numpy.rec.fromarrays([field_array['OID@'], field_array['FIELD_ID'], regions], names = ['OID', 'FIELD_ID', 'REGION'])
+
+# Create function returning duplicate FIELD_IDs per REGION (FIELD_ID, REGION, COUNT) of a feature class
+def check_duplicate_field_ids(feature_class):
+    field_array = read_field_ids(feature_class = feature_class)
+    return duplicate_field_ids(field_ids = field_array['FIELD_ID'], regions = field_array['REGION'])
+
+# Create function returning list of 'FIELD_ID (REGION) x COUNT' strings of duplicate FIELD_IDs, for tool messages
+def format_duplicates(duplicates):
+    return [str(d['FIELD_ID']) + (' (' + str(d['REGION']) + ')' if d['REGION'] else '') + ' x ' + str(d['COUNT']) for d in duplicates]
@@ -0,0 +1,235 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             geometry_propagation.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         ArcGIS Pro, pandas
+
+# Notes:            This module is imported by 0.50_Reshape_Field_Borders.py and 0.51_Propagate_Reshaped_Field_Borders.py; it is not intended as a stand-alone script.
+#                   Parallel processes are started with the ArcGIS Pro python.exe (not ArcGISPro.exe), as required for multiprocessing from a script tool,
+#                   so the calling script tool must run its tool code only under if __name__ == '__main__'.
+
+# Description:      This module overwrites the geometry (and ACRES and GIS_COMMENTS) of field border features with that of reshaped fields of matching FIELD_ID and REGION,
+#                   reading only matching features (FIELD_ID IN (...) AND REGION = ... where clause, backed by an attribute index on FIELD_ID). It also finds every time-period
+#                   geodatabase of a region created by Tool 0.00 (<year directory>/T*_<year>/<REGION>_T*_<year>/<REGION>_T*_<year>.gdb) and propagates reshaped fields to all of them,
+#                   one process per geodatabase (only its field borders feature class, named as the geodatabase unless another name is given), with the edits of each geodatabase made in one edit session that is saved only if all of them succeed (otherwise none are saved).
+#                   Previous and new geometry, GIS_COMMENTS, and ACRES of features updated are recorded in the Change Journal (see change_journal.py) once saved.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Find time-period geodatabases of a region and their field border feature classes
+# 2. Read reshaped field geometries
+# 3. Overwrite geometry of matching features of a feature class
+# 4. Propagate reshaped field geometries to all feature classes of a geodatabase in one edit session
+# 5. Propagate reshaped field geometries to several geodatabases in parallel processes
+# 6. Write change report
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import arcpy, fnmatch, glob, multiprocessing, os, pandas, re, sys
+from change_journal import record_changes
+from concurrent.futures import ProcessPoolExecutor
+
+# Attribute table fields edited by reshape_feature_class (so required of every feature class reshaped)
+reshape_fields = ['FIELD_ID', 'REGION', 'GIS_COMMENTS', 'ACRES']
+
+# Attribute table fields of change report
+change_report_fields = ['PERIOD', 'GEODATABASE', 'FEATURE_CLASS', 'FIELD_ID', 'OLD_ACRES', 'NEW_ACRES', 'STATUS']
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Find time-period geodatabases of a region and their field border feature classes
+
+# Create function returning list of (time period (e.g. T1_2019), geodatabase path) of each region geodatabase in year directory (e.g. cy2019), in time period order
+def find_period_geodatabases(year_directory, region):
+
+    period_pattern = re.compile(re.escape(region) + r'_(T(\d+)_\d{4})\.gdb$', re.IGNORECASE)
+    period_geodatabases = []
+
+    for geodatabase in glob.glob(os.path.join(year_directory, 'T*_*', region + '_T*_*', region + '_T*_*.gdb')):
+        match = period_pattern.match(os.path.basename(geodatabase))
+        if match:
+            period_geodatabases.append((int(match.group(2)), match.group(1).upper(), geodatabase))
+
+    return [(period, geodatabase) for number, period, geodatabase in sorted(period_geodatabases)]
+
+# Create function returning list of field border feature classes of geodatabase (including those in feature datasets): polygon feature classes named feature_class_name (a wildcard, case-insensitive;
+# default: the name of the geodatabase, e.g. IID_T1_2019, as named by Tools 0.00 and 0.10) with all attribute table fields of reshape_fields, so that other feature classes holding FIELD_ID and REGION
+# (e.g. Fallowing Program Fields of Tool 1.10, or backup copies) are left as they are
+def list_field_border_feature_classes(geodatabase, feature_class_name = None):
+
+    feature_class_name = feature_class_name or os.path.splitext(os.path.basename(geodatabase))[0]
+
+    feature_classes = []
+    for directory_path, directory_names, file_names in arcpy.da.Walk(geodatabase, datatype = 'FeatureClass', type = 'Polygon'):
+        for f in file_names:
+            if not fnmatch.fnmatch(f.upper(), feature_class_name.upper()):
+                continue
+            feature_class = os.path.join(directory_path, f)
+            field_names = [field.name.upper() for field in arcpy.ListFields(dataset = feature_class)]
+            if all(r in field_names for r in reshape_fields):
+                feature_classes.append(feature_class)
+
+    return feature_classes
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Read reshaped field geometries
+
+# Create function returning dictionary with key: value pair as FIELD_ID: SHAPE@ of (selected) features in Reshaped Fields, using the attribute table field of the matching FIELD_ID (earlier_field_id or later_field_id)
+def read_reshaped_geometries(reshaped_fields, id_field):
+    with arcpy.da.SearchCursor(reshaped_fields, [id_field, 'SHAPE@']) as cursor:
+        return {row[0]: row[1] for row in cursor if row[0] is not None}
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Overwrite geometry of matching features of a feature class
+
+# Create function adding an attribute index on FIELD_ID to feature class if it has none, so that where clauses on FIELD_ID are answered from the index rather than by reading every feature;
+# returns True if index was added, False if already present, and None if it could not be added (feature class locked; the where clause still limits which features are updated)
+def add_field_id_index(feature_class):
+    catalog_path = arcpy.Describe(feature_class).catalogPath
+    indexed_fields = [f.name.upper() for index in arcpy.ListIndexes(dataset = catalog_path) for f in index.fields]
+    if 'FIELD_ID' in indexed_fields:
+        return False
+    try:
+        arcpy.AddIndex_management(in_table = catalog_path, fields = 'FIELD_ID', index_name = 'FIELD_ID_idx')
+    except arcpy.ExecuteError:
+        return None
+    return True
+
+# Create function overwriting geometry of features of feature class with FIELD_ID in geometries (dictionary of FIELD_ID: geometry) and REGION of region, and updating their ACRES and GIS_COMMENTS:
+#   only features matching a where clause of FIELD_ID IN (...) AND REGION = region are read, and ACRES is computed from each new geometry (planar, as with !shape.area@ACRES!),
+#   so other features are untouched. Returns list of (FIELD_ID, previous ACRES, new ACRES) of features updated; if journal_changes (a list) is given,
+#   (OID, FIELD_ID, field, previous value, new value) of SHAPE@, GIS_COMMENTS, and ACRES of each feature updated are appended to it, for the Change Journal
+def reshape_feature_class(feature_class, geometries, region, gis_comment, journal_changes = None):
+
+    # Split FIELD_IDs into chunks so where clauses stay within database limits on IN lists
+    field_ids = sorted(geometries)
+    field_id_chunks = [field_ids[c:c + 1000] for c in range(0, len(field_ids), 1000)]
+
+    spatial_reference = arcpy.Describe(feature_class).spatialReference
+    changes = []
+
+    for chunk in field_id_chunks:
+        SQL_clause = """{} IN ({}) AND {} = '{}'""".format(arcpy.AddFieldDelimiters(feature_class, 'FIELD_ID'), ', '.join(str(f) for f in chunk), arcpy.AddFieldDelimiters(feature_class, 'REGION'), region.replace("'", "''"))
+        with arcpy.da.UpdateCursor(feature_class, ['FIELD_ID', 'SHAPE@', 'GIS_COMMENTS', 'ACRES', 'OID@'], where_clause = SQL_clause) as cursor:
+            for row in cursor:
+                previous_row = list(row)
+                # Project reshaped geometry to the feature class's coordinate system so that ACRES is computed as it will be stored
+                shape = geometries[row[0]].projectAs(spatial_reference)
+                changes.append((row[0], row[3], shape.getArea('PLANAR', 'ACRES')))
+                row[1] = shape
+                row[2] = gis_comment
+                row[3] = changes[-1][2]
+                cursor.updateRow(row)
+                if journal_changes is not None:
+                    journal_changes += [(row[4], row[0], field, previous_row[f], row[f]) for f, field in [(1, 'SHAPE@'), (2, 'GIS_COMMENTS'), (3, 'ACRES')]]
+
+    return changes
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Propagate reshaped field geometries to all feature classes of a geodatabase in one edit session
+
+# Create function propagating reshaped field geometries (dictionary of FIELD_ID: Esri JSON of geometry, as geometries are passed between processes as text) to every field border feature class
+# of geodatabase (named feature_class_name, see list_field_border_feature_classes) in one edit session, saved only if every feature class is updated without error;
+# returns list of change report rows, at least one per geodatabase (one per feature updated, or one without a FIELD_ID if none were), with STATUS:
+#   COMMITTED (with a note if edits were saved but could not be recorded in the Change Journal), ROLLED BACK (edits discarded), FAILED (no edits started), or NOT FOUND
+def propagate_to_geodatabase(period, geodatabase, geometry_json, region, gis_comment, feature_class_name = None):
+
+    changes = []
+    # Create dictionary with key: value pair as feature class: list of changes for the Change Journal, recorded only once edits are saved
+    journal_changes = {}
+    editor = None
+
+    try:
+        geometries = {field_id: arcpy.AsShape(j, True) for field_id, j in geometry_json.items()}
+        feature_classes = list_field_border_feature_classes(geodatabase = geodatabase, feature_class_name = feature_class_name)
+        if not feature_classes:
+            return [dict(zip(change_report_fields, (period, geodatabase, '', None, None, None, 'NOT FOUND: no polygon feature class named ' + (feature_class_name or os.path.splitext(os.path.basename(geodatabase))[0]) + ' with ' + ', '.join(reshape_fields))))]
+
+        # Add attribute indexes before starting the edit session, as schema cannot be changed while editing
+        for feature_class in feature_classes:
+            add_field_id_index(feature_class = feature_class)
+
+        editor = arcpy.da.Editor(geodatabase)
+        editor.startEditing(False, False)
+        editor.startOperation()
+        for feature_class in feature_classes:
+            journal_changes[feature_class] = []
+            changes += [(os.path.basename(feature_class),) + c for c in reshape_feature_class(feature_class = feature_class, geometries = geometries, region = region, gis_comment = gis_comment,
+                                                                                               journal_changes = journal_changes[feature_class])]
+        editor.stopOperation()
+        editor.stopEditing(True)
+    except Exception as e:
+        status = 'FAILED: ' + str(e).strip()
+        if editor is not None and editor.isEditing:
+            status = 'ROLLED BACK: ' + str(e).strip()
+            try:
+                editor.abortOperation()
+                editor.stopEditing(False)
+            except Exception as rollback_error:
+                status += ' (rollback failed: ' + str(rollback_error).strip() + ')'
+        return [dict(zip(change_report_fields, (period, geodatabase) + c + (status,))) for c in changes or [('', None, None, None)]]
+
+    # Record saved edits in the Change Journal outside the rollback path, as they can no longer be rolled back
+    status = 'COMMITTED'
+    try:
+        for feature_class, feature_class_changes in journal_changes.items():
+            record_changes(dataset = feature_class, changes = feature_class_changes, tool = '0.51_Propagate_Reshaped_Field_Borders')
+    except Exception as e:
+        status = 'COMMITTED (not recorded in Change Journal: ' + str(e).strip() + ')'
+
+    return [dict(zip(change_report_fields, (period, geodatabase) + c + (status,))) for c in changes or [('', None, None, None)]]
+
+# Create function unpacking keyword arguments of propagate_to_geodatabase (as ProcessPoolExecutor.map passes one argument)
+def _propagate_to_geodatabase_job(job):
+    return propagate_to_geodatabase(**job)
+
+#----------------------------------------------------------------------------------------------
+
+# 5. Propagate reshaped field geometries to several geodatabases in parallel processes
+
+# Create generator of change report rows of each geodatabase of period_geodatabases (list of (time period, geodatabase path)), in the order of period_geodatabases
+#   With one geodatabase or max_workers of 1, geodatabases are updated in this process; otherwise in up to max_workers processes (default: number of processors less one), one geodatabase per process
+def propagate(period_geodatabases, geometries, region, gis_comment, max_workers = None, feature_class_name = None):
+
+    # Convert geometries to Esri JSON (with spatial reference) once, so they can be passed to each process
+    geometry_json = {field_id: g.JSON for field_id, g in geometries.items()}
+    jobs = [{'period': p, 'geodatabase': g, 'geometry_json': geometry_json, 'region': region, 'gis_comment': gis_comment, 'feature_class_name': feature_class_name} for p, g in period_geodatabases]
+
+    if max_workers is None:
+        max_workers = max(1, multiprocessing.cpu_count() - 1)
+    max_workers = min(max_workers, len(jobs))
+
+    if max_workers <= 1:
+        for job in jobs:
+            yield propagate_to_geodatabase(**job)
+        return
+
+    # Start processes with python.exe, as sys.executable within ArcGIS Pro is ArcGISPro.exe
+    multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'python.exe'))
+
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+        for result in executor.map(_propagate_to_geodatabase_job, jobs):
+            yield result
+
+#----------------------------------------------------------------------------------------------
+
+# 6. Write change report
+
+def write_change_report(change_rows, change_report):
+    pandas.DataFrame(data = change_rows, columns = change_report_fields).to_csv(change_report, index = False)
+    return change_report
@@ -0,0 +1,179 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             iteration_store.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         pandas, openpyxl
+
+# Notes:            This module is imported by 7.50_Recode_through_BadLabel.py; it is not intended as a stand-alone script.
+#                   It uses no arcpy, so it can also be used from a Python window or notebook to re-export or inspect past iterations.
+
+# Description:      This module keeps the per-iteration tables of a region (e.g. the Bad Signame table of each classification iteration) in a per-region SQLite database,
+#                   which is the system of record; the Excel workbook is then built from the store in one pass with a streaming (write-only) writer
+#                   rather than re-loading and re-saving the whole workbook each iteration. It also tests whether a file is open elsewhere with an OS-level file lock.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Test whether a file is locked (i.e. open in another process, such as Excel)
+# 2. Save, list, and load per-iteration data frames in the iteration store
+# 3. Import sheets of a pre-existing workbook into the iteration store
+# 4. Export all iterations of the iteration store to a workbook with one sheet per iteration
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import os, pandas, re, sqlite3
+from openpyxl import Workbook
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Test whether a file is locked (i.e. open in another process, such as Excel)
+
+# Create function returning boolean value of whether a file cannot be opened for writing and locked without blocking (False if file does not exist)
+def file_is_locked(file_path):
+
+    if not os.path.isfile(file_path):
+        return False
+
+    try:
+        with open(file_path, 'r+b') as f:
+            if os.name == 'nt':
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except OSError:
+        return True
+
+    return False
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Save, list, and load per-iteration data frames in the iteration store
+
+# Create function returning path of the iteration store of a region (e.g. REGION_T1_2019) in a directory
+def iteration_store_path(directory, region_and_time):
+    return os.path.join(directory, region_and_time + '_Iteration_Store.sqlite')
+
+# Create function returning connection to an iteration store, creating its table of cells (one row per data frame cell, so iterations may have differing columns) if not present
+def connect(store):
+
+    connection = sqlite3.connect(store)
+    connection.execute('''CREATE TABLE IF NOT EXISTS iteration_cells (
+                              table_name TEXT NOT NULL,
+                              iteration TEXT NOT NULL,
+                              row_order INTEGER NOT NULL,
+                              row_name TEXT,
+                              column_order INTEGER NOT NULL,
+                              column_name TEXT,
+                              value,
+                              PRIMARY KEY (table_name, iteration, row_order, column_order))''')
+    connection.execute('CREATE TABLE IF NOT EXISTS iteration_index (table_name TEXT NOT NULL, iteration TEXT NOT NULL, index_name TEXT, PRIMARY KEY (table_name, iteration))')
+    return connection
+
+# Create function saving a data frame as an iteration of table_name, replacing that iteration if already stored (i.e. if re-running the same iteration)
+def save_iteration(store, table_name, iteration, data_frame):
+
+    # Convert numpy scalars (and NaN, as NULL) to values sqlite can store
+    cells = [(table_name, str(iteration), r, str(row_name), c, str(column_name), None if pandas.isnull(value) else value.item() if hasattr(value, 'item') else value)
+             for r, (row_name, row) in enumerate(zip(data_frame.index, data_frame.itertuples(index = False, name = None)))
+             for c, (column_name, value) in enumerate(zip(data_frame.columns, row))]
+
+    connection = connect(store)
+    try:
+        with connection:
+            connection.execute('DELETE FROM iteration_cells WHERE table_name = ? AND iteration = ?', (table_name, str(iteration)))
+            connection.execute('INSERT OR REPLACE INTO iteration_index VALUES (?, ?, ?)', (table_name, str(iteration), data_frame.index.name))
+            connection.executemany('INSERT INTO iteration_cells VALUES (?, ?, ?, ?, ?, ?, ?)', cells)
+    finally:
+        connection.close()
+
+# Create function returning list of iterations of table_name in the store, in natural order (e.g. 2 before 10)
+def list_iterations(store, table_name):
+
+    connection = connect(store)
+    try:
+        iterations = [row[0] for row in connection.execute('SELECT iteration FROM iteration_index WHERE table_name = ?', (table_name,))]
+    finally:
+        connection.close()
+
+    return sorted(iterations, key = lambda i: [int(t) if t.isdigit() else t for t in re.split(r'(\d+)', i)])
+
+# Create function returning data frame of an iteration of table_name, with the row names, column names, and order with which it was saved
+def load_iteration(store, table_name, iteration):
+
+    connection = connect(store)
+    try:
+        index_name = connection.execute('SELECT index_name FROM iteration_index WHERE table_name = ? AND iteration = ?', (table_name, str(iteration))).fetchone()
+        cells = pandas.read_sql_query('SELECT row_order, row_name, column_order, column_name, value FROM iteration_cells WHERE table_name = ? AND iteration = ?', connection, params = (table_name, str(iteration)))
+    finally:
+        connection.close()
+
+    if index_name is None:
+        raise KeyError('Iteration ' + str(iteration) + ' of ' + table_name + ' not found in ' + store)
+
+    data_frame = cells.pivot(index = 'row_order', columns = 'column_order', values = 'value')
+    data_frame.index = cells.drop_duplicates('row_order').sort_values('row_order')['row_name'].values
+    data_frame.index.name = index_name[0]
+    data_frame.columns = cells.drop_duplicates('column_order').sort_values('column_order')['column_name'].values
+
+    return data_frame
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Import sheets of a pre-existing workbook into the iteration store
+
+# Create function importing sheets named sheet_prefix + iteration of a workbook written before the iteration store existed, as a one-time migration: the workbook is only read
+# if the store has no iterations of table_name yet (once it has, the workbook is exported from the store, so holds nothing more); returns list of imported iterations
+def import_workbook(store, table_name, workbook, sheet_prefix = 'iteration_'):
+
+    if not os.path.isfile(workbook) or list_iterations(store = store, table_name = table_name):
+        return []
+
+    imported_iterations = []
+
+    for sheet_name, data_frame in pandas.read_excel(workbook, sheet_name = None, index_col = 0).items():
+        if sheet_name.startswith(sheet_prefix):
+            save_iteration(store = store, table_name = table_name, iteration = sheet_name[len(sheet_prefix):], data_frame = data_frame)
+            imported_iterations.append(sheet_name[len(sheet_prefix):])
+
+    return imported_iterations
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Export all iterations of the iteration store to a workbook with one sheet per iteration
+
+# Create function writing workbook (one sheet named sheet_prefix + iteration per iteration of table_name, laid out as pandas to_excel) with a write-only workbook,
+# saved to a temporary file then moved over workbook so a failed export leaves the previous workbook intact
+def export_workbook(store, table_name, workbook, sheet_prefix = 'iteration_'):
+
+    out_workbook = Workbook(write_only = True)
+
+    for iteration in list_iterations(store = store, table_name = table_name):
+        data_frame = load_iteration(store = store, table_name = table_name, iteration = iteration)
+        sheet = out_workbook.create_sheet(title = sheet_prefix + iteration)
+        sheet.append([data_frame.index.name] + [str(c) for c in data_frame.columns])
+        for row_name, row in zip(data_frame.index, data_frame.itertuples(index = False, name = None)):
+            sheet.append([row_name] + [None if pandas.isnull(v) else v for v in row])
+
+    temporary_workbook = os.path.splitext(workbook)[0] + '_export.xlsx'
+    out_workbook.save(temporary_workbook)
+    os.replace(temporary_workbook, workbook)
+
+    return workbook
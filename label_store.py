@@ -0,0 +1,157 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             label_store.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         numpy
+
+# Notes:            This module is imported by 7.50_Recode_through_BadLabel.py and 7.51_Reclassify_and_Generate_Majority_Frequency_Table.py; it is not intended as a stand-alone script.
+#                   It works on numpy arrays only (no arcpy), so attribute tables are read (and label shapefiles materialized) by the calling script tool or classified_sweep.py.
+
+# Description:      This module keeps the labels of each classification iteration as a compact Label Table (one row per field: FIELD_ID, MAJORITY, Crop_label, crop, and the
+#                   CLASS, aa, and ACRES needed to select training fields and sum acreage) saved per iteration in a Label Store, rather than as a full copy of the
+#                   field borders shapefile; it compares the Label Tables of two iterations (fields whose label changed and acreage shift per crop) and summarizes acreage as the Label Frequency Table.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Create Label Table of each field from attribute table arrays and majority crop codes
+# 2. Select training fields and misclassified training fields
+# 3. Save and load Label Tables in the Label Store
+# 4. Compare Label Tables of two iterations
+# 5. Summarize acreage by unique combination of CLASS, aa, crop, and Crop_label (Label Frequency Table)
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import numpy, os, re
+
+label_dtype = numpy.dtype([('OID', numpy.int64), ('FIELD_ID', numpy.int64), ('MAJORITY', numpy.int32), ('Crop_label', numpy.int32), ('crop', numpy.int32), ('CLASS', numpy.int32), ('aa', numpy.int32), ('ACRES', numpy.float64)])
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Create Label Table of each field from attribute table arrays and majority crop codes
+
+# Create function returning Label Table (structured array of label_dtype, one row per feature) where:
+#   MAJORITY is the majority crop code of the feature's FIELD_ID (0 if FIELD_ID has no majority, as a shapefile join would give)
+#   Crop_label and crop are MAJORITY and CROP_TYPE divided by 100, with Crop_label overwritten by crop for known static ground truth fields (CLASS == 2)
+def create_labels(feature_array, majority_field_ids, majority_codes):
+
+    labels = numpy.zeros(len(feature_array), dtype = label_dtype)
+    for name in ['OID', 'FIELD_ID', 'CLASS', 'aa', 'ACRES']:
+        labels[name] = feature_array['OID@' if name == 'OID' else name]
+
+    # Look up majority of each FIELD_ID (majority_field_ids sorted, as returned by zonal_majority)
+    if len(majority_field_ids):
+        position = numpy.clip(numpy.searchsorted(majority_field_ids, labels['FIELD_ID']), 0, len(majority_field_ids) - 1)
+        found = majority_field_ids[position] == labels['FIELD_ID']
+        labels['MAJORITY'][found] = numpy.asarray(majority_codes)[position[found]]
+
+    labels['Crop_label'] = labels['MAJORITY'] // 100
+    labels['crop'] = numpy.asarray(feature_array['CROP_TYPE']) // 100
+    static = labels['CLASS'] == 2
+    labels['Crop_label'][static] = labels['crop'][static]
+
+    return labels
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Select training fields and misclassified training fields
+
+# Create function returning boolean mask of training fields (i.e. features of Training Label Shapefile: crop > 0 and aa = 1)
+def training_mask(labels):
+    return (labels['crop'] > 0) & (labels['aa'] == 1)
+
+# Create function returning boolean mask of misclassified training fields (i.e. features of Bad Label Shapefile: training fields where crop <> Crop_label)
+def bad_mask(labels):
+    return training_mask(labels) & (labels['crop'] != labels['Crop_label'])
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Save and load Label Tables in the Label Store
+
+# Create function returning path of the Label Table of an iteration of a region (e.g. REGION_T1_2019) in the Label Store directory
+def label_store_path(directory, region_and_time, iteration):
+    return os.path.join(directory, region_and_time + '_labels_' + str(iteration) + '.npy')
+
+def save_labels(path, labels):
+    numpy.save(path, labels)
+
+def load_labels(path):
+    return numpy.load(path)
+
+# Create function returning iteration and path of the latest Label Table of a region saved before iteration (natural order, e.g. 2 before 10), or None if there is none
+def previous_labels_path(directory, region_and_time, iteration):
+
+    natural_key = lambda i: [int(t) if t.isdigit() else t for t in re.split(r'(\d+)', i)]
+    pattern = re.compile(re.escape(region_and_time) + r'_labels_(.+)\.npy$')
+
+    iterations = [m.group(1) for m in (pattern.match(f) for f in os.listdir(directory)) if m]
+    earlier_iterations = sorted([i for i in iterations if natural_key(i) < natural_key(str(iteration))], key = natural_key)
+
+    if not earlier_iterations:
+        return None
+    return earlier_iterations[-1], label_store_path(directory = directory, region_and_time = region_and_time, iteration = earlier_iterations[-1])
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Compare Label Tables of two iterations
+
+# Create function returning key of each row: FIELD_ID and occurrence number of that FIELD_ID (in OID order), so duplicate FIELD_IDs are compared in turn
+def _field_keys(labels):
+    order = numpy.lexsort((labels['OID'], labels['FIELD_ID']))
+    field_ids = labels['FIELD_ID'][order]
+    first = numpy.r_[True, field_ids[1:] != field_ids[:-1]]
+    start = numpy.maximum.accumulate(numpy.where(first, numpy.arange(len(order)), 0))
+    occurrence = numpy.empty(len(order), dtype = numpy.int64)
+    occurrence[order] = numpy.arange(len(order)) - start
+    return numpy.rec.fromarrays([labels['FIELD_ID'], occurrence], names = ['FIELD_ID', 'occurrence'])
+
+# Create function returning fields whose Crop_label changed between previous_labels and labels (FIELD_ID, previous and current Crop_label, ACRES; fields only in one iteration are given Crop_label -1 in the other)
+# and acreage shift per crop (crop code of Crop_label, previous and current ACRES labeled as that crop, and their difference)
+def compare_labels(previous_labels, labels):
+
+    previous_keys = _field_keys(previous_labels)
+    keys = _field_keys(labels)
+    all_keys, key_index = numpy.unique(numpy.concatenate([previous_keys, keys]), return_inverse = True)
+
+    previous_crop_label = numpy.full(len(all_keys), -1, dtype = numpy.int32)
+    crop_label = numpy.full(len(all_keys), -1, dtype = numpy.int32)
+    acres = numpy.zeros(len(all_keys))
+    previous_crop_label[key_index[:len(previous_keys)]] = previous_labels['Crop_label']
+    crop_label[key_index[len(previous_keys):]] = labels['Crop_label']
+    acres[key_index[:len(previous_keys)]] = previous_labels['ACRES']
+    acres[key_index[len(previous_keys):]] = labels['ACRES']
+
+    changed = previous_crop_label != crop_label
+    changed_fields = numpy.rec.fromarrays([all_keys['FIELD_ID'][changed], previous_crop_label[changed], crop_label[changed], acres[changed]], names = ['FIELD_ID', 'PREV_LABEL', 'Crop_label', 'ACRES'])
+
+    # Sum acreage of each Crop_label in both iterations with one bincount each over the union of crop codes
+    crops, crop_index = numpy.unique(numpy.concatenate([previous_labels['Crop_label'], labels['Crop_label']]), return_inverse = True)
+    previous_acres = numpy.bincount(crop_index[:len(previous_labels)], weights = previous_labels['ACRES'], minlength = len(crops))
+    current_acres = numpy.bincount(crop_index[len(previous_labels):], weights = labels['ACRES'], minlength = len(crops))
+    crop_shift = numpy.rec.fromarrays([crops, previous_acres, current_acres, current_acres - previous_acres], names = ['Crop_label', 'PREV_ACRES', 'ACRES', 'SHIFT'])
+
+    return changed_fields, crop_shift
+
+#----------------------------------------------------------------------------------------------
+
+# 5. Summarize acreage by unique combination of CLASS, aa, crop, and Crop_label (Label Frequency Table)
+
+# Create function returning structured array laid out as the Frequency output table: FREQUENCY, CLASS, aa, crop, Crop_label, and sum of ACRES of each unique combination
+def label_frequency(labels):
+
+    frequency_fields = ['CLASS', 'aa', 'crop', 'Crop_label']
+    combinations, combination_index, frequency = numpy.unique(labels[frequency_fields], return_inverse = True, return_counts = True)
+    acres = numpy.bincount(combination_index.ravel(), weights = labels['ACRES'], minlength = len(combinations))
+
+    return numpy.rec.fromarrays([frequency.astype(numpy.int32)] + [combinations[f] for f in frequency_fields] + [acres], names = ['FREQUENCY'] + frequency_fields + ['ACRES'])
@@ -0,0 +1,153 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             majority_batch.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         ArcGIS Pro, numpy
+
+# Notes:            This module is imported by 7.51_Reclassify_and_Generate_Majority_Frequency_Table.py; it is not intended as a stand-alone script.
+#                   Parallel processes are started with the ArcGIS Pro python.exe (not ArcGISPro.exe), as required for multiprocessing from a script tool,
+#                   so the calling script tool must run its tool code only under if __name__ == '__main__'.
+
+# Description:      This module computes the majority labels of several classified rasters (e.g. candidate classifications from Tool 7.10), one iteration per raster, in parallel processes:
+#                   each process only reads the shared field borders shapefile and writes its own outputs (Reclassified Raster, Zonal Statistics Majority Table, Class Fractions Table, and Label Table),
+#                   and the results are gathered into one table keyed by iteration so that the shared shapefile is written only once, at the end, with one field per iteration.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Compute majority labels of one classified raster (one iteration)
+# 2. Compute majority labels of several classified rasters in parallel processes
+# 3. Write results of all iterations to a table keyed by iteration
+# 4. Write majority fields of all iterations to the shared field borders shapefile at once
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import arcpy, multiprocessing, numpy, os, sys
+from concurrent.futures import ProcessPoolExecutor
+from classified_sweep import field_class_counts, rasterize_feature_ids, sweep_classified_raster, write_table
+from label_store import create_labels, save_labels
+from zonal_tables import compile_lookup_table, zonal_majority, zonal_top_classes
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Compute majority labels of one classified raster (one iteration)
+
+# Create function returning dictionary of results of one iteration (FIELD_IDs, majority crop codes, pixel counts, and Label Table) of classified_raster:
+#   reads Value: crop code (Classvalue) of Classified Raster attribute table, counts pixels of each Value per field and writes Reclassified Raster in one pass,
+#   and writes Zonal Statistics Majority Table, Class Fractions Table (top 3 crop codes, pixel fractions, and purity of each field), and Label Table (in Label Store); features (the field borders shapefile) are only read
+def classify_majority(classified_raster, features, iteration_number, reclassified_raster, majority_table, class_fractions_table, labels_path):
+
+    # Overwrite output (environment settings of the script tool are not passed to parallel processes)
+    arcpy.env.overwriteOutput = True
+
+    with arcpy.da.SearchCursor(in_table = classified_raster, field_names = ['Value', 'Classvalue']) as cursor:
+        value_crop_codes = [(row[0], row[1]) for row in cursor]
+
+    # Compile remap of Value to crop code (None if Value is already the crop code, so reclassification is skipped)
+    value_lookup_table = compile_lookup_table(values = [v for v, c in value_crop_codes], codes = [c for v, c in value_crop_codes])
+
+    # Rasterize feature IDs in memory of this process (name includes iteration so in-process batches do not collide)
+    feature_id_raster = rasterize_feature_ids(features = features, classified_raster = classified_raster, feature_id_raster = r'in_memory\field_borders_fid_raster_' + iteration_number)
+
+    try:
+        feature_counts = sweep_classified_raster(classified_raster = classified_raster, feature_id_raster = feature_id_raster, value_lookup_table = value_lookup_table, reclassified_raster = reclassified_raster)
+    finally:
+        arcpy.Delete_management(in_data = feature_id_raster)
+
+    field_counts = field_class_counts(feature_counts = feature_counts, features = features, value_lookup_table = value_lookup_table)
+    field_ids, majority_codes, pixel_counts = zonal_majority(*field_counts)
+
+    write_table(in_array = numpy.rec.fromarrays([field_ids, pixel_counts.astype(numpy.int64), majority_codes], names = ['FIELD_ID', 'COUNT', 'MAJORITY']), out_table = majority_table)
+    write_table(in_array = zonal_top_classes(*field_counts, zone_field = 'FIELD_ID'), out_table = class_fractions_table)
+
+    feature_array = arcpy.da.FeatureClassToNumPyArray(in_table = features, field_names = ['OID@', 'FIELD_ID', 'CROP_TYPE', 'CLASS', 'aa', 'ACRES'], null_value = 0)
+    labels = create_labels(feature_array = feature_array, majority_field_ids = field_ids, majority_codes = majority_codes)
+    save_labels(path = labels_path, labels = labels)
+
+    return {'iteration_number': iteration_number, 'identity_remap': value_lookup_table is None, 'field_ids': field_ids, 'majority_codes': majority_codes, 'pixel_counts': pixel_counts, 'labels': labels}
+
+# Create function unpacking keyword arguments of classify_majority (as ProcessPoolExecutor.map passes one argument); raises RuntimeError naming the iteration and Classified Raster that failed,
+# with its geoprocessing error messages (or exception text), as messages of parallel processes do not reach the script tool
+def _classify_majority_job(job):
+    try:
+        return classify_majority(**job)
+    except arcpy.ExecuteError as e:
+        message = arcpy.GetMessages(2) or str(e)
+    except Exception as e:
+        message = type(e).__name__ + ': ' + str(e)
+    raise RuntimeError('Iteration ' + job['iteration_number'] + ' (' + job['classified_raster'] + ') failed:\n' + message)
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Compute majority labels of several classified rasters in parallel processes
+
+# Create generator of results of classify_majority for each job (dictionary of classify_majority arguments), in the order of jobs
+#   With one job or max_workers of 1, jobs are run in this process; otherwise in up to max_workers processes (default: number of processors less one)
+def run_batch(jobs, max_workers = None):
+
+    if max_workers is None:
+        max_workers = max(1, multiprocessing.cpu_count() - 1)
+    max_workers = min(max_workers, len(jobs))
+
+    if max_workers <= 1:
+        for job in jobs:
+            yield _classify_majority_job(job)
+        return
+
+    # Start processes with python.exe, as sys.executable within ArcGIS Pro is ArcGISPro.exe
+    multiprocessing.set_executable(os.path.join(sys.exec_prefix, 'python.exe'))
+
+    with ProcessPoolExecutor(max_workers = max_workers) as executor:
+        for result in executor.map(_classify_majority_job, jobs):
+            yield result
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Write results of all iterations to a table keyed by iteration
+
+# Create function writing table with one row per iteration and FIELD_ID: ITERATION, FIELD_ID, COUNT (pixels), and MAJORITY (crop code)
+def write_results_table(results, out_table):
+
+    results_array = numpy.rec.fromarrays([numpy.concatenate([numpy.full(len(r['field_ids']), r['iteration_number'], dtype = 'U8') for r in results]),
+                                          numpy.concatenate([r['field_ids'] for r in results]),
+                                          numpy.concatenate([r['pixel_counts'] for r in results]).astype(numpy.int64),
+                                          numpy.concatenate([r['majority_codes'] for r in results])],
+                                         names = ['ITERATION', 'FIELD_ID', 'COUNT', 'MAJORITY'])
+
+    return write_table(in_array = results_array, out_table = out_table)
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Write majority fields of all iterations to the shared field borders shapefile at once
+
+# Create function deleting pre-existing fields (MAJORITY, left by earlier versions of the tools, and field_prefix + iteration of each result) and adding field_prefix + iteration (SHORT)
+# of each iteration with one bulk operation; fields without a majority in an iteration are given 0, as with a shapefile join. Returns list of majority field names
+def write_majority_fields(features, results, field_prefix):
+
+    majority_fields = [field_prefix + r['iteration_number'] for r in results]
+
+    delete_fields_list = [d for d in ['MAJORITY'] + majority_fields if arcpy.ListFields(dataset = features, wild_card = d)]
+    if delete_fields_list:
+        arcpy.DeleteField_management(in_table = features, drop_field = delete_fields_list)
+
+    field_ids = numpy.unique(numpy.concatenate([r['field_ids'] for r in results]))
+    majority_columns = []
+    for r in results:
+        majority_column = numpy.zeros(len(field_ids), dtype = numpy.int16)
+        majority_column[numpy.searchsorted(field_ids, r['field_ids'])] = r['majority_codes']
+        majority_columns.append(majority_column)
+
+    arcpy.da.ExtendTable(in_table = features, table_match_field = 'FIELD_ID', in_array = numpy.rec.fromarrays([field_ids] + majority_columns, names = ['FIELD_ID'] + majority_fields), array_match_field = 'FIELD_ID')
+
+    return majority_fields
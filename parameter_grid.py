@@ -0,0 +1,277 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             parameter_grid.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         pandas; PyYAML (optional, only for .yaml/.yml Parameter Grid Files)
+
+# Notes:            This module is imported by 7.10_Iterate_Pro_Classification_Trials.py; it is not intended as a stand-alone script.
+
+# Description:      This module reads a Parameter Grid File (JSON, or YAML if PyYAML is installed) describing the segmentation arguments, classifiers,
+#                   and classifier attributes to iterate through in 7.10, expands it into a list of trials, and estimates the cost of those trials from the Trial Ledger.
+
+#                   Example Parameter Grid File (every key is optional; missing keys take the values in default_grid_spec):
+#                   {
+#                       "segmentation": {
+#                           "spectral_detail": {"range": [5, 20, 5]},                 <- start, stop (inclusive), step
+#                           "spatial_detail": [5, 10, 15, 20],                        <- explicit list
+#                           "min_segment_size": {"values": [10, 20, 30]},
+#                           "band_indexes": {"2 3 7": "237", "3 7 9": "379"}         <- Segment Mean Shift band indexes: name used in file names
+#                       },
+#                       "classifier_attributes": ["COUNT", "COMPACTNESS", "RECTANGULARITY"],
+#                       "always_include_attributes": ["COLOR"],
+#                       "classifiers": {
+#                           "svm": {},
+#                           "rt": {"require": ["COUNT"], "exclude": ["RECTANGULARITY"], "max_attributes": 3},
+#                           "ml": {"attributes": ["COLOR", "COUNT;COLOR"]}            <- explicit classifier attributes strings
+#                       },
+#                       "sample": 20,                                                 <- optional random sample of N trials
+#                       "seed": 0
+#                   }
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Read Parameter Grid File
+# 2. Expand segmentation arguments and classifier attribute combinations
+# 3. Build (and optionally randomly sample) list of trials
+# 4. Estimate cost of trials from historical timings in the Trial Ledger
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import copy, decimal, itertools, json, math, os, pandas, random
+from segment_attributes import attribute_families
+from trial_ledger import read_ledger
+
+# 0.1 Default grid, i.e. the lists 7.10 iterated through before Parameter Grid Files were supported
+default_grid_spec = {
+    'segmentation': {
+        'spectral_detail': [5, 10, 15, 20],
+        'spatial_detail': [5, 10, 15, 20],
+        'min_segment_size': [10, 20, 30],
+        'band_indexes': {'2 3 4': '234', '3 4 5': '345'}, # Landsat-7 download with bands 1-5, 7 or Landsat-8 with bands 2-7 downloaded (Sentinel-2 download with bands 2-8, 10-12: {'2 3 7': '237', '3 7 9': '379'})
+    },
+    'classifier_attributes': ['COUNT', 'COMPACTNESS', 'RECTANGULARITY'],
+    'always_include_attributes': ['COLOR'],
+    'classifiers': {'svm': {}, 'ml': {}, 'rt': {}},
+    'sample': None,
+    'seed': 0,
+}
+
+# 0.2 Order of segmentation arguments as passed to Segment Mean Shift in 7.10
+segmentation_argument_names = ['spectral_detail', 'spatial_detail', 'min_segment_size', 'band_indexes']
+
+# 0.3 Classifier strings run by 7.10, and constraints each classifier may be given
+classifier_strings = ['svm', 'ml', 'rt']
+classifier_constraint_names = ['attributes', 'require', 'exclude', 'max_attributes']
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Read Parameter Grid File
+
+# Create function returning grid spec from a Parameter Grid File (or the default grid if no file given), with missing keys taken from default_grid_spec
+def load_grid_spec(grid_file = None):
+
+    grid_spec = copy.deepcopy(default_grid_spec)
+    if not grid_file:
+        return grid_spec
+
+    with open(grid_file) as f:
+        if os.path.splitext(grid_file)[1].lower() in ('.yaml', '.yml'):
+            import yaml
+            user_spec = yaml.safe_load(f) or {}
+        else:
+            user_spec = json.load(f)
+
+    unknown = set(user_spec) - set(default_grid_spec)
+    if unknown:
+        raise ValueError('Unknown keys in Parameter Grid File: ' + str(sorted(unknown)))
+
+    grid_spec['segmentation'].update(user_spec.pop('segmentation', {}))
+    grid_spec.update(user_spec)
+
+    check_grid_spec(grid_spec)
+
+    return grid_spec
+
+# Create function raising ValueError if grid spec has an unknown segmentation argument, classifier, classifier constraint, or classifier attribute (e.g. a typo),
+# so that it is reported when the Parameter Grid File is read rather than once segmentations have run
+def check_grid_spec(grid_spec):
+
+    unknown_segmentation = set(grid_spec['segmentation']) - set(segmentation_argument_names)
+    if unknown_segmentation:
+        raise ValueError('Unknown segmentation arguments in Parameter Grid File: ' + str(sorted(unknown_segmentation)) + '; expected ' + ', '.join(segmentation_argument_names))
+
+    unknown_classifiers = set(grid_spec['classifiers']) - set(classifier_strings)
+    if unknown_classifiers:
+        raise ValueError('Unknown classifiers in Parameter Grid File: ' + str(sorted(unknown_classifiers)) + '; expected ' + ', '.join(classifier_strings))
+
+    attributes = list(grid_spec['classifier_attributes']) + list(grid_spec['always_include_attributes'])
+    for c, constraints in grid_spec['classifiers'].items():
+        constraints = constraints or {}
+        unknown_constraints = set(constraints) - set(classifier_constraint_names)
+        if unknown_constraints:
+            raise ValueError('Unknown constraints of classifier ' + c + ' in Parameter Grid File: ' + str(sorted(unknown_constraints)) + '; expected ' + ', '.join(classifier_constraint_names))
+        attributes += list(constraints.get('require', [])) + list(constraints.get('exclude', [])) + [a for s in constraints.get('attributes', []) for a in s.split(';')]
+
+    unknown_attributes = {a for a in attributes if a.strip().upper() not in attribute_families}
+    if unknown_attributes:
+        raise ValueError('Unknown classifier attributes in Parameter Grid File: ' + str(sorted(unknown_attributes)) + '; expected ' + ', '.join(attribute_families))
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Expand segmentation arguments and classifier attribute combinations
+
+# Create function returning number of decimal places of a number as written (e.g. 2 for 0.25, 0 for 5)
+def decimal_places(number):
+    return max(0, -decimal.Decimal(str(number)).normalize().as_tuple().exponent)
+
+# Create function returning list of values from an explicit list, a {'values': [...]} dictionary, or a {'range': [start, stop, step]} dictionary (stop inclusive);
+#   range values are computed as start + i * step and rounded to the decimal places of start and step (so 15.5 to 16.1 by 0.2 gives 15.5, 15.7, 15.9, 16.1 rather than accumulating float error);
+#   raises ValueError if step is not positive
+def expand_values(value_spec):
+    if isinstance(value_spec, dict) and 'range' in value_spec:
+        start, stop, step = (list(value_spec['range']) + [1])[:3]
+        if step <= 0:
+            raise ValueError('Step of range ' + str(value_spec['range']) + ' must be positive')
+        decimals = max(decimal_places(start), decimal_places(step))
+        count = int(math.floor(round((stop - start) / step, 9))) + 1
+        values = [round(start + i * step, decimals) for i in range(max(count, 0))]
+        return values if any(isinstance(v, float) for v in (start, stop, step)) else [int(v) for v in values]
+    if isinstance(value_spec, dict) and 'values' in value_spec:
+        return list(value_spec['values'])
+    if isinstance(value_spec, (list, tuple)):
+        return list(value_spec)
+    return [value_spec]
+
+# Create function returning list of tuples of segmentation arguments as strings (spectral detail, spatial detail, minimum segment size, band indexes)
+def segmentation_arguments(grid_spec):
+    segmentation_spec = grid_spec['segmentation']
+    lists = [[str(v) for v in expand_values(segmentation_spec[n])] for n in segmentation_argument_names[:3]]
+    lists.append(list(segmentation_spec['band_indexes'].keys()))
+    return list(itertools.product(*lists))
+
+# Create function returning classifier attributes strings for a classifier (e.g. 'COLOR', 'COUNT;COLOR'), honouring its constraints:
+#   attributes:     explicit list of classifier attributes strings (other constraints ignored)
+#   require:        attributes every combination must contain
+#   exclude:        attributes no combination may contain
+#   max_attributes: maximum number of attributes in a combination (including always included attributes)
+def classifier_attribute_combinations(grid_spec, classifier_string):
+
+    constraints = grid_spec['classifiers'][classifier_string] or {}
+    if 'attributes' in constraints:
+        return list(constraints['attributes'])
+
+    always_include = list(grid_spec['always_include_attributes'])
+    optional = [a for a in grid_spec['classifier_attributes'] if a not in always_include and a not in constraints.get('exclude', [])]
+    max_attributes = constraints.get('max_attributes', len(optional) + len(always_include))
+
+    combinations = []
+    for l in range(0, len(optional) + 1):
+        for subset in itertools.combinations(optional, l):
+            attributes = list(subset) + always_include
+            if not attributes or len(attributes) > max_attributes:
+                continue
+            if not all(r in attributes for r in constraints.get('require', [])):
+                continue
+            combinations.append(';'.join(attributes))
+
+    return combinations
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Build (and optionally randomly sample) list of trials
+
+# Create function returning list of trials, each a tuple of (segmentation arguments tuple, classifier string, classifier attributes string); if grid spec has sample N, a reproducible random sample of N trials (seeded by seed) is returned in grid order
+def build_trials(grid_spec):
+
+    trials = []
+    for s in segmentation_arguments(grid_spec):
+        for c in grid_spec['classifiers']:
+            for a in classifier_attribute_combinations(grid_spec, c):
+                trials.append((s, c, a))
+
+    sample = grid_spec.get('sample')
+    if sample and sample < len(trials):
+        sampled = set(random.Random(grid_spec.get('seed')).sample(range(len(trials)), sample))
+        trials = [t for i, t in enumerate(trials) if i in sampled]
+
+    return trials
+
+# Create function returning dictionary with key: value pair as segmentation arguments tuple: list of (classifier string, classifier attributes string), in trial order
+def trials_by_segmentation(trials):
+    grouped = {}
+    for s, c, a in trials:
+        grouped.setdefault(s, []).append((c, a))
+    return grouped
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Estimate cost of trials from historical timings in the Trial Ledger
+
+# Create function returning mask of ledger rows whose parameter (column of read_ledger) equals value: numbers are compared as numbers, as a parameter column holding <NULL> for some stages
+# (e.g. segmentation parameters of assess rows recorded before they were added) is read as float (5 as 5.0); other values (e.g. band indexes, classifier) are compared as text
+def parameter_mask(column, value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return pandas.to_numeric(column, errors = 'coerce') == float(value)
+    return column.astype(str) == str(value)
+
+# Create function returning mean historical wall time of a stage, matching as many of the given parameters as have history (dropping the last parameter until a match is found); None if the stage has no history
+def historical_mean(df_stages, stage, parameters):
+    df_stage = df_stages[df_stages['stage'] == stage]
+    if df_stage.empty:
+        return None
+    keys = [k for k in parameters if 'param_' + k in df_stage.columns]
+    while keys:
+        mask = pandas.concat([parameter_mask(df_stage['param_' + k], parameters[k]) for k in keys], axis = 1).all(axis = 1)
+        if mask.any():
+            return df_stage.loc[mask, 'wall_seconds'].mean()
+        keys = keys[:-1]
+    return df_stage['wall_seconds'].mean()
+
+# Create function returning estimated total seconds of trials and dictionary with key: value pair as stage: estimated seconds
+#   rasters_per_segmentation is the number of rasters segmented per segmentation arguments (7.10 segments both the Fields Borders and Training Fields Subset Rasters)
+def estimate_cost(trials, ledger_path, band_indexes_dictionary, classifier_backend = 'ArcGIS', rasters_per_segmentation = 2):
+
+    if not ledger_path or not os.path.isfile(ledger_path):
+        return None, {}
+
+    df_stages = read_ledger(ledger_path = ledger_path)
+    stage_seconds = {'segment': 0.0, 'extract': 0.0, 'train': 0.0, 'classify': 0.0, 'assess': 0.0}
+    missing = set()
+
+    def add(stage, parameters, count):
+        seconds = historical_mean(df_stages, stage, parameters)
+        if seconds is None:
+            missing.add(stage)
+        else:
+            stage_seconds[stage] += seconds * count
+
+    for s, classifier_list in trials_by_segmentation(trials).items():
+        segmentation_parameters = {'spectral_detail': int(s[0]), 'spatial_detail': int(s[1]), 'min_segment_size': int(s[2]), 'band_indexes': band_indexes_dictionary[s[3]]}
+        add('segment', segmentation_parameters, rasters_per_segmentation)
+        # Segment attributes are only extracted for the scikit-learn backend
+        if classifier_backend == 'scikit-learn':
+            add('extract', segmentation_parameters, rasters_per_segmentation)
+        for c, a in classifier_list:
+            trial_parameters = dict({'classifier': c, 'classifier_backend': classifier_backend, 'classifier_attributes': a}, **segmentation_parameters)
+            add('train', trial_parameters, rasters_per_segmentation)
+            add('classify', trial_parameters, rasters_per_segmentation)
+            add('assess', trial_parameters, rasters_per_segmentation)
+
+    for m in missing:
+        stage_seconds[m] = None
+
+    total_seconds = sum(v for v in stage_seconds.values() if v is not None)
+
+    return total_seconds, stage_seconds
@@ -0,0 +1,136 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             segment_attributes.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         numpy
+
+# Notes:            This module is imported by 7.10_Iterate_Pro_Classification_Trials.py; it is not intended as a stand-alone script.
+#                   It works on numpy arrays only (no arcpy), so rasters are read and written by the calling script tool.
+
+# Description:      This module computes the four segment attribute families (COLOR, COUNT, COMPACTNESS, RECTANGULARITY) once per segmented raster
+#                   into a per-segment feature matrix, from which every classifier / classifier attribute combination can take a column slice.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Compute a per-segment feature matrix with all four attribute families
+# 2. Return the feature matrix columns corresponding to a classifier attributes string (e.g. 'COUNT;COLOR')
+# 3. Assign each segment the majority training class of its pixels
+# 4. Save and load a feature matrix so it is computed only once per segmented raster
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import numpy
+
+# 0.1 Names of attribute families in the order their columns appear in the feature matrix (NOTE: MEAN and SD not included as no auxilary raster used)
+attribute_families = ['COLOR', 'COUNT', 'COMPACTNESS', 'RECTANGULARITY']
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Compute a per-segment feature matrix with all four attribute families
+
+# Create function returning sorted segment IDs, a feature matrix (one row per segment), and the list of feature matrix column names
+#   segment_array is a 2D array of segment IDs; band_array is a 2D or 3D (band, row, column) array of the segmented (mean color) raster
+#   COMPACTNESS is 4 * pi * area / perimeter ** 2 using pixel edges as perimeter; RECTANGULARITY is area / area of segment bounding box
+def compute_segment_attributes(segment_array, band_array, nodata_value = 0):
+
+    band_array = numpy.asarray(band_array)
+    if band_array.ndim == 2:
+        band_array = band_array[numpy.newaxis, :, :]
+
+    # Create index raster with values 0 to n - 1 for each segment and -1 for NoData
+    valid = segment_array != nodata_value
+    segment_ids, segment_index = numpy.unique(segment_array[valid], return_inverse = True)
+    segment_count = len(segment_ids)
+    index_array = numpy.full(segment_array.shape, -1, dtype = numpy.int64)
+    index_array[valid] = segment_index
+
+    # COUNT: number of pixels per segment
+    count = numpy.bincount(segment_index, minlength = segment_count).astype(numpy.float64)
+
+    # COLOR: mean value per band per segment
+    color = numpy.column_stack([numpy.bincount(segment_index, weights = b[valid], minlength = segment_count) / count for b in band_array])
+
+    # Perimeter: number of pixel edges shared with another segment, NoData or the edge of the raster
+    perimeter = numpy.zeros(segment_count)
+    padded = numpy.pad(index_array, 1, mode = 'constant', constant_values = -1)
+    for a, b in [(padded[:-1, 1:-1], padded[1:, 1:-1]), (padded[1:-1, :-1], padded[1:-1, 1:])]:
+        boundary = a != b
+        for side in (a[boundary], b[boundary]):
+            perimeter += numpy.bincount(side[side >= 0], minlength = segment_count)
+
+    compactness = numpy.clip(4 * numpy.pi * count / perimeter ** 2, 0, 1)
+
+    # Bounding box of each segment from the minimum and maximum row and column of its pixels
+    rows, columns = numpy.nonzero(valid)
+    row_min = numpy.full(segment_count, segment_array.shape[0])
+    row_max = numpy.zeros(segment_count, dtype = rows.dtype)
+    column_min = numpy.full(segment_count, segment_array.shape[1])
+    column_max = numpy.zeros(segment_count, dtype = columns.dtype)
+    numpy.minimum.at(row_min, segment_index, rows)
+    numpy.maximum.at(row_max, segment_index, rows)
+    numpy.minimum.at(column_min, segment_index, columns)
+    numpy.maximum.at(column_max, segment_index, columns)
+
+    rectangularity = count / ((row_max - row_min + 1) * (column_max - column_min + 1))
+
+    feature_matrix = numpy.column_stack([color, count, compactness, rectangularity])
+    column_names = ['COLOR_' + str(b + 1) for b in range(band_array.shape[0])] + ['COUNT', 'COMPACTNESS', 'RECTANGULARITY']
+
+    return segment_ids, feature_matrix, column_names
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Return the feature matrix columns corresponding to a classifier attributes string (e.g. 'COUNT;COLOR')
+
+def attribute_columns(column_names, classifier_attributes):
+    families = [a.strip().upper() for a in classifier_attributes.split(';')]
+    unknown = [a for a in families if a not in attribute_families]
+    if unknown:
+        raise ValueError('Unknown classifier attributes: ' + str(unknown))
+    return numpy.array([i for i, c in enumerate(column_names) if c.split('_')[0] in families])
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Assign each segment the majority training class of its pixels
+
+# Create function returning, for each segment ID, the class with the most pixels in class_array (a rasterized training fields layer on the same grid); segments with no training pixels are given class_nodata_value
+def label_segments(segment_ids, segment_array, class_array, nodata_value = 0, class_nodata_value = 0):
+
+    valid = (segment_array != nodata_value) & (class_array != class_nodata_value)
+    segment_index = numpy.searchsorted(segment_ids, segment_array[valid])
+    class_values, class_index = numpy.unique(class_array[valid], return_inverse = True)
+
+    labels = numpy.full(len(segment_ids), class_nodata_value, dtype = class_array.dtype)
+    if len(class_values) == 0:
+        return labels
+
+    # Cross-tabulate (segment, class) pixel counts with one bincount over combined keys
+    histogram = numpy.bincount(segment_index * len(class_values) + class_index, minlength = len(segment_ids) * len(class_values)).reshape(len(segment_ids), len(class_values))
+
+    labelled = histogram.sum(axis = 1) > 0
+    labels[labelled] = class_values[histogram[labelled].argmax(axis = 1)]
+
+    return labels
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Save and load a feature matrix so it is computed only once per segmented raster
+
+def save_segment_attributes(path, segment_ids, feature_matrix, column_names, labels):
+    numpy.savez_compressed(path, segment_ids = segment_ids, feature_matrix = feature_matrix, column_names = numpy.array(column_names), labels = labels)
+
+def load_segment_attributes(path):
+    with numpy.load(path) as cache:
+        return cache['segment_ids'], cache['feature_matrix'], cache['column_names'].tolist(), cache['labels']
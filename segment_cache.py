@@ -0,0 +1,107 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             segment_cache.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         numpy
+
+# Notes:            This module is imported by 7.10_Iterate_Pro_Classification_Trials.py; it is not intended as a stand-alone script.
+#                   It works on numpy arrays only (no arcpy), so rasters are read and written by the calling script tool.
+
+# Description:      This module supports storing a segmentation as a compact segment ID (label) raster plus a per-segment mean color table
+#                   instead of a full mean color raster: since every pixel of a Segment Mean Shift output holds the mean color of its segment,
+#                   the mean color raster can be rebuilt, block by block, from the two whenever a classifier or a person needs it.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Compute the mean color of each segment
+# 2. Save and load a per-segment mean color table
+# 3. Rebuild blocks of the mean color raster from blocks of the segment ID raster
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import numpy
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Compute the mean color of each segment
+
+# Create function returning sorted segment IDs and a (segment, band) table of mean colors, cast back to the data type of band_array
+#   segment_array is a 2D array of segment IDs; band_array is a 2D or 3D (band, row, column) array of the segmented (mean color) raster
+def segment_means(segment_array, band_array, nodata_value = 0):
+
+    band_array = numpy.asarray(band_array)
+    if band_array.ndim == 2:
+        band_array = band_array[numpy.newaxis, :, :]
+
+    valid = segment_array != nodata_value
+    segment_ids, segment_index = numpy.unique(segment_array[valid], return_inverse = True)
+    count = numpy.bincount(segment_index, minlength = len(segment_ids))
+
+    means = numpy.column_stack([numpy.bincount(segment_index, weights = b[valid], minlength = len(segment_ids)) / count for b in band_array])
+    if numpy.issubdtype(band_array.dtype, numpy.integer):
+        means = numpy.rint(means)
+
+    return segment_ids, means.astype(band_array.dtype)
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Save and load a per-segment mean color table
+
+def save_segment_means(path, segment_ids, means):
+    numpy.savez_compressed(path, segment_ids = segment_ids, means = means)
+
+def load_segment_means(path):
+    with numpy.load(path) as cache:
+        return cache['segment_ids'], cache['means']
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Rebuild blocks of the mean color raster from blocks of the segment ID raster
+
+# Create generator of (row, column, number of rows, number of columns) blocks covering a raster of the given shape
+def iterate_blocks(rows, columns, block_size = 2048):
+    for r in range(0, rows, block_size):
+        for c in range(0, columns, block_size):
+            yield r, c, min(block_size, rows - r), min(block_size, columns - c)
+
+# Create function returning a NoData value for a mean color raster of means: 0 if no segment has a band mean of 0, otherwise the largest value of the data type of means that is not a band mean
+#   (so a legitimate band mean is never written as NoData); None if every value of an integer data type is a band mean
+def mean_color_nodata_value(means):
+
+    if not (means == 0).any():
+        return 0
+
+    values = numpy.unique(means)
+    if numpy.issubdtype(means.dtype, numpy.integer):
+        info = numpy.iinfo(means.dtype)
+        candidates = numpy.arange(int(info.max), max(int(info.min), int(info.max) - len(values)) - 1, -1)
+    else:
+        candidates = numpy.array([numpy.finfo(means.dtype).min, numpy.finfo(means.dtype).max], dtype = means.dtype)
+
+    unused = candidates[~numpy.isin(candidates, values)]
+    return unused[0].item() if len(unused) else None
+
+# Create function returning a (band, row, column) mean color block for a block of segment IDs (segment_ids sorted, as returned by segment_means); NoData and unknown segments are given nodata_value
+def mean_color_block(segment_block, segment_ids, means, segment_nodata_value = 0, nodata_value = 0):
+
+    color_block = numpy.full((means.shape[1],) + segment_block.shape, nodata_value, dtype = means.dtype)
+    if len(segment_ids) == 0:
+        return color_block
+
+    position = numpy.clip(numpy.searchsorted(segment_ids, segment_block), 0, len(segment_ids) - 1)
+    known = (segment_ids[position] == segment_block) & (segment_block != segment_nodata_value)
+    color_block[:, known] = means[position[known]].T
+
+    return color_block
@@ -0,0 +1,102 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             segment_classifiers.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         numpy and scikit-learn (included in the ArcGIS Pro default Python environment)
+
+# Notes:            This module is imported by 7.10_Iterate_Pro_Classification_Trials.py; it is not intended as a stand-alone script.
+#                   It works on numpy arrays only (no arcpy), so it can be run on synthetic segments without an ArcGIS licence.
+
+# Description:      This module is the scikit-learn classifier backend for 7.10 trials: it trains Support Vector Machine, Random Trees (random forest, multi-core),
+#                   and Maximum Likelihood (Gaussian) classifiers on column slices of a per-segment feature matrix (see segment_attributes.py),
+#                   and predicts classified rasters block by block.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Create an unfitted classifier for each of the three classifier strings used in 7.10 (svm, rt, ml)
+# 2. Train classifier on a column slice of a feature matrix
+# 3. Predict a class for every segment
+# 4. Predict a classified raster block by block from a segment ID raster
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import numpy
+from sklearn.discriminant_analysis import QuadraticDiscriminantAnalysis
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.svm import SVC
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Create an unfitted classifier for each of the three classifier strings used in 7.10 (svm, rt, ml)
+
+# NOTE: Parameters mirror the defaults of the ArcGIS Pro Train Support Vector Machine, Train Random Trees (50 trees, depth of 30), and Train Maximum Likelihood tools
+def create_classifier(classifier_string, n_jobs = -1, random_state = 0):
+    if classifier_string == 'svm':
+        return make_pipeline(StandardScaler(), SVC(kernel = 'rbf', gamma = 'scale'))
+    elif classifier_string == 'rt':
+        return RandomForestClassifier(n_estimators = 50, max_depth = 30, n_jobs = n_jobs, random_state = random_state)
+    elif classifier_string == 'ml':
+        # NOTE: features are standardized and covariances shrunk slightly towards identity so that a constant attribute within a class (e.g. COUNT of same-sized segments) does not make the covariance matrix singular
+        return make_pipeline(StandardScaler(), QuadraticDiscriminantAnalysis(reg_param = 0.01))
+    else:
+        raise ValueError('Unknown classifier: ' + str(classifier_string) + '; expected one of svm, rt, or ml')
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Train classifier on a column slice of a feature matrix
+
+# Create function returning a fitted classifier trained on segments with a training label (labels != label_nodata_value), using only the feature matrix columns given
+def train_classifier(classifier_string, feature_matrix, labels, columns, n_jobs = -1, label_nodata_value = 0):
+
+    labelled = labels != label_nodata_value
+    classes = numpy.unique(labels[labelled])
+    if len(classes) < 2:
+        raise ValueError('At least two training classes are required; found: ' + str(classes.tolist()))
+
+    classifier = create_classifier(classifier_string = classifier_string, n_jobs = n_jobs)
+
+    # Maximum Likelihood assumes equal a priori probabilities (ArcGIS Pro default) rather than training sample proportions
+    if classifier_string == 'ml':
+        classifier.set_params(quadraticdiscriminantanalysis__priors = numpy.full(len(classes), 1 / len(classes)))
+
+    classifier.fit(feature_matrix[labelled][:, columns], labels[labelled])
+
+    return classifier
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Predict a class for every segment
+
+def predict_segments(classifier, feature_matrix, columns):
+    return classifier.predict(feature_matrix[:, columns])
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Predict a classified raster block by block from a segment ID raster
+
+# Create function mapping a block of segment IDs to the class predicted for each segment (segment_ids sorted, as returned by compute_segment_attributes); NoData and unknown segments are given nodata_value
+def classify_segment_block(segment_block, segment_ids, segment_classes, segment_nodata_value = 0, nodata_value = 0, dtype = numpy.uint16):
+
+    classified_block = numpy.full(segment_block.shape, nodata_value, dtype = dtype)
+    if len(segment_ids) == 0:
+        return classified_block
+
+    position = numpy.clip(numpy.searchsorted(segment_ids, segment_block), 0, len(segment_ids) - 1)
+    known = (segment_ids[position] == segment_block) & (segment_block != segment_nodata_value)
+    classified_block[known] = segment_classes[position[known]]
+
+    return classified_block
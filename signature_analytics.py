@@ -0,0 +1,136 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             signature_analytics.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         numpy, pandas
+
+# Notes:            This module is imported by 7.50_Recode_through_BadLabel.py; it is not intended as a stand-alone script.
+#                   It uses no arcpy, so it can also be used from a Python window or notebook on a Bad Signame Excel Workbook sheet or Iteration Store.
+
+# Description:      This module scores signatures (Good and Bad area, and Badness_Index) in one masked reduction over the signature x crop area matrix, indexes signatures by Badness_Index (sorted once, with cumulative area of training fields classified by the signatures in that order),
+#                   so that the signatures above any Badness_Index threshold are found by binary search, and sweeps thresholds to report how many signatures
+#                   would be removed and how much classified area (and pixels) of each crop would be lost; results are written to files (ERDAS IMAGINE Signature Editor criteria text and csv).
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Score signatures and index them by Badness_Index
+# 2. Find signatures with Badness_Index greater than a threshold
+# 3. Sweep thresholds with expected area and pixel loss per crop
+# 4. Write signature removal criteria and threshold sweep to files
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import numpy, os, pandas
+
+# Default thresholds of Badness_Index (-1 to 1 by 0.1) for threshold sweep
+default_sweep_thresholds = numpy.round(numpy.linspace(-1, 1, 21), 1)
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Score signatures and index them by Badness_Index
+
+# Create function adding Good (area in the crop column of the signature's own crop, i.e. equal to its Crop_label), Bad (area in other crop columns), and Badness_Index columns to a Bad Signame data frame (as built in 7.50),
+#   with one masked reduction over the signature x crop area matrix; Badness_Index is (Bad - Good) / (Bad + Good), from -1 to 1, where 1 is the worst (i.e. signature always classified incorrectly)
+def score_signatures(signature_table, crop_columns):
+
+    # Create matrix of area (signature x crop column) and mask that is True where the Crop_label of the signature (row) is the crop of the column
+    area_matrix = signature_table[crop_columns].values.astype(float)
+    good_mask = numpy.array(signature_table['Crop_label'].astype(str).tolist())[:, numpy.newaxis] == numpy.array(crop_columns, dtype = str)[numpy.newaxis, :]
+
+    signature_table['Good'] = numpy.where(good_mask, area_matrix, 0).sum(axis = 1)
+    signature_table['Bad'] = numpy.where(good_mask, 0, area_matrix).sum(axis = 1)
+    signature_table['Badness_Index'] = (signature_table['Bad'] - signature_table['Good']) / (signature_table['Bad'] + signature_table['Good'])
+
+    return signature_table
+
+# Create function returning signature index: signatures sorted by ascending Badness_Index, their Badness_Index, crop column names, and cumulative area per crop column from the worst (highest Badness_Index) signature down
+#   Signatures without Badness_Index (i.e. no area in training fields) are left out, as they are never above a threshold
+def index_signatures(signames, badness_index, area_matrix, crop_columns):
+
+    badness_index = numpy.asarray(badness_index, dtype = numpy.float64)
+    indexed = ~numpy.isnan(badness_index)
+    order = numpy.flatnonzero(indexed)[numpy.argsort(badness_index[indexed], kind = 'mergesort')]
+
+    sorted_area = numpy.asarray(area_matrix, dtype = numpy.float64)[order]
+    cumulative_area = numpy.vstack([numpy.zeros((1, sorted_area.shape[1])), numpy.cumsum(sorted_area[::-1], axis = 0)])
+
+    return numpy.asarray(signames)[order], badness_index[order], list(crop_columns), cumulative_area
+
+# Create function returning signature index of a Bad Signame data frame (as built in 7.50: one row per Signame, crop columns, and Badness_Index; summary row Total ignored)
+def index_signature_table(signature_table, crop_columns):
+    signature_table = signature_table.drop(index = 'Total', errors = 'ignore')
+    return index_signatures(signames = signature_table.index.values, badness_index = signature_table['Badness_Index'].values, area_matrix = signature_table[crop_columns].values, crop_columns = crop_columns)
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Find signatures with Badness_Index greater than a threshold
+
+# Create function returning number of signatures with Badness_Index greater than threshold (binary search of sorted Badness_Index)
+def count_above(signature_index, threshold):
+    sorted_badness = signature_index[1]
+    return len(sorted_badness) - numpy.searchsorted(sorted_badness, threshold, side = 'right')
+
+# Create function returning signatures with Badness_Index greater than threshold, worst first
+def signatures_above(signature_index, threshold):
+    sorted_signames = signature_index[0]
+    return sorted_signames[len(sorted_signames) - count_above(signature_index, threshold):][::-1].tolist()
+
+# Create function returning text which can be copied and pasted into ERDAS IMAGINE Signature Editor criteria search to select signatures
+def erdas_criteria(signames):
+    return ' OR '.join('$"Signature Name" == "{}"'.format(s) for s in signames)
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Sweep thresholds with expected area and pixel loss per crop
+
+# Create function returning data frame with one row per threshold: number of signatures removed, and area (and pixels, if cell_area given) of each crop column that those signatures classified
+def sweep_thresholds(signature_index, thresholds = default_sweep_thresholds, cell_area = None):
+
+    crop_columns, cumulative_area = signature_index[2], signature_index[3]
+    removed = numpy.array([count_above(signature_index, t) for t in thresholds])
+    area_loss = cumulative_area[removed]
+
+    df_sweep = pandas.DataFrame(data = area_loss, columns = ['AREA_' + str(c) for c in crop_columns])
+    df_sweep.insert(0, 'Threshold', thresholds)
+    df_sweep.insert(1, 'Signatures_Removed', removed)
+    df_sweep['Total_Area_Lost'] = area_loss.sum(axis = 1)
+
+    if cell_area:
+        pixel_loss = numpy.rint(area_loss / cell_area).astype(numpy.int64)
+        for c, p in zip(crop_columns, pixel_loss.T):
+            df_sweep['PIXELS_' + str(c)] = p
+        df_sweep['Total_Pixels_Lost'] = pixel_loss.sum(axis = 1)
+
+    return df_sweep
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Write signature removal criteria and threshold sweep to files
+
+# Create function writing one text file of ERDAS IMAGINE Signature Editor criteria per threshold (named <base_name>_gt_<threshold>.txt) to directory; returns list of file paths
+def write_removal_criteria(signature_index, thresholds, directory, base_name):
+
+    criteria_files = []
+    for t in thresholds:
+        criteria_file = os.path.join(directory, base_name + '_gt_' + str(t) + '.txt')
+        with open(criteria_file, 'w') as f:
+            f.write(erdas_criteria(signatures_above(signature_index, t)))
+        criteria_files.append(criteria_file)
+
+    return criteria_files
+
+def write_sweep(df_sweep, sweep_file):
+    df_sweep.to_csv(sweep_file, index = False)
+    return sweep_file
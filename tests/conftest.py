@@ -0,0 +1,4 @@
+# Make modules at the root of the repository (imported by the script tools) importable by tests
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,58 @@
+# Tests of AA domain assignment (aa_domains.py) against the if / elif branches of 3.00 it replaced, at CROP_PCT band edges, missing CROP_PCT, and senescent small grains
+
+import itertools, numpy, pytest
+from aa_domains import assign_domains, compile_domain_table
+from crop_catalogue import check_domain_codes, crop_names
+
+# Create function returning AA domain of a field as the branches of 3.00 did (for the groups below; 0 where no branch matches, e.g. CROP_PCT <NULL> read as nan)
+def branch_domain(crop_type, crop_pct, growth_stage):
+    single_code_domains = {100: (1, 2, 3), 200: (4, 5, 6), 1100: (37, 38, 39), 1101: (40, 41, 42), 1102: (43, 44, 45)}
+    if crop_type in single_code_domains or 500 <= crop_type < 600:
+        low, middle, high = single_code_domains.get(crop_type, (10, 11, 12))
+        if crop_pct < 20:
+            return low
+        elif crop_pct >= 20 and crop_pct <= 60:
+            return middle
+        elif crop_pct > 60:
+            return high
+    elif 400 <= crop_type < 500:
+        if crop_pct < 20 and growth_stage != 5:
+            return 7
+        elif crop_pct >= 20 and growth_stage != 5:
+            return 8
+        elif growth_stage == 5:
+            return 9
+    elif crop_type == 1403:
+        return 85
+    return 0
+
+crop_types = [100, 200, 401, 405, 501, 1100, 1101, 1102, 1403, 9999]
+percents = [0, 19.99, 20, 40, 60, 60.01, 100, numpy.nan]
+growth_stages = [1, 5]
+
+def test_assign_domains_matches_branches_at_band_edges():
+    fields = list(itertools.product(crop_types, percents, growth_stages))
+    domains = assign_domains(*[numpy.array(c) for c in zip(*fields)], compiled_domain_table = compile_domain_table())
+    assert domains.tolist() == [branch_domain(*f) for f in fields]
+
+def test_assign_domains_of_missing_crop_pct():
+    domains = assign_domains(crop_types = [100, 1403, 401, 401], crop_pct = [numpy.nan] * 4, growth_stages = [1, 1, 1, 5])
+    assert domains.tolist() == [0, 85, 0, 9]
+
+def test_compile_domain_table_rejects_shared_codes_and_domains():
+    with pytest.raises(ValueError):
+        compile_domain_table([('A', [100], (1, 2, 3), None), ('B', [100], (4, 5, 6), None)])
+    with pytest.raises(ValueError):
+        compile_domain_table([('A', [100], (1, 2, 3), None), ('B', [200], (3, 4, 5), None)])
+
+def test_sesbania_and_clover_codes_of_both_3_00_and_7_05_have_domains_and_names():
+    crop_types = [1101, 1103, 1102, 1104]
+    assert assign_domains(crop_types = crop_types, crop_pct = [10, 10, 70, 70], growth_stages = [1, 1, 1, 1]).tolist() == [40, 40, 45, 45]
+    assert crop_names(crop_types).tolist() == ['Sesbania', 'Sesbania', 'Clover', 'Clover']
+
+def test_check_domain_codes_requires_listed_codes_and_general_code_of_ranges():
+    check_domain_codes()
+    with pytest.raises(ValueError):
+        check_domain_codes(domain_table = [('Sesbania', [1105], (40, 41, 42), None)])
+    with pytest.raises(ValueError):
+        check_domain_codes(domain_table = [('Hay', range(900, 1000), (1, 2, 3), None)])
@@ -0,0 +1,36 @@
+# Tests of stratified AA sampling (aa_sampling.py)
+
+import numpy, pytest
+from aa_sampling import allocate_samples, stratified_sample
+
+def test_allocate_samples_proportional_by_largest_remainder():
+    assert allocate_samples(stratum_sizes = [50, 30, 20], stratum_weights = [50, 30, 20], sample_size = 10).tolist() == [5, 3, 2]
+    assert allocate_samples(stratum_sizes = [5, 3, 2], stratum_weights = [5, 3, 2], sample_size = 3).tolist() == [1, 1, 1]
+
+def test_allocate_samples_caps_small_strata_and_passes_share_on():
+    # Stratum 2 is capped at its 2 fields and its share passed on to strata 1 and 3 (ties of remainders go to the first stratum)
+    allocation = allocate_samples(stratum_sizes = [100, 2, 100], stratum_weights = [1, 10, 1], sample_size = 20)
+    assert allocation.tolist() == [10, 2, 8]
+
+def test_allocate_samples_gives_min_per_stratum_first():
+    allocation = allocate_samples(stratum_sizes = [100, 1, 10], stratum_weights = [100, 1, 10], sample_size = 10, min_per_stratum = 2)
+    assert allocation.tolist() == [7, 1, 2]
+    assert allocate_samples(stratum_sizes = [100, 100], stratum_weights = [1, 1], sample_size = 500).tolist() == [100, 100]
+
+def test_stratified_sample_draws_allocation_of_each_stratum_reproducibly():
+    strata = numpy.repeat([1, 2, 3], [60, 30, 10])
+    sampled, summary = stratified_sample(strata = strata, sample_size = 10, seed = 4)
+    assert summary['SAMPLED'].tolist() == [6, 3, 1]
+    assert [sampled[strata == s].sum() for s in [1, 2, 3]] == [6, 3, 1]
+    assert numpy.array_equal(sampled, stratified_sample(strata = strata, sample_size = 10, seed = 4)[0])
+
+def test_stratified_sample_acreage_weighted():
+    strata = numpy.repeat([1, 2], [10, 10])
+    acres = numpy.repeat([1.0, 9.0], [10, 10])
+    sampled, summary = stratified_sample(strata = strata, sample_size = 10, acres = acres, allocation_method = 'Acreage Weighted')
+    assert summary['SAMPLED'].tolist() == [1, 9]
+    assert summary['SAMP_ACRES'].tolist() == [1.0, 81.0]
+
+def test_stratified_sample_rejects_unknown_allocation_method():
+    with pytest.raises(ValueError):
+        stratified_sample(strata = [1, 2], sample_size = 1, allocation_method = 'Equal')
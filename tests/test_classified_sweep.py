@@ -0,0 +1,31 @@
+# Tests of pixel counts of each crop code per field (classified_sweep.py); needs arcpy, as the FIELD_ID of each feature is read from a feature class
+
+import numpy, pytest
+
+arcpy = pytest.importorskip('arcpy')
+
+from classified_sweep import field_class_counts
+from zonal_tables import lookup_table, zonal_majority
+
+# Create function returning feature class in the memory workspace with one feature (no geometry) per FIELD_ID
+def memory_features(field_ids):
+    features = arcpy.CreateFeatureclass_management(out_path = 'memory', out_name = 'fields', geometry_type = 'POLYGON')[0]
+    arcpy.AddField_management(in_table = features, field_name = 'FIELD_ID', field_type = 'LONG')
+    with arcpy.da.InsertCursor(in_table = features, field_names = ['FIELD_ID']) as cursor:
+        for f in field_ids:
+            cursor.insertRow([f])
+    return features
+
+def test_field_class_counts_merge_features_of_a_field_and_ignore_nodata():
+    features = memory_features([10, 20, 10])
+    oids = [row[0] for row in arcpy.da.SearchCursor(features, ['OID@'])]
+    try:
+        # (feature OID, classified raster Value, pixel count) of a sweep; Value 3 maps to crop code 0 (NoData)
+        feature_counts = (numpy.array([oids[0], oids[0], oids[1], oids[2], oids[2]]), numpy.array([1, 2, 2, 2, 3]), numpy.array([5, 1, 4, 5, 9]))
+        zone_values, class_values, counts = field_class_counts(feature_counts = feature_counts, features = features, value_lookup_table = lookup_table(values = [1, 2, 3], codes = [100, 401, 0]))
+        assert zone_values.tolist() == [10, 20]
+        assert class_values.tolist() == [100, 401]
+        assert counts.tolist() == [[5, 6], [0, 4]]
+        assert zonal_majority(zone_values, class_values, counts)[1].tolist() == [401, 401]
+    finally:
+        arcpy.Delete_management(features)
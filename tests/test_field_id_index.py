@@ -0,0 +1,21 @@
+# Tests of duplicate FIELD_IDs per REGION (field_id_index.py); needs arcpy, which the module imports to read feature classes
+
+import numpy, pytest
+
+pytest.importorskip('arcpy')
+
+from field_id_index import duplicate_field_ids, duplicate_mask, index_field_ids
+
+field_ids = numpy.array([10, 20, 10, 10, 30])
+regions = numpy.array(['MID', 'MID', 'MID', 'YUMA', 'MID'])
+
+def test_index_field_ids_keys_by_field_id_and_region():
+    unique_keys, key_index, key_counts = index_field_ids(field_ids = field_ids, regions = regions)
+    assert [tuple(k) for k in unique_keys] == [(10, 'MID'), (10, 'YUMA'), (20, 'MID'), (30, 'MID')]
+    assert key_index.tolist() == [0, 2, 0, 1, 3]
+    assert key_counts.tolist() == [2, 1, 1, 1]
+
+def test_duplicates_are_per_region():
+    duplicates = duplicate_field_ids(field_ids = field_ids, regions = regions)
+    assert list(zip(duplicates['FIELD_ID'].tolist(), duplicates['REGION'].tolist(), duplicates['COUNT'].tolist())) == [(10, 'MID', 2)]
+    assert duplicate_mask(field_ids = field_ids, regions = regions).tolist() == [True, False, True, False, False]
@@ -0,0 +1,28 @@
+# Tests of the Iteration Store of 7.50 (iteration_store.py): one-time import of a pre-existing workbook and export from the store
+
+import pandas
+from iteration_store import export_workbook, import_workbook, list_iterations, load_iteration, save_iteration
+
+# Create function returning a small Bad Signame data frame of an iteration
+def bad_signame_frame(value):
+    return pandas.DataFrame({'4': [value, 2.0], 'Badness_Index': [0.5, -1.0]}, index = pandas.Index(['101-1-401', '102-2-100'], name = 'Signame'))
+
+def test_import_workbook_only_migrates_into_empty_store(tmp_path, monkeypatch):
+    workbook = str(tmp_path / 'REGION_T1_2019_Bad_Signame_Workbook.xlsx')
+    with pandas.ExcelWriter(workbook) as writer:
+        bad_signame_frame(1.0).to_excel(writer, sheet_name = 'iteration_01')
+        bad_signame_frame(3.0).to_excel(writer, sheet_name = 'iteration_02')
+    store = str(tmp_path / 'REGION_T1_2019_Iteration_Store.sqlite')
+
+    assert import_workbook(store = store, table_name = 'bad_signame', workbook = workbook) == ['01', '02']
+    assert load_iteration(store = store, table_name = 'bad_signame', iteration = '02').loc['101-1-401', '4'] == 3.0
+
+    # Once the store holds iterations, the workbook is not read again
+    def read_excel(*args, **kwargs):
+        raise AssertionError('workbook read after migration')
+    monkeypatch.setattr(pandas, 'read_excel', read_excel)
+
+    save_iteration(store = store, table_name = 'bad_signame', iteration = '03', data_frame = bad_signame_frame(5.0))
+    export_workbook(store = store, table_name = 'bad_signame', workbook = workbook)
+    assert import_workbook(store = store, table_name = 'bad_signame', workbook = workbook) == []
+    assert list_iterations(store = store, table_name = 'bad_signame') == ['01', '02', '03']
@@ -0,0 +1,38 @@
+# Tests of Label Tables of 7.50 iterations (label_store.py)
+
+import numpy
+from label_store import bad_mask, compare_labels, create_labels, label_dtype, label_frequency, label_store_path, load_labels, previous_labels_path, save_labels, training_mask
+
+feature_array = numpy.rec.fromarrays([[1, 2, 3, 4], [10, 20, 20, 30], [1, 2, 1, 1], [1, 1, 1, 0], [5.0, 2.0, 3.0, 4.0], [401, 501, 100, 200]],
+                                     names = ['OID@', 'FIELD_ID', 'CLASS', 'aa', 'ACRES', 'CROP_TYPE'])
+
+def test_create_labels_looks_up_majority_and_keeps_static_ground_truth():
+    labels = create_labels(feature_array = feature_array, majority_field_ids = numpy.array([10, 20]), majority_codes = numpy.array([405, 100]))
+    assert labels['MAJORITY'].tolist() == [405, 100, 100, 0]
+    assert labels['crop'].tolist() == [4, 5, 1, 2]
+    assert labels['Crop_label'].tolist() == [4, 5, 1, 0]
+    assert training_mask(labels).tolist() == [True, True, True, False]
+    assert bad_mask(labels).tolist() == [False, False, False, False]
+
+def test_compare_labels_pairs_duplicate_field_ids_and_sums_acreage_shift():
+    previous_labels = create_labels(feature_array = feature_array, majority_field_ids = numpy.array([10, 20, 30]), majority_codes = numpy.array([405, 100, 200]))
+    labels = create_labels(feature_array = feature_array, majority_field_ids = numpy.array([10, 20, 30]), majority_codes = numpy.array([100, 100, 200]))
+    changed_fields, crop_shift = compare_labels(previous_labels, labels)
+    assert changed_fields['FIELD_ID'].tolist() == [10]
+    assert (changed_fields['PREV_LABEL'].tolist(), changed_fields['Crop_label'].tolist()) == ([4], [1])
+    assert dict(zip(crop_shift['Crop_label'].tolist(), crop_shift['SHIFT'].tolist())) == {1: 5.0, 2: 0.0, 4: -5.0, 5: 0.0}
+
+def test_label_frequency_sums_acres_of_each_combination():
+    labels = numpy.zeros(3, dtype = label_dtype)
+    labels['CLASS'], labels['aa'], labels['crop'], labels['Crop_label'], labels['ACRES'] = [1, 1, 2], [1, 1, 1], [4, 4, 4], [4, 4, 5], [1.5, 2.5, 3.0]
+    frequency = label_frequency(labels)
+    assert frequency['FREQUENCY'].tolist() == [2, 1]
+    assert frequency['ACRES'].tolist() == [4.0, 3.0]
+
+def test_previous_labels_path_uses_natural_order(tmp_path):
+    labels = numpy.zeros(1, dtype = label_dtype)
+    for i in [1, 2, 10]:
+        save_labels(label_store_path(str(tmp_path), 'MID_T1_2019', i), labels)
+    assert previous_labels_path(str(tmp_path), 'MID_T1_2019', 10)[0] == '2'
+    assert previous_labels_path(str(tmp_path), 'MID_T1_2019', 1) is None
+    assert load_labels(label_store_path(str(tmp_path), 'MID_T1_2019', 2)).dtype == label_dtype
@@ -0,0 +1,80 @@
+# Tests of Parameter Grid File expansion into trials, and of Trial Ledger cost estimates of 7.10 Dry Run (parameter_grid.py), on ledgers written directly with sqlite
+
+import contextlib, json, pytest, sqlite3
+from parameter_grid import build_trials, classifier_attribute_combinations, default_grid_spec, expand_values, historical_mean, load_grid_spec
+from trial_ledger import create_ledger, read_ledger
+
+# Create function writing completed stages (stage, wall seconds, parameters dictionary) to a new Trial Ledger and returning them as read by read_ledger
+def ledger_stages(ledger_path, stages):
+    create_ledger(str(ledger_path))
+    with contextlib.closing(sqlite3.connect(str(ledger_path))) as connection:
+        with connection:
+            connection.executemany('INSERT INTO stages (run_id, stage, name, status, wall_seconds, parameters) VALUES (?, ?, ?, ?, ?, ?)',
+                                   [('run', stage, stage + str(i), 'completed', seconds, json.dumps(parameters)) for i, (stage, seconds, parameters) in enumerate(stages)])
+    return read_ledger(str(ledger_path))
+
+segment_stages = [('segment', 10.0, {'spectral_detail': 5, 'band_indexes': '4 3 2'}),
+                  ('segment', 100.0, {'spectral_detail': 20, 'band_indexes': '4 3 2'})]
+
+def test_historical_mean_matches_parameters(tmp_path):
+    df_stages = ledger_stages(tmp_path / 'ledger.sqlite', segment_stages)
+    assert historical_mean(df_stages, 'segment', {'spectral_detail': 5, 'band_indexes': '4 3 2'}) == 10.0
+
+def test_historical_mean_matches_numeric_parameters_of_mixed_stage_ledger(tmp_path):
+    # An assess row without segmentation parameters makes param_spectral_detail a float column (5.0), which must still match 5
+    df_stages = ledger_stages(tmp_path / 'ledger.sqlite', segment_stages + [('assess', 1000.0, {'classifier': 'svm'})])
+    assert df_stages['param_spectral_detail'].dtype.kind == 'f'
+    assert historical_mean(df_stages, 'segment', {'spectral_detail': 5, 'band_indexes': '4 3 2'}) == 10.0
+    assert historical_mean(df_stages, 'segment', {'spectral_detail': 20, 'band_indexes': '4 3 2'}) == 100.0
+    assert historical_mean(df_stages, 'assess', {'classifier': 'svm', 'spectral_detail': 5}) == 1000.0
+
+def test_historical_mean_falls_back_to_stage_mean(tmp_path):
+    df_stages = ledger_stages(tmp_path / 'ledger.sqlite', segment_stages)
+    assert historical_mean(df_stages, 'segment', {'spectral_detail': 15}) == 55.0
+    assert historical_mean(df_stages, 'classify', {'spectral_detail': 5}) is None
+
+# Tests of Parameter Grid File expansion into trials
+
+def test_expand_values_integer_range_includes_stop():
+    assert expand_values({'range': [5, 20, 5]}) == [5, 10, 15, 20]
+    assert expand_values({'range': [1, 3]}) == [1, 2, 3]
+
+def test_expand_values_float_range_does_not_accumulate_error():
+    assert expand_values({'range': [15.5, 16.1, 0.2]}) == [15.5, 15.7, 15.9, 16.1]
+    assert expand_values({'range': [0.1, 0.3, 0.1]}) == [0.1, 0.2, 0.3]
+
+@pytest.mark.parametrize('step', [0, -5])
+def test_expand_values_rejects_non_positive_step(step):
+    with pytest.raises(ValueError):
+        expand_values({'range': [5, 20, step]})
+
+def test_classifier_attribute_combinations_apply_require_exclude_and_max_attributes():
+    grid_spec = load_grid_spec()
+    grid_spec['classifiers']['rt'] = {'require': ['COUNT'], 'exclude': ['RECTANGULARITY'], 'max_attributes': 2}
+    assert classifier_attribute_combinations(grid_spec, 'rt') == ['COUNT;COLOR']
+    grid_spec['classifiers']['rt'] = {'exclude': ['RECTANGULARITY']}
+    assert classifier_attribute_combinations(grid_spec, 'rt') == ['COLOR', 'COUNT;COLOR', 'COMPACTNESS;COLOR', 'COUNT;COMPACTNESS;COLOR']
+    grid_spec['classifiers']['ml'] = {'attributes': ['COLOR', 'COUNT;COLOR']}
+    assert classifier_attribute_combinations(grid_spec, 'ml') == ['COLOR', 'COUNT;COLOR']
+
+def test_build_trials_sample_is_reproducible_subset_in_grid_order():
+    grid_spec = load_grid_spec()
+    all_trials = build_trials(grid_spec)
+    grid_spec.update(sample = 20, seed = 3)
+    trials = build_trials(grid_spec)
+    assert len(trials) == 20
+    assert trials == build_trials(grid_spec)
+    assert trials == [t for t in all_trials if t in trials]
+
+@pytest.mark.parametrize('user_spec', [{'classifiers': {'svm': {}, 'knn': {}}},
+                                       {'classifier_attributes': ['COUNT', 'CONVEXHULL']},
+                                       {'classifiers': {'rt': {'require': ['count_']}}},
+                                       {'classifiers': {'ml': {'attributes': ['COLOR;MEAN']}}},
+                                       {'classifiers': {'svm': {'max_attribute': 2}}},
+                                       {'segmentation': {'spectral_details': [5]}}])
+def test_load_grid_spec_rejects_unknown_classifiers_and_attributes(tmp_path, user_spec):
+    grid_file = tmp_path / 'grid.json'
+    grid_file.write_text(json.dumps(user_spec))
+    with pytest.raises(ValueError):
+        load_grid_spec(str(grid_file))
+    assert default_grid_spec['classifiers'] == {'svm': {}, 'ml': {}, 'rt': {}}
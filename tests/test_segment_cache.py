@@ -0,0 +1,18 @@
+# Tests of mean color rasters rebuilt from Segment Labels (segment_cache.py)
+
+import numpy
+from segment_cache import mean_color_block, mean_color_nodata_value, segment_means
+
+def test_mean_color_nodata_value_is_never_a_band_mean():
+    assert mean_color_nodata_value(numpy.array([[10, 20]], dtype = numpy.uint8)) == 0
+    assert mean_color_nodata_value(numpy.array([[0, 255], [254, 3]], dtype = numpy.uint8)) == 253
+    assert mean_color_nodata_value(numpy.arange(256, dtype = numpy.uint8).reshape(-1, 1)) is None
+
+def test_mean_color_block_keeps_band_mean_of_zero_distinct_from_nodata():
+    segment_array = numpy.array([[0, 1, 1], [2, 2, 0]])
+    band_array = numpy.array([[[9, 0, 0], [255, 255, 9]]], dtype = numpy.uint8)
+    segment_ids, means = segment_means(segment_array = segment_array, band_array = band_array)
+    nodata_value = mean_color_nodata_value(means)
+    color_block = mean_color_block(segment_block = segment_array, segment_ids = segment_ids, means = means, nodata_value = nodata_value)
+    assert nodata_value not in (0, 255)
+    assert color_block.tolist() == [[[nodata_value, 0, 0], [255, 255, nodata_value]]]
@@ -0,0 +1,38 @@
+# Tests of the scikit-learn classifier backend of 7.10 on synthetic segments (numpy and scikit-learn only; no ArcGIS licence needed)
+
+import numpy, pytest
+from segment_attributes import attribute_columns, compute_segment_attributes, label_segments
+from segment_classifiers import classify_segment_block, predict_segments, train_classifier
+
+# Create function returning a synthetic segmented raster: 8 x 8 grid of 4 x 4 pixel segments (IDs 1 to 64), three bands of mean color separating class 100 (left half) from class 200 (right half),
+# and a training class raster labelling every other segment column
+def synthetic_segments(seed = 0):
+    random_state = numpy.random.RandomState(seed)
+    segment_array = (numpy.arange(32)[:, numpy.newaxis] // 4) * 8 + numpy.arange(32)[numpy.newaxis, :] // 4 + 1
+    segment_classes = numpy.where((segment_array - 1) % 8 < 4, 100, 200)
+    segment_colors = numpy.where(segment_classes == 100, 50, 150)[numpy.newaxis, :, :] + random_state.normal(0, 5, size = (3, 64))[:, segment_array - 1]
+    class_array = numpy.where((segment_array - 1) % 2 == 0, segment_classes, 0)
+    return segment_array, segment_colors, class_array, segment_classes
+
+@pytest.mark.parametrize('classifier_string', ['svm', 'rt', 'ml'])
+def test_train_and_predict_synthetic_segments(classifier_string):
+    segment_array, band_array, class_array, true_classes = synthetic_segments()
+
+    segment_ids, feature_matrix, column_names = compute_segment_attributes(segment_array = segment_array, band_array = band_array)
+    labels = label_segments(segment_ids = segment_ids, segment_array = segment_array, class_array = class_array)
+    columns = attribute_columns(column_names = column_names, classifier_attributes = 'COLOR;COUNT')
+
+    classifier = train_classifier(classifier_string = classifier_string, feature_matrix = feature_matrix, labels = labels, columns = columns, n_jobs = 1)
+    segment_classes = predict_segments(classifier = classifier, feature_matrix = feature_matrix, columns = columns)
+
+    # Unlabelled segments (every other column) are predicted from the labelled ones
+    classified_block = classify_segment_block(segment_block = segment_array, segment_ids = segment_ids, segment_classes = segment_classes)
+    numpy.testing.assert_array_equal(classified_block, true_classes)
+
+def test_train_classifier_requires_two_classes():
+    segment_array, band_array, class_array, true_classes = synthetic_segments()
+    segment_ids, feature_matrix, column_names = compute_segment_attributes(segment_array = segment_array, band_array = band_array)
+    labels = numpy.where(label_segments(segment_ids = segment_ids, segment_array = segment_array, class_array = class_array) == 100, 100, 0)
+
+    with pytest.raises(ValueError):
+        train_classifier(classifier_string = 'rt', feature_matrix = feature_matrix, labels = labels, columns = numpy.arange(feature_matrix.shape[1]), n_jobs = 1)
@@ -0,0 +1,46 @@
+# Tests of Bad Signame scoring of 7.50 (signature_analytics.py): parity of the masked Good/Bad reduction with the previous loop over crop columns and rows
+
+import numpy, pandas
+from signature_analytics import score_signatures
+
+# Create function returning a synthetic Bad Signame data frame as built in 7.50 before scoring: one row per Signame, area per crop column (crop code / 100 as text), Total_Area, and Crop_label
+def synthetic_signature_table(seed = 0):
+    random_state = numpy.random.RandomState(seed)
+    crop_columns = ['1', '4', '12', '14']
+    signames = ['101-1-100-80-3-1', '102-7-401-60-5-1', '103-2-1201-40-2-2', '104-9-1403-0-0-0', '105-3-3400-90-4-1', 'Unclassified', '106-4-1202-10-1-1']
+    signature_table = pandas.DataFrame(random_state.uniform(0, 900, size = (len(signames), len(crop_columns))) * (random_state.uniform(size = (len(signames), len(crop_columns))) > 0.3),
+                                       index = pandas.Index(signames, name = 'Signame'), columns = crop_columns)
+    # A signature that classified no training field area
+    signature_table.loc['106-4-1202-10-1-1'] = 0.0
+    signature_table['Total_Area'] = signature_table[crop_columns].sum(axis = 1)
+    crop_label = pandas.to_numeric(signature_table.index.str.split('-').str[2]).to_series(index = signature_table.index).div(100).fillna(-9999).astype(int).astype(str)
+    signature_table['Crop_label'] = crop_label
+    return signature_table, crop_columns
+
+# Create function computing Good, Bad, and Badness_Index with the loop 7.50 used before the masked reduction
+#   NOTE: Good and Bad start as 0.0 rather than 0, as current pandas refuses to upcast an integer column by setting a float with .at (older pandas upcast it, giving the same float columns)
+def loop_score_signatures(signature_table, crop_columns):
+    signature_table['Good'] = 0.0
+    signature_table['Bad'] = 0.0
+    signature_table['Badness_Index'] = 0
+    for h in crop_columns:
+        for i, row in signature_table.iterrows():
+            if signature_table.at[i, 'Crop_label'] == h:
+                signature_table.at[i, 'Good'] = signature_table.at[i, 'Good'] + signature_table.at[i, h]
+            else:
+                signature_table.at[i, 'Bad'] = signature_table.at[i, 'Bad'] + signature_table.at[i, h]
+    signature_table['Badness_Index'] = ((signature_table['Bad'] - signature_table['Good']) / (signature_table['Bad'] + signature_table['Good']))
+    return signature_table
+
+def test_score_signatures_matches_loop():
+    signature_table, crop_columns = synthetic_signature_table()
+
+    expected = loop_score_signatures(signature_table = signature_table.copy(), crop_columns = crop_columns)
+    scored = score_signatures(signature_table = signature_table.copy(), crop_columns = crop_columns)
+
+    pandas.testing.assert_frame_equal(scored, expected)
+    assert list(scored.columns[-3:]) == ['Good', 'Bad', 'Badness_Index']
+    assert numpy.isnan(scored.loc['106-4-1202-10-1-1', 'Badness_Index'])
+    # Signatures without a crop code have no Good area; others have some
+    assert scored.loc['Unclassified', 'Good'] == 0
+    assert (scored['Good'] > 0).sum() >= 3
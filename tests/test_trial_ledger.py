@@ -0,0 +1,27 @@
+# Tests of the Trial Ledger of 7.10 (trial_ledger.py): per-stage peak memory and run IDs
+
+import numpy, time
+from trial_ledger import create_ledger, create_run_id, read_ledger, record_stage, rss_bytes
+
+def test_peak_rss_is_per_stage(tmp_path):
+    if rss_bytes() is None:
+        return
+    ledger_path = create_ledger(str(tmp_path / 'ledger.sqlite'))
+
+    with record_stage(ledger_path, 'run', 'train', 'large'):
+        large = numpy.ones(50 * 2 ** 20 // 8)
+        time.sleep(0.3)
+        del large
+    with record_stage(ledger_path, 'run', 'train', 'small'):
+        time.sleep(0.3)
+
+    peaks = read_ledger(ledger_path).set_index('name')['peak_rss_bytes']
+    # A later, smaller stage no longer records the high-water mark of the earlier, larger one
+    assert peaks['large'] - peaks['small'] > 25 * 2 ** 20
+
+def test_run_ids_of_runs_started_within_a_second_differ():
+    run_ids = []
+    for i in range(10):
+        run_ids.append(create_run_id())
+        time.sleep(0.001)
+    assert len(set(run_ids)) == 10
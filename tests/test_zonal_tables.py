@@ -0,0 +1,61 @@
+# Tests of in-memory cross-tabulation, lookup tables, and zonal majority (zonal_tables.py) against pixel by pixel counts
+
+import numpy
+from zonal_tables import apply_lookup_table, block_counts, compile_lookup_table, crosstabulate, merge_counts, tabulate_area, zonal_majority, zonal_top_classes
+
+zone_array = numpy.array([[1, 1, 1, 2],
+                          [1, 2, 2, 2],
+                          [0, 3, 3, 0]])
+class_array = numpy.array([[100, 100, 200, 200],
+                           [500, 200, 0, 200],
+                           [100, 500, 100, 500]])
+
+def test_crosstabulate_counts_every_zone_and_class_value():
+    zone_values, class_values, counts = crosstabulate(zone_array = zone_array, class_array = class_array)
+    assert zone_values.tolist() == [1, 2, 3]
+    assert class_values.tolist() == [0, 100, 200, 500]
+    for i, z in enumerate(zone_values):
+        for j, c in enumerate(class_values):
+            assert counts[i, j] == ((zone_array == z) & (class_array == c)).sum()
+
+def test_crosstabulate_ignores_class_nodata_and_values_not_listed():
+    zone_values, class_values, counts = crosstabulate(zone_array = zone_array, class_array = class_array, class_nodata_value = 0, class_values = [100, 200])
+    assert class_values.tolist() == [100, 200]
+    assert counts.tolist() == [[2, 1], [0, 3], [1, 0]]
+
+def test_tabulate_area_is_laid_out_as_tabulate_area_table():
+    df_area = tabulate_area(*crosstabulate(zone_array = zone_array, class_array = class_array, class_nodata_value = 0), cell_area = 900, zone_field = 'FIELD_ID')
+    assert list(df_area.columns) == ['FIELD_ID', 'VALUE_100', 'VALUE_200', 'VALUE_500']
+    assert df_area['VALUE_200'].tolist() == [900, 2700, 0]
+
+def test_zonal_majority_breaks_ties_to_lowest_class_value():
+    zone_values, class_values, counts = crosstabulate(zone_array = zone_array, class_array = class_array, class_nodata_value = 0)
+    majority_zones, majority_classes, totals = zonal_majority(zone_values, class_values, counts)
+    assert majority_zones.tolist() == [1, 2, 3]
+    assert majority_classes.tolist() == [100, 200, 100]
+    assert totals.tolist() == [4, 3, 2]
+
+def test_zonal_top_classes_gives_fractions_purity_and_margin():
+    top_classes = zonal_top_classes(*crosstabulate(zone_array = zone_array, class_array = class_array, class_nodata_value = 0), k = 3)
+    assert top_classes['CLASS1'].tolist() == [100, 200, 100]
+    assert top_classes['CLASS2'].tolist() == [200, 0, 500]
+    assert top_classes['CLASS3'].tolist() == [500, 0, 0]
+    assert numpy.allclose(top_classes['PURITY'], [0.5, 1.0, 0.5])
+    assert numpy.allclose(top_classes['MARGIN'], [0.25, 1.0, 0.0])
+
+def test_compile_lookup_table_dense_sparse_and_identity():
+    array = numpy.array([-1, 1, 2, 3, 70000])
+    assert compile_lookup_table(values = [1, 2, 3], codes = [1, 2, 3]) is None
+    assert apply_lookup_table(table = compile_lookup_table(values = [1, 2, 3], codes = [100, 200, 300]), array = array).tolist() == [0, 100, 200, 300, 0]
+    sparse = compile_lookup_table(values = [-5, 3, 70000], codes = [1, 2, 3], max_dense_size = 100)
+    assert isinstance(sparse, tuple)
+    assert apply_lookup_table(table = sparse, array = array).tolist() == [0, 0, 0, 2, 3]
+
+def test_merged_block_counts_match_crosstabulation_of_whole_raster():
+    block_counts_list = [block_counts(zone_block = zone_array[:, :2], value_block = class_array[:, :2], zone_nodata_value = 0),
+                         block_counts(zone_block = zone_array[:, 2:], value_block = class_array[:, 2:], zone_nodata_value = 0)]
+    zones, values, totals = merge_counts(block_counts_list)
+    zone_values, class_values, counts = crosstabulate(zone_array = zone_array, class_array = class_array)
+    for z, v, t in zip(zones, values, totals):
+        assert t == counts[zone_values.tolist().index(z), class_values.tolist().index(v)]
+    assert totals.sum() == counts.sum()
@@ -0,0 +1,177 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             trial_ledger.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         pandas; psutil (optional, for memory on Windows; /proc is read on Linux)
+
+# Notes:            This module is imported by 7.10_Iterate_Pro_Classification_Trials.py and 7.11_Summarize_Trial_Ledger.py.
+#                   It can also be run as a stand-alone script to print a summary: python trial_ledger.py <ledger.sqlite> [number of stages]
+
+# Description:      This module records a Trial Ledger (SQLite database) with one row for every segment, extract, train, classify, and assess stage of a 7.10 run:
+#                   its wall time, CPU time, peak memory (RSS, sampled while the stage runs), input and output bytes, and parameters; and summarizes the slowest stages and per-parameter cost curves.
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Create Trial Ledger table if it does not already exist
+# 2. Measure sizes on disk and peak memory of a stage
+# 3. Record a stage (as a context manager wrapped around the work)
+# 4. Summarize Trial Ledger: slowest stages and per-parameter cost curves
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import contextlib, datetime, glob, json, os, pandas, sqlite3, sys, threading, time
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Create Trial Ledger table if it does not already exist
+
+def create_ledger(ledger_path):
+    with contextlib.closing(sqlite3.connect(ledger_path)) as connection:
+        with connection:
+            connection.execute('''CREATE TABLE IF NOT EXISTS stages (run_id TEXT, stage TEXT, name TEXT, started TEXT, status TEXT, wall_seconds REAL, cpu_seconds REAL,
+                                  peak_rss_bytes INTEGER, input_bytes INTEGER, output_bytes INTEGER, parameters TEXT)''')
+    return ledger_path
+
+# Create new run ID (time stamp, to the microsecond, so runs started within the same second are not merged) to distinguish stages of one tool run from another
+def create_run_id():
+    return datetime.datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Measure sizes on disk and peak memory of a stage
+
+# Create function returning size in bytes of a file, of a directory (e.g. geodatabase), or of all files of a shapefile; 0 if path does not exist
+def path_size(path):
+    path = str(path)
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(d, f)) for d, _, files in os.walk(path) for f in files)
+    if os.path.splitext(path)[1].lower() == '.shp':
+        return sum(os.path.getsize(f) for f in glob.glob(os.path.splitext(path)[0] + '.*'))
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return 0
+
+# Create function returning current resident memory (RSS) of this process in bytes; None if it cannot be measured (no psutil and no /proc)
+def rss_bytes():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+# Create context manager returning dictionary whose value of 'peak_rss_bytes' is the highest RSS of this process sampled (every interval seconds, in a background thread) while the context runs,
+# so it is the peak of a single stage rather than the high-water mark of the process so far (geoprocessing tools run within the process, so are included)
+@contextlib.contextmanager
+def sample_peak_rss(interval = 0.1):
+
+    peak = {'peak_rss_bytes': rss_bytes()}
+    stop = threading.Event()
+
+    def sample():
+        rss = rss_bytes()
+        if rss is not None:
+            peak['peak_rss_bytes'] = max(peak['peak_rss_bytes'] or 0, rss)
+
+    def sample_until_stopped():
+        while not stop.wait(interval):
+            sample()
+
+    thread = threading.Thread(target = sample_until_stopped, daemon = True)
+    thread.start()
+    try:
+        yield peak
+    finally:
+        stop.set()
+        thread.join()
+        sample()
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Record a stage (as a context manager wrapped around the work)
+
+# Usage:
+#   with record_stage(ledger_path, run_id, 'train', name, parameters = {...}, inputs = [...]) as record:
+#       ...
+#       record['outputs'].append(output_file)
+#   A stage raising an exception is recorded with status failed and the exception is re-raised
+@contextlib.contextmanager
+def record_stage(ledger_path, run_id, stage, name, parameters = None, inputs = (), outputs = ()):
+
+    record = {'outputs': list(outputs)}
+    started = datetime.datetime.now().isoformat(sep = ' ', timespec = 'seconds')
+    input_bytes = sum(path_size(i) for i in inputs)
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    status = 'failed'
+
+    try:
+        with sample_peak_rss() as peak:
+            yield record
+        status = 'completed'
+    finally:
+        wall_seconds = time.perf_counter() - wall_start
+        cpu_seconds = time.process_time() - cpu_start
+        output_bytes = sum(path_size(o) for o in record['outputs'])
+        with contextlib.closing(sqlite3.connect(ledger_path)) as connection:
+            with connection:
+                connection.execute('INSERT INTO stages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', (run_id, stage, str(name), started, status, wall_seconds, cpu_seconds,
+                                   peak['peak_rss_bytes'], input_bytes, output_bytes, json.dumps(parameters or {}, sort_keys = True)))
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Summarize Trial Ledger: slowest stages and per-parameter cost curves
+
+# Create function returning completed stages as a pandas data frame, with one column per parameter
+def read_ledger(ledger_path, run_id = None):
+    with contextlib.closing(sqlite3.connect(ledger_path)) as connection:
+        df_stages = pandas.read_sql_query('SELECT * FROM stages WHERE status = ?', connection, params = ('completed',))
+    if run_id:
+        df_stages = df_stages[df_stages['run_id'] == run_id]
+    df_parameters = pandas.DataFrame([json.loads(p) for p in df_stages['parameters']], index = df_stages.index)
+    return df_stages.drop(columns = 'parameters').join(df_parameters.add_prefix('param_'))
+
+# Create function returning the slowest stages and a dictionary with key: value pair as (stage, parameter): wall time (count, mean, total) per parameter value
+def summarize_ledger(ledger_path, number_of_stages = 20, run_id = None):
+
+    df_stages = read_ledger(ledger_path = ledger_path, run_id = run_id)
+
+    slowest = df_stages.sort_values('wall_seconds', ascending = False).head(number_of_stages)[['stage', 'name', 'wall_seconds', 'cpu_seconds', 'peak_rss_bytes', 'input_bytes', 'output_bytes']]
+
+    cost_curves = {}
+    for stage, df_stage in df_stages.groupby('stage'):
+        parameter_columns = [c for c in df_stage.columns if c.startswith('param_') and df_stage[c].nunique() > 1]
+        for p in parameter_columns:
+            parameter = p[len('param_'):]
+            cost_curves[(stage, parameter)] = df_stage.groupby(df_stage[p].rename(parameter))['wall_seconds'].agg(['count', 'mean', 'sum'])
+
+    return slowest, cost_curves
+
+# Create function returning summary as text (for arcpy.AddMessage or print)
+def format_summary(slowest, cost_curves):
+    lines = ['Slowest stages:', slowest.to_string(index = False), '']
+    for (stage, parameter), curve in sorted(cost_curves.items()):
+        lines += ['Wall time (seconds) of ' + stage + ' stage by ' + parameter + ':', curve.to_string(), '']
+    return '\n'.join(lines)
+
+#----------------------------------------------------------------------------------------------
+
+if __name__ == '__main__':
+    slowest, cost_curves = summarize_ledger(ledger_path = sys.argv[1], number_of_stages = int(sys.argv[2]) if len(sys.argv) > 2 else 20)
+    print(format_summary(slowest, cost_curves))
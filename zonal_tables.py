@@ -0,0 +1,202 @@
+###############################################################################################
+###############################################################################################
+
+# Name:             zonal_tables.py
+# Author:           Kelly Meehan, USBR
+# Created:          20261019
+# Updated:          20261019
+# Version:          Created using Python 3.6.8
+
+# Requires:         numpy, pandas
+
+# Notes:            This module is imported by 7.50_Recode_through_BadLabel.py, 7.51_Reclassify_and_Generate_Majority_Frequency_Table.py, and classified_sweep.py; it is not intended as a stand-alone script.
+#                   It works on numpy arrays only (no arcpy), so rasters are read (and zone polygons rasterized) by the calling script tool.
+
+# Description:      This module cross-tabulates a zone raster against a class raster in memory (the equivalent of Spatial Analyst Tabulate Area),
+#                   counting pixels of every (zone, class value) combination with a single bincount over combined keys; it also accumulates such counts
+#                   block by block, applies lookup tables (e.g. classified raster Value to crop code), and finds the majority class of each zone (the equivalent of Zonal Statistics MAJORITY)
+#                   along with the top classes of each zone, their pixel fractions, and purity (fraction of the majority class).
+
+###############################################################################################
+###############################################################################################
+
+# This module will:
+
+# 0. Set-up
+# 1. Count pixels of every (zone, class value) combination
+# 2. Return cross-tabulation as a pandas data frame of area, laid out as the Tabulate Area output table
+# 3. Create, compile, and apply lookup tables
+# 4. Accumulate sparse (zone, value) pixel counts block by block
+# 5. Find majority class of each zone
+# 6. Find top classes of each zone with their pixel fractions and purity
+
+#----------------------------------------------------------------------------------------------
+
+# 0. Set-up
+
+# 0.0 Install necessary packages
+import numpy, pandas
+
+#----------------------------------------------------------------------------------------------
+
+# 1. Count pixels of every (zone, class value) combination
+
+# Create function returning sorted zone values, class values, and a (zone, class value) matrix of pixel counts
+#   Pixels with zone_nodata_value (or class_nodata_value, if given) are ignored; if class_values is given, columns are exactly those class values (pixels of other class values are ignored)
+#   If weights is given (e.g. pixel counts of already aggregated zone, class value pairs), each element adds its weight rather than 1
+def crosstabulate(zone_array, class_array, zone_nodata_value = 0, class_nodata_value = None, class_values = None, weights = None):
+
+    valid = zone_array != zone_nodata_value
+    if class_nodata_value is not None:
+        valid &= class_array != class_nodata_value
+    if weights is not None:
+        weights = weights[valid]
+
+    zone_values, zone_index = numpy.unique(zone_array[valid], return_inverse = True)
+
+    if class_values is None:
+        class_values, class_index = numpy.unique(class_array[valid], return_inverse = True)
+    else:
+        class_values = numpy.unique(class_values)
+        valid_classes = class_array[valid]
+        class_index = numpy.searchsorted(class_values, valid_classes)
+        known = class_index < len(class_values)
+        known[known] = class_values[class_index[known]] == valid_classes[known]
+        zone_index, class_index = zone_index[known], class_index[known]
+        if weights is not None:
+            weights = weights[known]
+
+    # Cross-tabulate (zone, class value) pixel counts with one bincount over combined keys
+    counts = numpy.bincount(zone_index * len(class_values) + class_index, weights = weights, minlength = len(zone_values) * len(class_values)).reshape(len(zone_values), len(class_values))
+
+    return zone_values, class_values, counts
+
+#----------------------------------------------------------------------------------------------
+
+# 2. Return cross-tabulation as a pandas data frame of area, laid out as the Tabulate Area output table
+
+# Create function returning data frame with one row per zone (zone_field column) and one column of area (pixel count x cell_area) per class value, named VALUE_<class value>
+def tabulate_area(zone_values, class_values, counts, cell_area, zone_field = 'ZONE'):
+    df_area = pandas.DataFrame(data = counts * cell_area, columns = ['VALUE_' + str(v) for v in class_values])
+    df_area.insert(0, zone_field, zone_values)
+    return df_area
+
+#----------------------------------------------------------------------------------------------
+
+# 3. Create, compile, and apply lookup tables
+
+# Create function returning dense lookup table (array indexed by value) mapping each of values to the corresponding code; values not given map to nodata_value
+def lookup_table(values, codes, nodata_value = 0, dtype = numpy.int32):
+    values = numpy.asarray(values, dtype = numpy.int64)
+    table = numpy.full(values.max() + 1 if len(values) else 1, nodata_value, dtype = dtype)
+    table[values] = codes
+    return table
+
+# Create function returning compiled lookup table of values to codes (e.g. a reclassification remap) for apply_lookup_table:
+#   None if every value maps to itself (identity remap, so applying it is skipped), a dense lookup table if values are non-negative and less than max_dense_size,
+#   or otherwise (sparse codes, e.g. negative or very large values) a tuple of sorted values and their codes, looked up by binary search
+def compile_lookup_table(values, codes, nodata_value = 0, dtype = numpy.int32, max_dense_size = 2 ** 24):
+
+    values = numpy.asarray(values, dtype = numpy.int64)
+    codes = numpy.asarray(codes)
+
+    if len(values) and numpy.array_equal(values, codes):
+        return None
+    if len(values) == 0 or (values.min() >= 0 and values.max() < max_dense_size):
+        return lookup_table(values = values, codes = codes, nodata_value = nodata_value, dtype = dtype)
+
+    order = numpy.argsort(values)
+    return values[order], codes[order].astype(dtype)
+
+# Create function applying a lookup table (dense, sorted values and codes, or None for identity, as returned by compile_lookup_table) to an array;
+# values not in the lookup table (e.g. NoData as -1) are given nodata_value, except with an identity lookup table, which returns a copy of the array
+def apply_lookup_table(table, array, nodata_value = 0):
+
+    if table is None:
+        return array.copy()
+
+    if isinstance(table, tuple):
+        sorted_values, sorted_codes = table
+        output = numpy.full(array.shape, nodata_value, dtype = sorted_codes.dtype)
+        if len(sorted_values):
+            position = numpy.clip(numpy.searchsorted(sorted_values, array), 0, len(sorted_values) - 1)
+            found = sorted_values[position] == array
+            output[found] = sorted_codes[position[found]]
+        return output
+
+    output = numpy.full(array.shape, nodata_value, dtype = table.dtype)
+    inside = (array >= 0) & (array < len(table))
+    output[inside] = table[array[inside]]
+    return output
+
+#----------------------------------------------------------------------------------------------
+
+# 4. Accumulate sparse (zone, value) pixel counts block by block
+
+# Create function returning zone, value, and pixel count of every (zone, value) combination present in a block (one unique over combined keys); pixels with zone_nodata_value are ignored
+def block_counts(zone_block, value_block, zone_nodata_value = -1):
+
+    valid = zone_block != zone_nodata_value
+    zones = zone_block[valid].astype(numpy.int64)
+    values = value_block[valid].astype(numpy.int64)
+    if len(zones) == 0:
+        return zones, values, zones
+
+    value_offset = values.min()
+    value_range = values.max() - value_offset + 1
+    keys, counts = numpy.unique(zones * value_range + (values - value_offset), return_counts = True)
+
+    return keys // value_range, keys % value_range + value_offset, counts
+
+# Create function merging block counts (list of (zone, value, count) tuples) into total pixel count of every (zone, value) combination
+def merge_counts(block_counts_list):
+
+    if not block_counts_list:
+        empty = numpy.zeros(0, dtype = numpy.int64)
+        return empty, empty, empty
+
+    zones, values, counts = [numpy.concatenate(c) for c in zip(*block_counts_list)]
+    pairs, pair_index = numpy.unique(numpy.column_stack([zones, values]), axis = 0, return_inverse = True)
+    totals = numpy.bincount(pair_index.ravel(), weights = counts, minlength = len(pairs)).astype(numpy.int64)
+
+    return pairs[:, 0], pairs[:, 1], totals
+
+#----------------------------------------------------------------------------------------------
+
+# 5. Find majority class of each zone
+
+# Create function returning zones with at least one counted pixel, the class value with the most pixels in each (ties go to the lowest class value), and its total pixel count
+def zonal_majority(zone_values, class_values, counts):
+    totals = counts.sum(axis = 1)
+    counted = totals > 0
+    return zone_values[counted], class_values[counts[counted].argmax(axis = 1)], totals[counted]
+
+#----------------------------------------------------------------------------------------------
+
+# 6. Find top classes of each zone with their pixel fractions and purity
+
+# Create function returning structured array, one row per zone with at least one counted pixel: zone value (zone_field), total pixel count (PIXELS), the k classes with most pixels
+# (CLASS1 ... CLASSk, ties to the lowest class value as in zonal_majority; 0 where a zone has fewer than k classes) and their pixel fractions (FRAC1 ... FRACk),
+# PURITY (fraction of the majority class), and MARGIN (difference in fraction of the first and second class; low values flag ambiguous, mixed zones)
+def zonal_top_classes(zone_values, class_values, counts, k = 3, zone_field = 'ZONE'):
+
+    totals = counts.sum(axis = 1)
+    counted = totals > 0
+    counts, totals = counts[counted], totals[counted]
+
+    # Sort classes of each zone by descending pixel count (stable, so ties keep ascending class value)
+    top_index = numpy.argsort(-counts, axis = 1, kind = 'stable')[:, :k]
+    top_counts = numpy.take_along_axis(counts, top_index, axis = 1)
+    top_classes = numpy.where(top_counts > 0, numpy.asarray(class_values)[top_index], 0)
+    top_fractions = top_counts / totals[:, numpy.newaxis]
+
+    # Pad to k columns if there are fewer than k class values
+    if top_index.shape[1] < k:
+        padding = k - top_index.shape[1]
+        top_classes = numpy.pad(top_classes, ((0, 0), (0, padding)), mode = 'constant')
+        top_fractions = numpy.pad(top_fractions, ((0, 0), (0, padding)), mode = 'constant')
+
+    second_fractions = top_fractions[:, 1] if k > 1 else numpy.zeros(len(totals))
+
+    return numpy.rec.fromarrays([zone_values[counted], totals.astype(numpy.int64)] + list(top_classes.T) + list(top_fractions.T) + [top_fractions[:, 0], top_fractions[:, 0] - second_fractions],
+                                names = [zone_field, 'PIXELS'] + ['CLASS' + str(i + 1) for i in range(k)] + ['FRAC' + str(i + 1) for i in range(k)] + ['PURITY', 'MARGIN'])